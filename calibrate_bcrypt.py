@@ -0,0 +1,34 @@
+import argparse
+from src.services.pwd_handler import calibrate_bcrypt_rounds
+
+
+# CLI function measuring bcrypt on this machine and suggesting the cost
+def calibrate_bcrypt_cli():
+    parser = argparse.ArgumentParser(
+        description="Measure bcrypt hashing time and pick the cost for a target login latency"
+    )
+    parser.add_argument(
+        "-t",
+        "--target-ms",
+        type=float,
+        default=250.0,
+        help="Target time of a single password hash in milliseconds (default 250)",
+    )
+    parser.add_argument(
+        "--min-rounds", type=int, default=10, help="Lowest acceptable cost (default 10)"
+    )
+    parser.add_argument(
+        "--max-rounds", type=int, default=16, help="Highest measured cost (default 16)"
+    )
+    args = parser.parse_args()
+
+    rounds, timings = calibrate_bcrypt_rounds(
+        target_ms=args.target_ms, min_rounds=args.min_rounds, max_rounds=args.max_rounds
+    )
+    for measured_rounds, duration in timings.items():
+        print(f"rounds={measured_rounds:>2}  {duration:8.1f} ms")
+    print(f"Add to .env: BCRYPT_ROUNDS={rounds}")
+
+
+if __name__ == "__main__":
+    calibrate_bcrypt_cli()
@@ -1,7 +1,27 @@
+from pathlib import Path
 from typing import AsyncGenerator
 from src.repository.abstract import AbstractUserRepository
-from src.services.image_provider import AbstractImageProvider, CloudinaryImageProvider
-from src.services.pwd_handler import AbstractPasswordHashHandler, BcryptPasswordHandler
+from src.services.image_provider import (
+    AbstractImageProvider,
+    CloudinaryImageProvider,
+    LocalImageProvider,
+)
+from src.services.pwd_handler import (
+    AbstractPasswordHashHandler,
+    BcryptPasswordHandler,
+    PasswordHashPool,
+)
+from src.services.batch_loader import RequestLoaders
+from src.services.image_transform import DerivedImageCache
+from src.services.job_queue import JobQueue
+from src.services.search_cache import PhotoSearchCache
+from src.services.similarity import SimilarPhotoIndex
+from src.services.tag_suggestions import TagCooccurrence
+from src.services.related_photos import TagPhotoIndex
+from src.services.photo_events import PhotoEventHub
+from src.services.qr_codes import QRCodeCache
+from src.services.rating_buffer import RatingBuffer
+from src.services.single_flight import CoalescingCache
 from src.database.db import get_db
 from src.repository.users import UserRepository
 from src.repository.photos import PhotoRepository
@@ -26,14 +46,22 @@ def get_tags_repository() -> TagRepository:
 
 
 def get_rating_repository() -> RatingRepository:
-    return RatingRepository(next(get_db()))
+    return RatingRepository(next(get_db()), photo_events)
 
 
 def get_comments_repository() -> CommentsRepository:
-    return CommentsRepository(next(get_db()))
+    return CommentsRepository(next(get_db()), photo_events)
 
 
 def get_image_provider() -> AbstractImageProvider:
+    if settings.image_provider == "local":
+        return LocalImageProvider(
+            root=settings.local_storage_dir,
+            base_url=settings.local_storage_url,
+            secret_key=settings.jwt_secret_key,
+            signature_ttl=settings.upload_signature_ttl,
+            derived_cache=derived_image_cache,
+        )
     cloud_setting = {
         "cloud_name": settings.cloudinary_name,
         "api_key": settings.cloudinary_api_key,
@@ -43,7 +71,57 @@ def get_image_provider() -> AbstractImageProvider:
 
 
 def get_password_handler() -> AbstractPasswordHashHandler:
-    return BcryptPasswordHandler()
+    return BcryptPasswordHandler(rounds=settings.bcrypt_rounds)
+
+
+def get_password_hash_pool() -> PasswordHashPool:
+    return password_hash_pool
+
+
+def get_photo_search_cache() -> PhotoSearchCache:
+    return PhotoSearchCache(get_redis_client, settings.photo_search_cache_ttl)
+
+
+def get_qr_code_cache() -> QRCodeCache:
+    return QRCodeCache(get_redis_client, settings.qr_code_cache_ttl)
+
+
+def get_coalescing_cache() -> CoalescingCache:
+    return coalescing_cache
+
+
+def get_similar_photo_index() -> SimilarPhotoIndex:
+    return similar_photo_index
+
+
+def get_tag_cooccurrence() -> TagCooccurrence:
+    return tag_cooccurrence
+
+
+def get_tag_photo_index() -> TagPhotoIndex:
+    return tag_photo_index
+
+
+def get_rating_buffer() -> RatingBuffer:
+    return RatingBuffer(get_redis_client, batch_size=settings.rating_flush_batch)
+
+
+def get_photo_events() -> PhotoEventHub:
+    return photo_events
+
+
+def get_request_loaders() -> RequestLoaders:
+    # FastAPI resolves a dependency once per request, so loaders are request-scoped
+    return RequestLoaders(get_tags_repository())
+
+
+def get_job_queue() -> JobQueue:
+    return JobQueue(
+        get_redis_client,
+        visibility_timeout=settings.job_visibility_timeout,
+        max_attempts=settings.job_max_attempts,
+        retry_delay=settings.job_retry_delay,
+    )
 
 
 @asynccontextmanager
@@ -62,3 +140,36 @@ async def get_redis_client() -> AsyncGenerator[Redis, None]:
         yield redis_client
     finally:
         await redis_client.close()
+
+
+# shared by all requests of the process so that concurrent misses coalesce
+coalescing_cache = CoalescingCache(get_redis_client)
+
+# in-memory index of the perceptual hashes, kept up to date by this process
+similar_photo_index = SimilarPhotoIndex()
+
+# in-memory tag co-occurrence matrix, updated as this process tags photos
+tag_cooccurrence = TagCooccurrence(
+    get_tags_repository, settings.tag_suggestion_rebuild_interval
+)
+
+# tag -> photos index, kept current by change notifications over Redis
+tag_photo_index = TagPhotoIndex(get_redis_client)
+
+# one Redis subscription of the process, shared by all open event streams
+photo_events = PhotoEventHub(get_redis_client)
+
+# shared so that the size limit of the cache is tracked across requests
+derived_image_cache = DerivedImageCache(
+    Path(settings.local_storage_dir) / "derived",
+    max_bytes=settings.derived_cache_max_bytes,
+)
+
+password_hash_pool = PasswordHashPool(
+    get_password_handler(),
+    max_workers=settings.password_pool_workers,
+    max_pending=settings.password_pool_max_pending,
+    timeout=settings.password_pool_timeout,
+)
+
+AbstractImageProvider.configure_executor(settings.image_provider_workers)
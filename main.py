@@ -1,10 +1,20 @@
+import asyncio
 from fastapi import FastAPI, Depends
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
-from src.routes import auth, tags, photo, users, comments, ratings
+from src.routes import auth, tags, photo, users, comments, ratings, storage
 import os
 from pathlib import Path
-from dependencies import get_redis_client
+from dependencies import (
+    get_photos_repository,
+    get_redis_client,
+    get_tags_repository,
+    password_hash_pool,
+    similar_photo_index,
+    tag_photo_index,
+)
+from src.config import settings
+from src.services.upload_validation import UploadValidationMiddleware
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi_limiter import FastAPILimiter
 import uvicorn
@@ -22,6 +32,7 @@ app.include_router(tags.router, prefix="/api")
 app.include_router(ratings.router, prefix="/api")
 app.include_router(comments.router, prefix="/api")
 app.include_router(users.router, prefix="/api")
+app.include_router(storage.router, prefix="/api")
 
 origins = ["http://localhost:3000"]
 
@@ -33,14 +44,40 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# rejects oversized and non-image uploads before they are spooled
+app.add_middleware(
+    UploadValidationMiddleware,
+    max_bytes=settings.max_upload_bytes,
+    max_pixels=settings.max_image_pixels,
+)
+
+
+background_tasks: set[asyncio.Task] = set()
+
 
 @app.on_event("startup")
 async def startup():
     """
-    Initialize FastAPI requests limiter
+    Initialize FastAPI requests limiter, load the similar photo index and
+    start listening for tag changes of photos
     """
     async with get_redis_client() as redis:
         await FastAPILimiter.init(redis)
+    await similar_photo_index.refresh(get_photos_repository())
+    background_tasks.add(
+        asyncio.create_task(tag_photo_index.listen(get_tags_repository))
+    )
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    """
+    Stop the background tasks and the password hashing worker processes
+    """
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    password_hash_pool.shutdown()
 
 
 # async def cleanup_tasks():
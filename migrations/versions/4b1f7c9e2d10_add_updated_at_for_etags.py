@@ -0,0 +1,34 @@
+"""add updated_at on Photo and Tag
+
+Revision ID: 4b1f7c9e2d10
+Revises: 233c766581c4
+Create Date: 2026-10-19 09:12:31.504218
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4b1f7c9e2d10'
+down_revision: Union[str, None] = '233c766581c4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'photos',
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    )
+    op.add_column(
+        'tags',
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('tags', 'updated_at')
+    op.drop_column('photos', 'updated_at')
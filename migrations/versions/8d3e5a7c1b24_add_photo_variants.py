@@ -0,0 +1,26 @@
+"""add variants on Photo
+
+Revision ID: 8d3e5a7c1b24
+Revises: 4b1f7c9e2d10
+Create Date: 2026-10-19 13:40:12.118305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d3e5a7c1b24'
+down_revision: Union[str, None] = '4b1f7c9e2d10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('photos', sa.Column('variants', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('photos', 'variants')
@@ -0,0 +1,98 @@
+"""add rating histogram on Photo
+
+Revision ID: a3d5f0b7c926
+Revises: f4c2a8d61e07
+Create Date: 2026-10-19 18:12:37.904215
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3d5f0b7c926'
+down_revision: Union[str, None] = 'f4c2a8d61e07'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    for stars in range(1, 6):
+        op.add_column('photos', sa.Column(f'rating_{stars}', sa.Integer(), server_default='0', nullable=False))
+    # no rating may change between the backfill and the triggers
+    op.execute("LOCK TABLE ratings IN SHARE ROW EXCLUSIVE MODE")
+    op.execute(
+        """
+        UPDATE photos SET
+            rating_1 = counts.rating_1,
+            rating_2 = counts.rating_2,
+            rating_3 = counts.rating_3,
+            rating_4 = counts.rating_4,
+            rating_5 = counts.rating_5
+        FROM (
+            SELECT photo_id,
+                   count(*) FILTER (WHERE rating = 1) AS rating_1,
+                   count(*) FILTER (WHERE rating = 2) AS rating_2,
+                   count(*) FILTER (WHERE rating = 3) AS rating_3,
+                   count(*) FILTER (WHERE rating = 4) AS rating_4,
+                   count(*) FILTER (WHERE rating = 5) AS rating_5
+            FROM ratings
+            GROUP BY photo_id
+        ) AS counts
+        WHERE photos.id = counts.photo_id
+        """
+    )
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION update_rating_histogram() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                UPDATE photos SET
+                    rating_1 = rating_1 - (OLD.rating = 1)::int,
+                    rating_2 = rating_2 - (OLD.rating = 2)::int,
+                    rating_3 = rating_3 - (OLD.rating = 3)::int,
+                    rating_4 = rating_4 - (OLD.rating = 4)::int,
+                    rating_5 = rating_5 - (OLD.rating = 5)::int
+                WHERE id = OLD.photo_id;
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                UPDATE photos SET
+                    rating_1 = rating_1 + (NEW.rating = 1)::int,
+                    rating_2 = rating_2 + (NEW.rating = 2)::int,
+                    rating_3 = rating_3 + (NEW.rating = 3)::int,
+                    rating_4 = rating_4 + (NEW.rating = 4)::int,
+                    rating_5 = rating_5 + (NEW.rating = 5)::int
+                WHERE id = NEW.photo_id;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER ratings_histogram_insert_delete
+            AFTER INSERT OR DELETE ON ratings
+            FOR EACH ROW EXECUTE FUNCTION update_rating_histogram()
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER ratings_histogram_update
+            AFTER UPDATE OF rating, photo_id ON ratings
+            FOR EACH ROW
+            WHEN (OLD.rating IS DISTINCT FROM NEW.rating
+                  OR OLD.photo_id IS DISTINCT FROM NEW.photo_id)
+            EXECUTE FUNCTION update_rating_histogram()
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER ratings_histogram_update ON ratings")
+    op.execute("DROP TRIGGER ratings_histogram_insert_delete ON ratings")
+    op.execute("DROP FUNCTION update_rating_histogram()")
+    for stars in range(5, 0, -1):
+        op.drop_column('photos', f'rating_{stars}')
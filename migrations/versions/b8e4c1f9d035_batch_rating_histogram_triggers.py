@@ -0,0 +1,168 @@
+"""statement-level rating histogram triggers
+
+Revision ID: b8e4c1f9d035
+Revises: a3d5f0b7c926
+Create Date: 2026-10-19 19:03:51.226847
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8e4c1f9d035'
+down_revision: Union[str, None] = 'a3d5f0b7c926'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("DROP TRIGGER ratings_histogram_update ON ratings")
+    op.execute("DROP TRIGGER ratings_histogram_insert_delete ON ratings")
+    # one update of every photo row per statement instead of per rating
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION update_rating_histogram() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                UPDATE photos SET
+                    rating_1 = rating_1 + added.rating_1,
+                    rating_2 = rating_2 + added.rating_2,
+                    rating_3 = rating_3 + added.rating_3,
+                    rating_4 = rating_4 + added.rating_4,
+                    rating_5 = rating_5 + added.rating_5
+                FROM (
+                    SELECT photo_id,
+                           count(*) FILTER (WHERE rating = 1) AS rating_1,
+                           count(*) FILTER (WHERE rating = 2) AS rating_2,
+                           count(*) FILTER (WHERE rating = 3) AS rating_3,
+                           count(*) FILTER (WHERE rating = 4) AS rating_4,
+                           count(*) FILTER (WHERE rating = 5) AS rating_5
+                    FROM new_ratings
+                    GROUP BY photo_id
+                ) AS added
+                WHERE photos.id = added.photo_id;
+            ELSIF TG_OP = 'DELETE' THEN
+                UPDATE photos SET
+                    rating_1 = rating_1 - removed.rating_1,
+                    rating_2 = rating_2 - removed.rating_2,
+                    rating_3 = rating_3 - removed.rating_3,
+                    rating_4 = rating_4 - removed.rating_4,
+                    rating_5 = rating_5 - removed.rating_5
+                FROM (
+                    SELECT photo_id,
+                           count(*) FILTER (WHERE rating = 1) AS rating_1,
+                           count(*) FILTER (WHERE rating = 2) AS rating_2,
+                           count(*) FILTER (WHERE rating = 3) AS rating_3,
+                           count(*) FILTER (WHERE rating = 4) AS rating_4,
+                           count(*) FILTER (WHERE rating = 5) AS rating_5
+                    FROM old_ratings
+                    GROUP BY photo_id
+                ) AS removed
+                WHERE photos.id = removed.photo_id;
+            ELSE
+                UPDATE photos SET
+                    rating_1 = rating_1 + changed.rating_1,
+                    rating_2 = rating_2 + changed.rating_2,
+                    rating_3 = rating_3 + changed.rating_3,
+                    rating_4 = rating_4 + changed.rating_4,
+                    rating_5 = rating_5 + changed.rating_5
+                FROM (
+                    SELECT photo_id,
+                           coalesce(sum(sign) FILTER (WHERE rating = 1), 0) AS rating_1,
+                           coalesce(sum(sign) FILTER (WHERE rating = 2), 0) AS rating_2,
+                           coalesce(sum(sign) FILTER (WHERE rating = 3), 0) AS rating_3,
+                           coalesce(sum(sign) FILTER (WHERE rating = 4), 0) AS rating_4,
+                           coalesce(sum(sign) FILTER (WHERE rating = 5), 0) AS rating_5
+                    FROM (
+                        SELECT photo_id, rating, 1 AS sign FROM new_ratings
+                        UNION ALL
+                        SELECT photo_id, rating, -1 AS sign FROM old_ratings
+                    ) AS changes
+                    GROUP BY photo_id
+                ) AS changed
+                WHERE photos.id = changed.photo_id
+                  AND (changed.rating_1, changed.rating_2, changed.rating_3,
+                       changed.rating_4, changed.rating_5) <> (0, 0, 0, 0, 0);
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER ratings_histogram_insert
+            AFTER INSERT ON ratings
+            REFERENCING NEW TABLE AS new_ratings
+            FOR EACH STATEMENT EXECUTE FUNCTION update_rating_histogram()
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER ratings_histogram_update
+            AFTER UPDATE ON ratings
+            REFERENCING OLD TABLE AS old_ratings NEW TABLE AS new_ratings
+            FOR EACH STATEMENT EXECUTE FUNCTION update_rating_histogram()
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER ratings_histogram_delete
+            AFTER DELETE ON ratings
+            REFERENCING OLD TABLE AS old_ratings
+            FOR EACH STATEMENT EXECUTE FUNCTION update_rating_histogram()
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER ratings_histogram_delete ON ratings")
+    op.execute("DROP TRIGGER ratings_histogram_update ON ratings")
+    op.execute("DROP TRIGGER ratings_histogram_insert ON ratings")
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION update_rating_histogram() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                UPDATE photos SET
+                    rating_1 = rating_1 - (OLD.rating = 1)::int,
+                    rating_2 = rating_2 - (OLD.rating = 2)::int,
+                    rating_3 = rating_3 - (OLD.rating = 3)::int,
+                    rating_4 = rating_4 - (OLD.rating = 4)::int,
+                    rating_5 = rating_5 - (OLD.rating = 5)::int
+                WHERE id = OLD.photo_id;
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                UPDATE photos SET
+                    rating_1 = rating_1 + (NEW.rating = 1)::int,
+                    rating_2 = rating_2 + (NEW.rating = 2)::int,
+                    rating_3 = rating_3 + (NEW.rating = 3)::int,
+                    rating_4 = rating_4 + (NEW.rating = 4)::int,
+                    rating_5 = rating_5 + (NEW.rating = 5)::int
+                WHERE id = NEW.photo_id;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER ratings_histogram_insert_delete
+            AFTER INSERT OR DELETE ON ratings
+            FOR EACH ROW EXECUTE FUNCTION update_rating_histogram()
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER ratings_histogram_update
+            AFTER UPDATE OF rating, photo_id ON ratings
+            FOR EACH ROW
+            WHEN (OLD.rating IS DISTINCT FROM NEW.rating
+                  OR OLD.photo_id IS DISTINCT FROM NEW.photo_id)
+            EXECUTE FUNCTION update_rating_histogram()
+        """
+    )
@@ -0,0 +1,30 @@
+"""add content_hash on Photo
+
+Revision ID: c7a2f4e9b813
+Revises: 8d3e5a7c1b24
+Create Date: 2026-10-19 15:02:47.731920
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7a2f4e9b813'
+down_revision: Union[str, None] = '8d3e5a7c1b24'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('photos', sa.Column('content_hash', sa.String(length=64), nullable=True))
+    op.create_index(op.f('ix_photos_content_hash'), 'photos', ['content_hash'], unique=False)
+    op.create_index(op.f('ix_photos_cloudinary_public_id'), 'photos', ['cloudinary_public_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_photos_cloudinary_public_id'), table_name='photos')
+    op.drop_index(op.f('ix_photos_content_hash'), table_name='photos')
+    op.drop_column('photos', 'content_hash')
@@ -0,0 +1,26 @@
+"""add index on comments photo_id, created_at
+
+Revision ID: d2f7a9c4e168
+Revises: b8e4c1f9d035
+Create Date: 2026-10-19 19:41:12.504318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2f7a9c4e168'
+down_revision: Union[str, None] = 'b8e4c1f9d035'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_comments_photo_id_created_at', 'comments', ['photo_id', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_comments_photo_id_created_at', table_name='comments')
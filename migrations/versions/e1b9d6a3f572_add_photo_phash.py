@@ -0,0 +1,26 @@
+"""add phash on Photo
+
+Revision ID: e1b9d6a3f572
+Revises: c7a2f4e9b813
+Create Date: 2026-10-19 16:21:05.392114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e1b9d6a3f572'
+down_revision: Union[str, None] = 'c7a2f4e9b813'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('photos', sa.Column('phash', sa.BigInteger(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('photos', 'phash')
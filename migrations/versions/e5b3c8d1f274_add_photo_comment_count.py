@@ -0,0 +1,67 @@
+"""add comment_count on Photo
+
+Revision ID: e5b3c8d1f274
+Revises: d2f7a9c4e168
+Create Date: 2026-10-19 20:12:38.190546
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5b3c8d1f274'
+down_revision: Union[str, None] = 'd2f7a9c4e168'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('photos', sa.Column('comment_count', sa.Integer(), server_default='0', nullable=False))
+    # no comment may be added or removed during the backfill
+    op.execute("LOCK TABLE comments IN SHARE ROW EXCLUSIVE MODE")
+    op.execute(
+        """
+        UPDATE photos SET comment_count = counts.comments
+        FROM (
+            SELECT photo_id, count(*) AS comments
+            FROM comments
+            GROUP BY photo_id
+        ) AS counts
+        WHERE photos.id = counts.photo_id
+        """
+    )
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION uncount_cascaded_comments() RETURNS trigger AS $$
+        BEGIN
+            IF pg_trigger_depth() > 1 THEN
+                UPDATE photos SET comment_count = comment_count - removed.comments
+                FROM (
+                    SELECT photo_id, count(*) AS comments
+                    FROM old_comments
+                    GROUP BY photo_id
+                ) AS removed
+                WHERE photos.id = removed.photo_id;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER comments_cascade_count
+            AFTER DELETE ON comments
+            REFERENCING OLD TABLE AS old_comments
+            FOR EACH STATEMENT EXECUTE FUNCTION uncount_cascaded_comments()
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER comments_cascade_count ON comments")
+    op.execute("DROP FUNCTION uncount_cascaded_comments()")
+    op.drop_column('photos', 'comment_count')
@@ -0,0 +1,36 @@
+"""unique rating per user and photo
+
+Revision ID: f4c2a8d61e07
+Revises: e1b9d6a3f572
+Create Date: 2026-10-19 17:40:12.518306
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f4c2a8d61e07'
+down_revision: Union[str, None] = 'e1b9d6a3f572'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # keep only the latest rating of every user for a photo
+    op.execute(
+        """
+        DELETE FROM ratings older
+        USING ratings newer
+        WHERE older.photo_id = newer.photo_id
+          AND older.user_id = newer.user_id
+          AND older.id < newer.id
+        """
+    )
+    op.create_unique_constraint('unique_photo_user_rating', 'ratings', ['photo_id', 'user_id'])
+
+
+def downgrade() -> None:
+    op.drop_constraint('unique_photo_user_rating', 'ratings', type_='unique')
@@ -13,9 +13,34 @@ class Settings(BaseSettings):
     postgres_user: str
     postgres_password: str
     postgres_port: int
-    cloudinary_name: str
-    cloudinary_api_key: str
-    cloudinary_api_secret: str
+    cloudinary_name: str = ""
+    cloudinary_api_key: str = ""
+    cloudinary_api_secret: str = ""
+    image_provider: str = "cloudinary"
+    image_provider_workers: int = 8
+    local_storage_dir: str = "media"
+    local_storage_url: str = "http://localhost:8000/api/storage"
+    upload_signature_ttl: int = 3600
+    derived_cache_max_bytes: int = 512 * 1024 * 1024
+    max_upload_bytes: int = 10 * 1024 * 1024
+    max_image_pixels: int = 40_000_000
+    photo_search_cache_ttl: int = 300
+    qr_code_cache_ttl: int = 86400
+    photo_cache_ttl: int = 300
+    user_cache_ttl: int = 900
+    tag_suggestion_rebuild_interval: float = 3600.0
+    photo_events_keepalive: float = 15.0
+    rating_write_behind: bool = False
+    rating_flush_interval: float = 2.0
+    rating_flush_batch: int = 500
+    job_visibility_timeout: float = 300.0
+    job_max_attempts: int = 5
+    job_retry_delay: float = 5.0
+    job_worker_concurrency: int = 4
+    bcrypt_rounds: int = 12
+    password_pool_workers: int = 2
+    password_pool_max_pending: int = 64
+    password_pool_timeout: float = 10.0
 
     class Config:
         env_file = ".env"
@@ -8,6 +8,11 @@ from sqlalchemy import (
     Text,
     UniqueConstraint,
     DateTime,
+    JSON,
+    BigInteger,
+    DDL,
+    Index,
+    event,
 )
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql.schema import ForeignKey
@@ -39,20 +44,44 @@ class Photo(Base):
         Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False
     )
     description = Column(Text)
-    cloudinary_public_id = Column(String(255), nullable=False)
+    cloudinary_public_id = Column(String(255), nullable=False, index=True)
     image_url = Column(String(255), nullable=False)
+    # SHA-256 of the uploaded file, photos with equal content share the stored image
+    content_hash = Column(String(64), nullable=True, index=True)
+    # 64-bit dHash of the image stored as signed BIGINT, see src/services/similarity.py
+    phash = Column(BigInteger, nullable=True)
     image_url_transform = Column(String(255), nullable=True)
+    # {size: {"original": url, "webp": url}}, filled in after the upload
+    variants = Column(JSON, nullable=True)
+    # number of 1 to 5 star ratings, kept up to date by the ratings triggers
+    rating_1 = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_2 = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_3 = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_4 = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_5 = Column(Integer, nullable=False, default=0, server_default="0")
+    # kept up to date by CommentsRepository, and by a trigger for cascades
+    comment_count = Column(Integer, nullable=False, default=0, server_default="0")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
     user = relationship("User", backref="photos")
     tags = relationship("Tag", secondary="photo_m2m_tags", backref="photos")
     comments = relationship("Comment", backref="photo", cascade="all, delete-orphan")
     ratings = relationship("Rating", backref="photo", cascade="all, delete-orphan")
 
+    @property
+    def rating_histogram(self) -> dict[int, int]:
+        return {
+            stars: getattr(self, f"rating_{stars}") or 0 for stars in range(1, 6)
+        }
+
     @hybrid_property
     def average_rating(self):
-        total_ratings = sum(rating.rating for rating in self.ratings)
-        num_ratings = len(self.ratings)
+        histogram = self.rating_histogram
+        num_ratings = sum(histogram.values())
         if num_ratings > 0:
+            total_ratings = sum(stars * count for stars, count in histogram.items())
             return total_ratings / num_ratings
         else:
             return None
@@ -79,10 +108,16 @@ class Tag(Base):
     __tablename__ = "tags"
     id = Column(Integer, primary_key=True)
     name = Column(String(50), unique=True, nullable=False)
+    updated_at = Column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
 
 
 class Comment(Base):
     __tablename__ = "comments"
+    __table_args__ = (
+        Index("ix_comments_photo_id_created_at", "photo_id", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True)
     photo_id = Column(
@@ -98,6 +133,9 @@ class Comment(Base):
 
 class Rating(Base):
     __tablename__ = "ratings"
+    __table_args__ = (
+        UniqueConstraint("photo_id", "user_id", name="unique_photo_user_rating"),
+    )
 
     id = Column(Integer, primary_key=True)
     photo_id = Column(
@@ -107,3 +145,134 @@ class Rating(Base):
         Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False
     )
     rating = Column(Integer, nullable=False, default=1)
+
+
+
+# keeps Photo.rating_1 to rating_5 in step with the ratings table in the
+# transaction that changes it, including upserts and cascading deletes;
+# the triggers run once per statement, so a batch of ratings updates every
+# photo row once with the aggregated deltas
+RATING_HISTOGRAM_FUNCTION = DDL(
+    """
+CREATE OR REPLACE FUNCTION update_rating_histogram() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        UPDATE photos SET
+            rating_1 = rating_1 + added.rating_1,
+            rating_2 = rating_2 + added.rating_2,
+            rating_3 = rating_3 + added.rating_3,
+            rating_4 = rating_4 + added.rating_4,
+            rating_5 = rating_5 + added.rating_5
+        FROM (
+            SELECT photo_id,
+                   count(*) FILTER (WHERE rating = 1) AS rating_1,
+                   count(*) FILTER (WHERE rating = 2) AS rating_2,
+                   count(*) FILTER (WHERE rating = 3) AS rating_3,
+                   count(*) FILTER (WHERE rating = 4) AS rating_4,
+                   count(*) FILTER (WHERE rating = 5) AS rating_5
+            FROM new_ratings
+            GROUP BY photo_id
+        ) AS added
+        WHERE photos.id = added.photo_id;
+    ELSIF TG_OP = 'DELETE' THEN
+        UPDATE photos SET
+            rating_1 = rating_1 - removed.rating_1,
+            rating_2 = rating_2 - removed.rating_2,
+            rating_3 = rating_3 - removed.rating_3,
+            rating_4 = rating_4 - removed.rating_4,
+            rating_5 = rating_5 - removed.rating_5
+        FROM (
+            SELECT photo_id,
+                   count(*) FILTER (WHERE rating = 1) AS rating_1,
+                   count(*) FILTER (WHERE rating = 2) AS rating_2,
+                   count(*) FILTER (WHERE rating = 3) AS rating_3,
+                   count(*) FILTER (WHERE rating = 4) AS rating_4,
+                   count(*) FILTER (WHERE rating = 5) AS rating_5
+            FROM old_ratings
+            GROUP BY photo_id
+        ) AS removed
+        WHERE photos.id = removed.photo_id;
+    ELSE
+        UPDATE photos SET
+            rating_1 = rating_1 + changed.rating_1,
+            rating_2 = rating_2 + changed.rating_2,
+            rating_3 = rating_3 + changed.rating_3,
+            rating_4 = rating_4 + changed.rating_4,
+            rating_5 = rating_5 + changed.rating_5
+        FROM (
+            SELECT photo_id,
+                   coalesce(sum(sign) FILTER (WHERE rating = 1), 0) AS rating_1,
+                   coalesce(sum(sign) FILTER (WHERE rating = 2), 0) AS rating_2,
+                   coalesce(sum(sign) FILTER (WHERE rating = 3), 0) AS rating_3,
+                   coalesce(sum(sign) FILTER (WHERE rating = 4), 0) AS rating_4,
+                   coalesce(sum(sign) FILTER (WHERE rating = 5), 0) AS rating_5
+            FROM (
+                SELECT photo_id, rating, 1 AS sign FROM new_ratings
+                UNION ALL
+                SELECT photo_id, rating, -1 AS sign FROM old_ratings
+            ) AS changes
+            GROUP BY photo_id
+        ) AS changed
+        WHERE photos.id = changed.photo_id
+          AND (changed.rating_1, changed.rating_2, changed.rating_3,
+               changed.rating_4, changed.rating_5) <> (0, 0, 0, 0, 0);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+"""
+)
+RATING_HISTOGRAM_TRIGGERS = DDL(
+    """
+CREATE TRIGGER ratings_histogram_insert
+    AFTER INSERT ON ratings
+    REFERENCING NEW TABLE AS new_ratings
+    FOR EACH STATEMENT EXECUTE FUNCTION update_rating_histogram();
+CREATE TRIGGER ratings_histogram_update
+    AFTER UPDATE ON ratings
+    REFERENCING OLD TABLE AS old_ratings NEW TABLE AS new_ratings
+    FOR EACH STATEMENT EXECUTE FUNCTION update_rating_histogram();
+CREATE TRIGGER ratings_histogram_delete
+    AFTER DELETE ON ratings
+    REFERENCING OLD TABLE AS old_ratings
+    FOR EACH STATEMENT EXECUTE FUNCTION update_rating_histogram()
+"""
+)
+for ddl in (RATING_HISTOGRAM_FUNCTION, RATING_HISTOGRAM_TRIGGERS):
+    event.listen(
+        Rating.__table__, "after_create", ddl.execute_if(dialect="postgresql")
+    )
+
+# Comments deleted by a foreign key cascade (e.g. of a deleted user) bypass
+# CommentsRepository. Cascaded deletes run inside the referential integrity
+# triggers, so the trigger depth tells them apart from the repository's own.
+COMMENT_COUNT_FUNCTION = DDL(
+    """
+CREATE OR REPLACE FUNCTION uncount_cascaded_comments() RETURNS trigger AS $$
+BEGIN
+    IF pg_trigger_depth() > 1 THEN
+        UPDATE photos SET comment_count = comment_count - removed.comments
+        FROM (
+            SELECT photo_id, count(*) AS comments
+            FROM old_comments
+            GROUP BY photo_id
+        ) AS removed
+        WHERE photos.id = removed.photo_id;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+"""
+)
+COMMENT_COUNT_TRIGGER = DDL(
+    """
+CREATE TRIGGER comments_cascade_count
+    AFTER DELETE ON comments
+    REFERENCING OLD TABLE AS old_comments
+    FOR EACH STATEMENT EXECUTE FUNCTION uncount_cascaded_comments()
+"""
+)
+for ddl in (COMMENT_COUNT_FUNCTION, COMMENT_COUNT_TRIGGER):
+    event.listen(
+        Comment.__table__, "after_create", ddl.execute_if(dialect="postgresql")
+    )
@@ -66,6 +66,20 @@ class AbstractUserRepository(ABC):
         """
         ...
 
+    @abstractmethod
+    def update_password(self, user: UserOut, hashed_password: str) -> None:
+        """
+        Replace the stored password hash of a user.
+
+        :param user: The user object representing the user to update.
+        :type user: UserOut
+        :param hashed_password: The new password hash.
+        :type hashed_password: str
+
+        :return: None
+        """
+        ...
+
     @abstractmethod
     def update_token(self, user: UserOut, token: str | None) -> None:
         """
@@ -1,13 +1,30 @@
-from sqlalchemy.orm import Session
-from src.database.models import Comment
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session, aliased
+from src.database.models import Comment, Photo
 from datetime import datetime
 from src.schemas.comments import CommentIn, CommentOut, CommentUpdate
 from typing import Optional
+from src.services.photo_events import PhotoEventHub
 
 
 class CommentsRepository:
-    def __init__(self, db_session: Session) -> None:
+    def __init__(
+        self, db_session: Session, events: Optional[PhotoEventHub] = None
+    ) -> None:
         self._db = db_session
+        self._events = events
+
+    def _count_comments(self, photo_id: int, change: int) -> None:
+        # in the transaction of the comment, as an atomic increment
+        self._db.query(Photo).filter(Photo.id == photo_id).update(
+            {Photo.comment_count: Photo.comment_count + change},
+            synchronize_session=False,
+        )
+
+    async def _publish(self, comment: Comment, event: str) -> None:
+        if self._events is not None:
+            data = CommentOut.model_validate(comment).model_dump(mode="json")
+            await self._events.publish(comment.photo_id, event, data)
 
     async def create_comment(self, new_comment: CommentIn, user_id: int) -> CommentOut:
         """
@@ -27,8 +44,10 @@ class CommentsRepository:
             updated_at=None,
         )
         self._db.add(new_comment)
+        self._count_comments(new_comment.photo_id, 1)
         self._db.commit()
         self._db.refresh(new_comment)
+        await self._publish(new_comment, "comment.created")
         return new_comment
 
     async def update_comment(
@@ -48,6 +67,7 @@ class CommentsRepository:
         comment.updated_at = datetime.now()
         self._db.commit()
         self._db.refresh(comment)
+        await self._publish(comment, "comment.updated")
         return comment
 
     async def delete_comment(
@@ -65,7 +85,9 @@ class CommentsRepository:
         """
         comment = self._db.query(Comment).filter(Comment.id == comment_id).first()
         self._db.delete(comment)
+        self._count_comments(comment.photo_id, -1)
         self._db.commit()
+        await self._publish(comment, "comment.deleted")
         return comment
 
     async def get_comments_for_photo(self, photo_id: int) -> Optional[list[CommentOut]]:
@@ -90,3 +112,44 @@ class CommentsRepository:
         :return: List of comments for a given photo.
         """
         return self._db.query(Comment).filter(Comment.id == comment_id).first()
+
+    async def get_latest_comments_for_photos(
+        self, photo_ids: list[int], limit: int
+    ) -> dict[int, list[Comment]]:
+        """
+        Return the latest comments of many photos with a single query.
+
+        The comments are numbered per photo with ROW_NUMBER() OVER
+        (PARTITION BY photo_id ORDER BY created_at DESC) and only the first
+        limit of every photo are kept.
+
+        :param photo_ids: Photo IDs.
+        :param limit: Maximum number of comments per photo.
+        :return: Comments by photo ID, newest first; photos without comments
+            map to an empty list.
+        """
+        latest = {photo_id: [] for photo_id in photo_ids}
+        if not photo_ids:
+            return latest
+        position = (
+            func.row_number()
+            .over(
+                partition_by=Comment.photo_id,
+                order_by=(Comment.created_at.desc(), Comment.id.desc()),
+            )
+            .label("position")
+        )
+        numbered = (
+            select(Comment, position)
+            .where(Comment.photo_id.in_(photo_ids))
+            .subquery()
+        )
+        comment = aliased(Comment, numbered)
+        comments = self._db.scalars(
+            select(comment)
+            .where(numbered.c.position <= limit)
+            .order_by(numbered.c.photo_id, numbered.c.position)
+        )
+        for row in comments:
+            latest[row.photo_id].append(row)
+        return latest
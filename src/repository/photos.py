@@ -1,8 +1,8 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import Integer, String, case, cast, extract, func, literal, select
 from fastapi import HTTPException
-from src.database.models import Photo, Tag, Rating
-from src.schemas.photo import PhotoCreate, PhotoUpdateOut, PhotoOut
+from src.database.models import Photo, Tag, Rating, Comment, photo_m2m_tag
+from src.schemas.photo import PhotoCreate, PhotoUpdateOut, PhotoOut, PhotoSort
 from typing import List, Optional
 from sqlalchemy import or_
 
@@ -30,6 +30,9 @@ class PhotoRepository:
             tags=tags,
             image_url=photo_data.image_url,
             cloudinary_public_id=photo_data.cloudinary_public_id,
+            content_hash=photo_data.content_hash,
+            phash=photo_data.phash,
+            variants=photo_data.variants,
             user_id=user_id,
         )
         self.db.add(new_photo)
@@ -46,6 +49,114 @@ class PhotoRepository:
         """
         return self.db.query(Photo).filter(Photo.id == photo_id).first()
 
+    async def get_photo_by_content_hash(self, content_hash: str) -> Optional[Photo]:
+        """
+        Retrieve the oldest photo whose uploaded file had the given content.
+
+        :param content_hash: SHA-256 of the file.
+        :return: The Photo object if found, otherwise None.
+        """
+        return (
+            self.db.query(Photo)
+            .filter(Photo.content_hash == content_hash)
+            .order_by(Photo.id)
+            .first()
+        )
+
+    async def get_photo_hashes(self, after_id: int = 0) -> List[tuple[int, int]]:
+        """
+        Retrieve the perceptual hashes of photos.
+
+        :param after_id: Only photos with a greater ID are returned.
+        :return: (photo ID, signed 64-bit hash) pairs ordered by ID.
+        """
+        return [
+            (photo_id, phash)
+            for photo_id, phash in self.db.query(Photo.id, Photo.phash)
+            .filter(Photo.id > after_id, Photo.phash.isnot(None))
+            .order_by(Photo.id)
+            .all()
+        ]
+
+    async def count_photos_with_public_id(self, public_id: str) -> int:
+        """
+        Count the photos referencing a stored image.
+
+        This is the reference count of the image: it may only be deleted
+        from the image provider when no photo uses it any more.
+
+        :param public_id: The image provider identifier of the image.
+        :return: Number of photos using the image.
+        """
+        return (
+            self.db.query(func.count(Photo.id))
+            .filter(Photo.cloudinary_public_id == public_id)
+            .scalar()
+        )
+
+    async def get_photos_by_ids(self, photo_ids: List[int]) -> List[PhotoOut]:
+        """
+        Retrieve photos by their IDs, keeping the order of the given IDs.
+
+        :param photo_ids: The IDs of the photos to retrieve.
+        :return: A list of Photo objects; IDs that no longer exist are skipped.
+        """
+        if not photo_ids:
+            return []
+        photos = self.db.query(Photo).filter(Photo.id.in_(photo_ids)).all()
+        photos_by_id = {photo.id: photo for photo in photos}
+        return [photos_by_id[id] for id in photo_ids if id in photos_by_id]
+
+    async def get_photo_version(self, photo_id: int) -> Optional[tuple]:
+        """
+        Retrieve the values that change whenever the photo detail response changes.
+
+        Runs a single query over the photo row with its rating histogram and
+        comment count and aggregates of its comments and tags, without loading
+        any relationship.
+
+        :param photo_id: The ID of the photo.
+        :return: A tuple usable as an ETag source, or None if the photo does not exist.
+        """
+        comment_changed = (
+            select(func.max(func.coalesce(Comment.updated_at, Comment.created_at)))
+            .where(Comment.photo_id == Photo.id)
+            .scalar_subquery()
+        )
+        tags_changed = (
+            select(func.max(Tag.updated_at))
+            .join(photo_m2m_tag, photo_m2m_tag.c.tag_id == Tag.id)
+            .where(photo_m2m_tag.c.photo_id == Photo.id)
+            .scalar_subquery()
+        )
+        # deleting a tag removes its links without touching the photos row
+        # or the remaining tags, so only the count tells that it is gone
+        tag_count = (
+            select(func.count())
+            .select_from(photo_m2m_tag)
+            .where(photo_m2m_tag.c.photo_id == Photo.id)
+            .scalar_subquery()
+        )
+        row = (
+            self.db.query(
+                Photo.updated_at,
+                Photo.rating_1,
+                Photo.rating_2,
+                Photo.rating_3,
+                Photo.rating_4,
+                Photo.rating_5,
+                Photo.comment_count,
+                comment_changed,
+                tags_changed,
+                tag_count,
+            )
+            .filter(Photo.id == photo_id)
+            .first()
+        )
+        if row is None:
+            return None
+        return tuple(row)
+
     async def update_photo(
         self, photo_id: int, photo_data: PhotoUpdateOut, user_id: int
     ) -> Optional[PhotoOut]:
@@ -62,6 +173,8 @@ class PhotoRepository:
             tags = self.db.query(Tag).filter(Tag.id.in_(photo_data.tags)).all()
             existing_photo.description = photo_data.description
             existing_photo.tags = tags
+            # tag changes alone do not touch the photos row
+            existing_photo.updated_at = func.now()
             self.db.commit()
             return existing_photo
         return None
@@ -71,6 +184,25 @@ class PhotoRepository:
         if not existing_photo:
             return None
         existing_photo.image_url_transform = url
+        existing_photo.updated_at = func.now()
+        self.db.commit()
+        return existing_photo
+
+    async def update_photo_variants(
+        self, photo_id: int, variants: dict[str, dict[str, str]]
+    ) -> Optional[Photo]:
+        """
+        Store the URLs of the resized variants of a photo.
+
+        :param photo_id: The ID of the photo.
+        :param variants: Variant URLs by size and format.
+        :return: The updated Photo object if found, otherwise None.
+        """
+        existing_photo = await self.get_photo_by_id(photo_id)
+        if not existing_photo:
+            return None
+        existing_photo.variants = variants
+        existing_photo.updated_at = func.now()
         self.db.commit()
         return existing_photo
 
@@ -110,6 +242,7 @@ class PhotoRepository:
         avg_rating_above: str = None,
         avg_rating_below: str = None,
         user_id: int = None,
+        sort: PhotoSort = None,
     ) -> List[PhotoOut]:
         """
         Filter photos by various criteria.
@@ -118,8 +251,32 @@ class PhotoRepository:
         :param min_rating: The minimum rating to filter by.
         :param start_date: The start date to filter by.
         :param end_date: The end date to filter by.
+        :param sort: Newest or most commented photos first, unordered if None.
         :return: A list of Photo objects matching the filter criteria.
         """
+        query = self._search_query(
+            keyword,
+            created_after,
+            created_before,
+            avg_rating_above,
+            avg_rating_below,
+            user_id,
+        )
+        if sort == PhotoSort.newest:
+            query = query.order_by(Photo.created_at.desc(), Photo.id.desc())
+        elif sort == PhotoSort.most_commented:
+            query = query.order_by(Photo.comment_count.desc(), Photo.id.desc())
+        return query.all()
+
+    def _search_query(
+        self,
+        keyword: str = None,
+        created_after: str = None,
+        created_before: str = None,
+        avg_rating_above: str = None,
+        avg_rating_below: str = None,
+        user_id: int = None,
+    ):
         word = f"%{keyword}%"
 
         query = self.db.query(Photo)
@@ -145,4 +302,96 @@ class PhotoRepository:
             )
         if user_id:
             query = query.filter(Photo.user_id == user_id)
-        return query.all()
+        return query
+
+    async def get_photo_facets(
+        self,
+        keyword: str = None,
+        created_after: str = None,
+        created_before: str = None,
+        avg_rating_above: str = None,
+        avg_rating_below: str = None,
+        user_id: int = None,
+        tag_limit: int = 10,
+    ) -> dict[str, list[dict]]:
+        """
+        Count the photos matching the search criteria by tag, average rating
+        and upload month.
+
+        All facets come from a single UNION ALL query over one CTE with the
+        search predicate of get_photos.
+
+        :param tag_limit: Number of most frequent tags returned.
+        :return: Lists of {"value", "count"} under "tags" (most frequent first),
+            "ratings" (average rating bucket "1" to "5" or "unrated") and
+            "months" ("YYYY-MM").
+        """
+        matching = (
+            self._search_query(
+                keyword,
+                created_after,
+                created_before,
+                avg_rating_above,
+                avg_rating_below,
+                user_id,
+            )
+            .with_entities(Photo.id.label("id"), Photo.created_at.label("created_at"))
+            .cte("matching")
+        )
+
+        tag_counts = (
+            select(Tag.name.label("value"), func.count().label("count"))
+            .select_from(matching)
+            .join(photo_m2m_tag, photo_m2m_tag.c.photo_id == matching.c.id)
+            .join(Tag, Tag.id == photo_m2m_tag.c.tag_id)
+            .group_by(Tag.name)
+            .order_by(func.count().desc(), Tag.name)
+            .limit(tag_limit)
+            .subquery()
+        )
+        tags = select(
+            literal("tags").label("facet"), tag_counts.c.value, tag_counts.c.count
+        )
+
+        averages = (
+            select(func.avg(Rating.rating).label("average"))
+            .select_from(matching)
+            .outerjoin(Rating, Rating.photo_id == matching.c.id)
+            .group_by(matching.c.id)
+            .subquery()
+        )
+        # thresholds rather than FLOOR, which SQLite may lack
+        bucket = case(
+            (averages.c.average.is_(None), "unrated"),
+            (averages.c.average >= 5, "5"),
+            (averages.c.average >= 4, "4"),
+            (averages.c.average >= 3, "3"),
+            (averages.c.average >= 2, "2"),
+            else_="1",
+        )
+        ratings = select(
+            literal("ratings").label("facet"), bucket.label("value"), func.count()
+        ).group_by(bucket)
+
+        month = cast(
+            cast(
+                extract("year", matching.c.created_at) * 100
+                + extract("month", matching.c.created_at),
+                Integer,
+            ),
+            String,
+        )
+        months = select(
+            literal("months").label("facet"), month.label("value"), func.count()
+        ).group_by(month)
+
+        rows = self.db.execute(tags.union_all(ratings, months)).all()
+        facets: dict[str, list[dict]] = {"tags": [], "ratings": [], "months": []}
+        for facet, value, count in rows:
+            if facet == "months":
+                value = f"{value[:4]}-{value[4:]}"
+            facets[facet].append({"value": value, "count": count})
+        facets["tags"].sort(key=lambda item: (-item["count"], item["value"]))
+        facets["ratings"].sort(key=lambda item: item["value"])
+        facets["months"].sort(key=lambda item: item["value"])
+        return facets
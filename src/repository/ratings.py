@@ -1,12 +1,28 @@
 from typing import Optional
+from sqlalchemy import Integer, Row, column, literal, select, values
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import Session
-from src.database.models import Rating
+from src.database.models import Photo, Rating
 from src.schemas.users import RoleEnum
+from src.services.photo_events import PhotoEventHub
 
 
 class RatingRepository:
-    def __init__(self, db_session: Session) -> None:
+    def __init__(
+        self, db_session: Session, events: Optional[PhotoEventHub] = None
+    ) -> None:
         self._db = db_session
+        self._events = events
+
+    async def _publish(self, rating, event: str) -> None:
+        if self._events is not None:
+            data = {
+                "id": rating.id,
+                "photo_id": rating.photo_id,
+                "user_id": rating.user_id,
+                "rating": rating.rating,
+            }
+            await self._events.publish(rating.photo_id, event, data)
 
     async def create_rating(self, photo_id: int, user_id: int, rating: int):
         """
@@ -25,8 +41,78 @@ class RatingRepository:
         self._db.add(new_rating)
         self._db.commit()
         self._db.refresh(new_rating)
+        await self._publish(new_rating, "rating.updated")
         return new_rating
 
+    async def upsert_rating(
+        self, photo_id: int, user_id: int, rating: int
+    ) -> Optional[Row]:
+        """
+        Rate a photo, replacing an earlier rating of the same user.
+
+        A single INSERT ... SELECT ... ON CONFLICT DO UPDATE RETURNING
+        statement: the SELECT yields nothing when the photo does not exist
+        or belongs to the user, and the unique (photo_id, user_id)
+        constraint turns concurrent ratings by one user into updates.
+
+        :param photo_id: Photo ID.
+        :param user_id: The ID of the user who is rating.
+        :param rating: The rating value (from 1 to 5 stars).
+        :return: The stored rating (id, photo_id, user_id, rating), None if
+            the photo does not exist or belongs to the user.
+        """
+        source = select(Photo.id, literal(user_id), literal(rating)).where(
+            Photo.id == photo_id, Photo.user_id != user_id
+        )
+        statement = insert(Rating).from_select(
+            ["photo_id", "user_id", "rating"], source
+        )
+        statement = statement.on_conflict_do_update(
+            index_elements=[Rating.photo_id, Rating.user_id],
+            set_={"rating": statement.excluded.rating},
+        ).returning(Rating.id, Rating.photo_id, Rating.user_id, Rating.rating)
+        stored = self._db.execute(statement).first()
+        self._db.commit()
+        if stored is not None:
+            await self._publish(stored, "rating.updated")
+        return stored
+
+    async def upsert_ratings(self, ratings: list[tuple[int, int, int]]) -> int:
+        """
+        Store a batch of ratings with one multi-row upsert and one commit.
+
+        Ratings of photos that do not exist or belong to the rating user are
+        skipped. A user may appear only once per photo in the batch.
+
+        :param ratings: (photo ID, user ID, rating) triples.
+        :return: Number of inserted or updated ratings.
+        """
+        if not ratings:
+            return 0
+        batch = values(
+            column("photo_id", Integer),
+            column("user_id", Integer),
+            column("rating", Integer),
+            name="batch",
+        ).data(ratings)
+        source = (
+            select(batch.c.photo_id, batch.c.user_id, batch.c.rating)
+            .join(Photo, Photo.id == batch.c.photo_id)
+            .where(Photo.user_id != batch.c.user_id)
+        )
+        statement = insert(Rating).from_select(
+            ["photo_id", "user_id", "rating"], source
+        )
+        statement = statement.on_conflict_do_update(
+            index_elements=[Rating.photo_id, Rating.user_id],
+            set_={"rating": statement.excluded.rating},
+        ).returning(Rating.id, Rating.photo_id, Rating.user_id, Rating.rating)
+        stored = self._db.execute(statement).all()
+        self._db.commit()
+        for rating in stored:
+            await self._publish(rating, "rating.updated")
+        return len(stored)
+
     async def delete_rating(
         self, rating_id: int, user_role: RoleEnum, user_id: int
     ) -> bool:
@@ -43,6 +129,7 @@ class RatingRepository:
             if rating:
                 self._db.delete(rating)
                 self._db.commit()
+                await self._publish(rating, "rating.deleted")
                 return True
         else:
             rating = (
@@ -53,6 +140,7 @@ class RatingRepository:
             if rating:
                 self._db.delete(rating)
                 self._db.commit()
+                await self._publish(rating, "rating.deleted")
                 return True
         return False
 
@@ -1,6 +1,7 @@
 from typing import Optional
+from sqlalchemy import func
 from sqlalchemy.orm import Session
-from src.database.models import Tag
+from src.database.models import Tag, photo_m2m_tag
 
 
 class TagRepository:
@@ -18,6 +19,62 @@ class TagRepository:
         """
         return self._db.query(Tag).offset(skip).limit(limit).all()
 
+    async def get_tags_version(self) -> tuple:
+        """
+        Retrieve the values that change whenever the tag list changes.
+
+        :return: A tuple of the tag count and the latest modification time.
+        """
+        row = self._db.query(func.count(Tag.id), func.max(Tag.updated_at)).first()
+        return tuple(row)
+
+    async def get_tags_by_ids(self, tag_ids: list[int]) -> list[Tag]:
+        """
+        Retrieve tags by their IDs, keeping the order of the given IDs.
+
+        :param tag_ids: The IDs of the tags to retrieve.
+        :return: A list of Tag objects; IDs that no longer exist are skipped.
+        """
+        if not tag_ids:
+            return []
+        tags = self._db.query(Tag).filter(Tag.id.in_(tag_ids)).all()
+        tags_by_id = {tag.id: tag for tag in tags}
+        return [tags_by_id[id] for id in tag_ids if id in tags_by_id]
+
+    async def get_tags_for_photos(self, photo_ids: list[int]) -> dict[int, list[Tag]]:
+        """
+        Retrieve the tags of many photos with a single query.
+
+        :param photo_ids: The IDs of the photos.
+        :return: Tags by photo ID; photos without tags map to an empty list.
+        """
+        tags = {photo_id: [] for photo_id in photo_ids}
+        if not photo_ids:
+            return tags
+        rows = (
+            self._db.query(photo_m2m_tag.c.photo_id, Tag)
+            .join(Tag, Tag.id == photo_m2m_tag.c.tag_id)
+            .filter(photo_m2m_tag.c.photo_id.in_(photo_ids))
+            .order_by(photo_m2m_tag.c.photo_id, Tag.id)
+            .all()
+        )
+        for photo_id, tag in rows:
+            tags[photo_id].append(tag)
+        return tags
+
+    async def get_photo_tag_ids(self) -> list[tuple[int, int]]:
+        """
+        Retrieve all photo-tag assignments.
+
+        :return: (photo ID, tag ID) pairs ordered by photo ID.
+        """
+        rows = (
+            self._db.query(photo_m2m_tag.c.photo_id, photo_m2m_tag.c.tag_id)
+            .order_by(photo_m2m_tag.c.photo_id)
+            .all()
+        )
+        return [(photo_id, tag_id) for photo_id, tag_id in rows]
+
     async def get_tag_by_id(self, tag_id: int) -> Tag:
         """
         Retrieve a tag by its ID.
@@ -88,6 +88,20 @@ class UserRepository(AbstractUserRepository):
         self._session.refresh(user)
         return user
 
+    async def update_password(self, user: User, hashed_password: str) -> None:
+        """
+        Replace the stored password hash of a user, e.g. after a bcrypt cost change.
+
+        :param user: The user object representing the user to update.
+        :type user: User
+        :param hashed_password: The new password hash.
+        :type hashed_password: str
+
+        :return: None
+        """
+        user.password = hashed_password
+        self._session.commit()
+
     async def update_token(self, user: User, token: str | None) -> None:
         """
         Update the refresh token for a user in the repository for authentication.
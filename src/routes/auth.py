@@ -5,13 +5,19 @@ from fastapi.security import (
     HTTPBearer,
 )
 from fastapi.requests import Request
+from dataclasses import asdict
 from src.repository.abstract import AbstractUserRepository
-from dependencies import get_users_repository, get_password_handler
+from dependencies import (
+    get_users_repository,
+    get_password_hash_pool,
+    get_coalescing_cache,
+)
 
-from src.schemas.users import UserIn, UserOut, Token
+from src.schemas.users import UserIn, UserOut, Token, RoleEnum
 from src.services.auth import auth_service
-from src.services.auth_user import get_current_user
-from src.services.pwd_handler import AbstractPasswordHashHandler
+from src.services.auth_user import get_current_user, user_cache_key
+from src.services.pwd_handler import PasswordHashPool
+from src.services.single_flight import CoalescingCache
 
 
 router = APIRouter(prefix="/auth", tags=["auth"])
@@ -25,7 +31,7 @@ async def signup(
     request: Request,
     # current_user: UserOut = Depends(get_current_user),
     users_repository: AbstractUserRepository = Depends(get_users_repository),
-    pwd_handler: AbstractPasswordHashHandler = Depends(get_password_handler),
+    pwd_pool: PasswordHashPool = Depends(get_password_hash_pool),
 ) -> UserOut:
     """
     Endpoint to register a new user.
@@ -42,8 +48,8 @@ async def signup(
     :param users_repository: The repository for user data.
     :type users_repository: AbstractUserRepository
 
-    :param pwd_handler: The password hashing handler.
-    :type pwd_handler: AbstractPasswordHashHandler
+    :param pwd_pool: The process pool running password hashing.
+    :type pwd_pool: PasswordHashPool
 
     :return: The registered user details.
     :rtype: UserOut
@@ -57,7 +63,7 @@ async def signup(
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT, detail="Account already exists"
         )
-    new_user.password = pwd_handler.get_password_hash(new_user.password)
+    new_user.password = await pwd_pool.get_password_hash(new_user.password)
     new_user = await users_repository.create_user(new_user)
 
     return new_user
@@ -67,7 +73,8 @@ async def signup(
 async def login(
     login_form: OAuth2PasswordRequestForm = Depends(),
     users_repository: AbstractUserRepository = Depends(get_users_repository),
-    pwd_handler: AbstractPasswordHashHandler = Depends(get_password_handler),
+    pwd_pool: PasswordHashPool = Depends(get_password_hash_pool),
+    cache: CoalescingCache = Depends(get_coalescing_cache),
 ) -> Token:
     """
     Endpoint for user login.
@@ -78,8 +85,11 @@ async def login(
     :param users_repository: The repository for user data.
     :type users_repository: AbstractUserRepository
 
-    :param pwd_handler: The password hashing handler.
-    :type pwd_handler: AbstractPasswordHashHandler
+    :param pwd_pool: The process pool running password hashing.
+    :type pwd_pool: PasswordHashPool
+
+    :param cache: Redis cache of the users, refreshed when the password hash changes.
+    :type cache: CoalescingCache
 
     :param auth_service: The JWT handling service.
     :type auth_service: HandleJWT
@@ -97,10 +107,16 @@ async def login(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid email"
         )
 
-    if not pwd_handler.verify_password(login_form.password, user.password):
+    if not await pwd_pool.verify_password(login_form.password, user.password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid password"
         )
+    # upgrade (or downgrade) hashes created with a previous bcrypt cost
+    if pwd_pool.needs_rehash(user.password):
+        new_hash = await pwd_pool.get_password_hash(login_form.password)
+        await users_repository.update_password(user, new_hash)
+        # the cached user still carries the old hash
+        await cache.invalidate(user_cache_key(user.email))
     # Generate JWT
     payload = {"sub": user.email}
     access_token = await auth_service.create_access_token(data=payload)
@@ -144,3 +160,30 @@ async def refresh_token(
     refresh_token = await auth_service.create_refresh_token(data=payload)
     await users_repository.update_token(user, refresh_token)
     return Token(access_token=access_token, refresh_token=refresh_token)
+
+
+@router.get("/password_pool")
+async def password_pool_stats(
+    current_user: UserOut = Depends(get_current_user),
+    pwd_pool: PasswordHashPool = Depends(get_password_hash_pool),
+) -> dict:
+    """
+    Endpoint exposing timing metrics of the password hashing pool of this worker.
+
+    :param current_user: The current authenticated user.
+    :type current_user: UserOut
+
+    :param pwd_pool: The process pool running password hashing.
+    :type pwd_pool: PasswordHashPool
+
+    :return: Call counts, run and queue wait times per operation, pending and rejected calls.
+    :rtype: dict
+
+    :raises HTTPException 403: If the user is not an administrator.
+    """
+    if current_user.role != RoleEnum.admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admin can perform this operation.",
+        )
+    return {"pending": pwd_pool.pending, **asdict(pwd_pool.stats)}
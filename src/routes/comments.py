@@ -1,12 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from src.schemas.users import RoleEnum, UserOut
 from src.schemas.comments import CommentIn, CommentOut, CommentUpdate
 from src.repository.comments import CommentsRepository
 from src.services.auth_user import get_current_user
-from dependencies import get_comments_repository
+from src.services.search_cache import PhotoSearchCache
+from dependencies import get_comments_repository, get_photo_search_cache
 
 router = APIRouter(prefix="/comments", tags=["comments"])
 
+# most photos whose comments can be fetched with one request
+LATEST_COMMENTS_MAX_PHOTOS = 100
+
 
 @router.get("", status_code=200)
 async def get_comments_for_photo(
@@ -21,13 +25,39 @@ async def get_comments_for_photo(
     return comments
 
 
+@router.get("/latest", status_code=200)
+async def get_latest_comments_for_photos(
+    photo_ids: list[int] = Query(...),
+    limit: int = Query(default=3, ge=1, le=50),
+    comments_repo: CommentsRepository = Depends(get_comments_repository),
+    current_user: UserOut = Depends(get_current_user),
+) -> dict[int, list[CommentOut]]:
+    """
+    Return the latest comments of many photos, e.g. for a gallery page.
+
+    :param photo_ids: Photo IDs, repeated: ?photo_ids=1&photo_ids=2.
+    :param limit: Maximum number of comments per photo.
+    :return: Comments by photo ID, newest first.
+    """
+    if len(photo_ids) > LATEST_COMMENTS_MAX_PHOTOS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {LATEST_COMMENTS_MAX_PHOTOS} photos can be requested.",
+        )
+    return await comments_repo.get_latest_comments_for_photos(photo_ids, limit)
+
+
 @router.post("", status_code=201)
 async def create_comment(
     new_comment: CommentIn,
     comments_repo: CommentsRepository = Depends(get_comments_repository),
     current_user: UserOut = Depends(get_current_user),
+    search_cache: PhotoSearchCache = Depends(get_photo_search_cache),
 ) -> CommentOut:
-    return await comments_repo.create_comment(new_comment, current_user.id)
+    comment = await comments_repo.create_comment(new_comment, current_user.id)
+    # photos may be sorted by their number of comments
+    await search_cache.invalidate_comment_counts()
+    return comment
 
 
 @router.put("/{comment_id}", status_code=200)
@@ -58,6 +88,7 @@ async def delete_comment(
     comment_id: int,
     comments_repo: CommentsRepository = Depends(get_comments_repository),
     current_user: UserOut = Depends(get_current_user),
+    search_cache: PhotoSearchCache = Depends(get_photo_search_cache),
 ) -> CommentOut:
     if current_user.role not in [RoleEnum.admin, RoleEnum.mod]:
         raise HTTPException(
@@ -69,4 +100,5 @@ async def delete_comment(
         raise HTTPException(status_code=404, detail="No comment found.")
 
     await comments_repo.delete_comment(comment_id)
+    await search_cache.invalidate_comment_counts()
     return comment
@@ -1,46 +1,129 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+import asyncio
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from PIL import Image
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    UploadFile,
+    File,
+    Query,
+    Request,
+    Response,
+)
 from src.schemas.photo import (
+    ImageSize,
     PhotoCreate,
+    PhotoDirectIn,
     PhotoIn,
     PhotoOut,
+    PhotoSearchOut,
+    PhotoSort,
+    PhotoSummaryOut,
     PhotoUpdateIn,
     PhotoUpdateOut,
+    QRCodeFormat,
     TransformationInput,
+    UploadSignatureOut,
 )
 from dependencies import (
     get_image_provider,
     get_tags_repository,
     get_photos_repository,
+    get_photo_search_cache,
+    get_qr_code_cache,
+    get_coalescing_cache,
+    get_job_queue,
+    get_photo_events,
+    get_request_loaders,
+    get_similar_photo_index,
+    get_tag_cooccurrence,
+    get_tag_photo_index,
     PhotoRepository,
 )
 from src.schemas.users import UserOut, RoleEnum
 from src.services.auth_user import get_current_user
-from src.services.image_provider import (
-    AbstractImageProvider,
-    CloudinaryImageProvider,
+from src.services.batch_loader import RequestLoaders
+from src.services.image_provider import AbstractImageProvider
+from src.services.etag import make_etag, etag_matches, not_modified
+from src.services.search_cache import PhotoSearchCache
+from src.services.qr_codes import QRCodeCache, QR_CODE_MEDIA_TYPES
+from src.services.single_flight import CoalescingCache
+from src.services.job_queue import JobQueue
+from src.services.photo_events import PhotoEventHub
+from src.services.similarity import (
+    SimilarPhotoIndex,
+    perceptual_hash,
+    to_signed,
+    to_unsigned,
 )
+from src.services.related_photos import TagPhotoIndex
+from src.services.tag_suggestions import TagCooccurrence
+from src.services.upload_validation import hash_file
+from src.services.variants import select_variant
+from src.config import settings
 from src.repository.tags import TagRepository
-import io
-import qrcode
-from fastapi.responses import StreamingResponse
 
 router = APIRouter(prefix="/photos", tags=["photos"])
 
+# clients may keep a copy but must revalidate it with If-None-Match
+PHOTO_CACHE_CONTROL = "private, no-cache"
+
+# number of tags suggested for a newly created photo
+SUGGESTED_TAGS_LIMIT = 5
+
+# number of most frequent tags in the search facets
+FACET_TAGS_LIMIT = 10
+
+
+async def resolve_tag_ids(
+    tag_names: list[str] | None, tags_repository: TagRepository
+) -> list[int]:
+    """
+    Get IDs of the named tags, creating the tags that do not exist yet.
+
+    :param tag_names: Names of the tags.
+    :param tags_repository: The repository for tag data.
+    :return: IDs of the tags.
+    """
+    tag_ids = []
+    for tag_name in tag_names or []:
+        tag = await tags_repository.get_tag_by_name(tag_name)
+        if tag is None:
+            tag = await tags_repository.create_tag(tag_name)
+        tag_ids.append(tag.id)
+    return tag_ids
+
 
 @router.post(
     "/", response_model=PhotoOut, status_code=201, summary="Create a new photo"
 )
 async def create_photo(
     photo_data: PhotoIn,
+    request: Request,
     file: UploadFile = File(),
     current_user: UserOut = Depends(get_current_user),
     photos_repository: PhotoRepository = Depends(get_photos_repository),
-    image_provider: CloudinaryImageProvider = Depends(get_image_provider),
+    image_provider: AbstractImageProvider = Depends(get_image_provider),
     tags_repository: TagRepository = Depends(get_tags_repository),
+    search_cache: PhotoSearchCache = Depends(get_photo_search_cache),
+    job_queue: JobQueue = Depends(get_job_queue),
+    similar_index: SimilarPhotoIndex = Depends(get_similar_photo_index),
+    cooccurrence: TagCooccurrence = Depends(get_tag_cooccurrence),
+    tag_index: TagPhotoIndex = Depends(get_tag_photo_index),
 ):
     """
     Create a new photo.
 
+    A file that was uploaded before is not uploaded again: the new photo
+    reuses the stored image (and its variants) of the earlier photo with the
+    same SHA-256. Otherwise the resized variants of the image are generated
+    by the background worker.
+
+    The response suggests further tags in suggested_tags: those that most
+    often accompany the photo's tags on other photos.
+
     :param photo_data: Data of the photo to create.
 
     :param current_user: The current authenticated user.
@@ -49,53 +132,222 @@ async def create_photo(
     """
     if not current_user:
         raise HTTPException(status_code=401, detail="Unauthorized.")
-    photo_tags = []
-    for tag_name in photo_data.tags:
-        tag = await tags_repository.get_tag_by_name(tag_name)
-        if tag is None:
-            tag = await tags_repository.create_tag(tag_name)
-        photo_tags.append(tag.id)
-    (photo_url, public_id) = image_provider.upload(file, current_user)
+    # computed by UploadValidationMiddleware while the file was received
+    content_hash = getattr(request.state, "upload_digests", {}).get("file")
+    if content_hash is None:
+        content_hash = await run_in_threadpool(hash_file, file.file)
+    original = await photos_repository.get_photo_by_content_hash(content_hash)
+
+    if original is not None:
+        photo_tags = await resolve_tag_ids(photo_data.tags, tags_repository)
+        (photo_url, public_id) = (original.image_url, original.cloudinary_public_id)
+        phash = original.phash
+    else:
+        # read the file before the upload thread starts reading it
+        try:
+            phash = to_signed(await run_in_threadpool(perceptual_hash, file.file))
+        except Image.DecompressionBombError:
+            raise HTTPException(
+                status_code=400, detail="Uploaded image has too many pixels."
+            )
+        except OSError:
+            raise HTTPException(
+                status_code=415, detail="Uploaded file is not a readable image."
+            )
+        # the upload runs in a worker thread while the tags are resolved
+        upload = asyncio.create_task(image_provider.upload_async(file, current_user))
+        try:
+            photo_tags = await resolve_tag_ids(photo_data.tags, tags_repository)
+        except Exception:
+            # do not leave an uploaded image without a photo
+            (_, public_id) = await upload
+            await job_queue.enqueue("delete_image", public_id=public_id)
+            raise
+        (photo_url, public_id) = await upload
     data = PhotoCreate(
         description=photo_data.description,
         tags=photo_tags,
         image_url=photo_url,
         cloudinary_public_id=public_id,
+        content_hash=content_hash,
+        phash=phash,
+        variants=original.variants if original is not None else None,
     )
     new_photo = await photos_repository.create_photo(data, current_user.id)
+    await search_cache.invalidate()
+    if phash is not None:
+        similar_index.add(new_photo.id, to_unsigned(phash))
+    cooccurrence.add_photo(photo_tags)
+    await tag_index.publish(new_photo.id, photo_tags)
+    if new_photo.variants is None:
+        await job_queue.enqueue(
+            "generate_variants", photo_id=new_photo.id, public_id=public_id
+        )
+    photo_out = PhotoOut.model_validate(new_photo)
+    if photo_tags:
+        photo_out.suggested_tags = await cooccurrence.suggest_tags(
+            tags_repository, photo_tags, SUGGESTED_TAGS_LIMIT
+        )
+    return photo_out
+
+
+@router.post(
+    "/upload_signature",
+    response_model=UploadSignatureOut,
+    summary="Get signed parameters for a direct upload",
+)
+async def get_upload_signature(
+    current_user: UserOut = Depends(get_current_user),
+    image_provider: AbstractImageProvider = Depends(get_image_provider),
+):
+    """
+    Get signed parameters for uploading an image straight to the image provider.
+
+    The client sends the file together with the returned fields to upload_url
+    and then passes the provider's response to POST /photos/direct.
+
+    :param current_user: The current authenticated user.
+
+    :return: Upload URL and form fields.
+    """
+    return image_provider.sign_upload(current_user)
+
+
+@router.post(
+    "/direct",
+    response_model=PhotoOut,
+    status_code=201,
+    summary="Create a photo from a direct upload",
+)
+async def create_photo_from_direct_upload(
+    photo_data: PhotoDirectIn,
+    current_user: UserOut = Depends(get_current_user),
+    photos_repository: PhotoRepository = Depends(get_photos_repository),
+    image_provider: AbstractImageProvider = Depends(get_image_provider),
+    tags_repository: TagRepository = Depends(get_tags_repository),
+    search_cache: PhotoSearchCache = Depends(get_photo_search_cache),
+    job_queue: JobQueue = Depends(get_job_queue),
+    cooccurrence: TagCooccurrence = Depends(get_tag_cooccurrence),
+    tag_index: TagPhotoIndex = Depends(get_tag_photo_index),
+):
+    """
+    Create a photo from an image uploaded straight to the image provider.
+
+    Only images uploaded with parameters issued to the current user are
+    accepted. The image is never read by the application, so the photo gets
+    no content hash or perceptual hash: it is not deduplicated against other
+    uploads and does not take part in the similar photo search.
+
+    :param photo_data: Data of the photo and the provider's upload response.
+
+    :param current_user: The current authenticated user.
+
+    :return: Created photo.
+    """
+    upload = photo_data.upload
+    try:
+        photo_url = image_provider.verify_upload(
+            current_user, upload.public_id, upload.version, upload.signature
+        )
+    except ValueError as err:
+        raise HTTPException(status_code=400, detail=str(err))
+    photo_tags = await resolve_tag_ids(photo_data.tags, tags_repository)
+    data = PhotoCreate(
+        description=photo_data.description,
+        tags=photo_tags,
+        image_url=photo_url,
+        cloudinary_public_id=upload.public_id,
+    )
+    new_photo = await photos_repository.create_photo(data, current_user.id)
+    await search_cache.invalidate()
+    cooccurrence.add_photo(photo_tags)
+    await tag_index.publish(new_photo.id, photo_tags)
+    await job_queue.enqueue(
+        "generate_variants", photo_id=new_photo.id, public_id=upload.public_id
+    )
     return new_photo
 
 
 @router.get("/{photo_id}", response_model=PhotoOut, summary="Get a photo by ID")
 async def get_photo_by_id(
     photo_id: int,
+    request: Request,
     qr_code: bool = False,
+    qr_size: int | None = Query(default=None, ge=64, le=2048),
+    qr_format: QRCodeFormat = QRCodeFormat.png,
+    size: ImageSize | None = None,
+    webp: bool = False,
     photos_repository: PhotoRepository = Depends(get_photos_repository),
     current_user: UserOut = Depends(get_current_user),
+    qr_cache: QRCodeCache = Depends(get_qr_code_cache),
+    cache: CoalescingCache = Depends(get_coalescing_cache),
 ):
     """
     Get a photo by ID.
 
+    Supports conditional requests: when If-None-Match carries the current ETag
+    the endpoint answers 304 without loading the photo. Serialized photos are
+    cached per version and concurrent misses share a single load.
+
     :param photo_id: ID of the photo to retrieve.
 
-    :return: Retrieved photo.
-    """
+    :param qr_code: Return a QR code linking to the photo instead of its data.
 
-    photo = await photos_repository.get_photo_by_id(photo_id)
-    if not photo:
-        raise HTTPException(status_code=404, detail="Photo not found.")
+    :param qr_size: Approximate QR code width in pixels.
 
+    :param qr_format: QR code image format, "png" or "svg".
+
+    :param size: Size variant returned in display_url: "thumb", "small", "medium" or "large".
+
+    :param webp: Return the WebP version of the size variant.
+
+    :return: Retrieved photo.
+    """
     if qr_code:
-        url = photo.image_url
-        if photo.image_url_transform:
-            url = photo.image_url_transform
-        img = qrcode.make(url)
-        buf = io.BytesIO()
-        img.save(buf)
-        buf.seek(0)  # important here!
-        return StreamingResponse(buf, media_type="image/jpeg")
+        photo = await photos_repository.get_photo_by_id(photo_id)
+        if not photo:
+            raise HTTPException(status_code=404, detail="Photo not found.")
+        url = photo.image_url_transform or photo.image_url
+        etag = make_etag("qr", url, qr_size, qr_format.value)
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return not_modified(etag, PHOTO_CACHE_CONTROL)
+        image = await qr_cache.get_or_render(url, qr_size, qr_format)
+        return Response(
+            content=image,
+            media_type=QR_CODE_MEDIA_TYPES[qr_format],
+            headers={"ETag": etag, "Cache-Control": PHOTO_CACHE_CONTROL},
+        )
 
-    return photo
+    version = await photos_repository.get_photo_version(photo_id)
+    if version is None:
+        raise HTTPException(status_code=404, detail="Photo not found.")
+    etag = make_etag("photo", photo_id, *version, size, webp)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag, PHOTO_CACHE_CONTROL)
+
+    async def load_photo() -> bytes | None:
+        photo = await photos_repository.get_photo_by_id(photo_id)
+        if photo is None:
+            return None
+        return PhotoOut.model_validate(photo).model_dump_json().encode("utf-8")
+
+    # keyed by version, so a cached body is never stale
+    version_key = make_etag(*version).strip('"')
+    body = await cache.get_or_load(
+        f"photo:{photo_id}:{version_key}",
+        load_photo,
+        ttl=settings.photo_cache_ttl,
+    )
+    if body is None:
+        raise HTTPException(status_code=404, detail="Photo not found.")
+    if size is not None:
+        photo = select_variant(PhotoOut.model_validate_json(body), size, webp)
+        body = photo.model_dump_json().encode("utf-8")
+    return Response(
+        content=body,
+        media_type="application/json",
+        headers={"ETag": etag, "Cache-Control": PHOTO_CACHE_CONTROL},
+    )
 
 
 @router.put("/{photo_id}", response_model=PhotoOut, summary="Update a photo by ID")
@@ -105,6 +357,9 @@ async def update_photo(
     current_user: UserOut = Depends(get_current_user),
     photos_repository: PhotoRepository = Depends(get_photos_repository),
     tags_repository: TagRepository = Depends(get_tags_repository),
+    search_cache: PhotoSearchCache = Depends(get_photo_search_cache),
+    cooccurrence: TagCooccurrence = Depends(get_tag_cooccurrence),
+    tag_index: TagPhotoIndex = Depends(get_tag_photo_index),
 ):
     """
     Update a photo by ID.
@@ -119,12 +374,10 @@ async def update_photo(
     """
     if not current_user:
         raise HTTPException(status_code=401, detail="Unauthorized")
-    photo_tags = []
-    for tag_name in photo_data.tags:
-        tag = await tags_repository.get_tag_by_name(tag_name)
-        if tag is None:
-            tag = await tags_repository.create_tag(tag_name)
-        photo_tags.append(tag.id)
+    photo_tags = await resolve_tag_ids(photo_data.tags, tags_repository)
+    photo = await photos_repository.get_photo_by_id(photo_id)
+    # read before the update replaces them
+    old_tags = [tag.id for tag in photo.tags] if photo else []
     data = PhotoUpdateOut(
         description=photo_data.description,
         tags=photo_tags,
@@ -134,6 +387,10 @@ async def update_photo(
     )
     if not updated_photo:
         raise HTTPException(status_code=404, detail="Photo not found.")
+    await search_cache.invalidate()
+    cooccurrence.remove_photo(old_tags)
+    cooccurrence.add_photo(photo_tags)
+    await tag_index.publish(photo_id, photo_tags)
     return updated_photo
 
 
@@ -142,11 +399,18 @@ async def delete_photo(
     photo_id: int,
     current_user: UserOut = Depends(get_current_user),
     photos_repository: PhotoRepository = Depends(get_photos_repository),
-    image_provider: AbstractImageProvider = Depends(get_image_provider),
+    search_cache: PhotoSearchCache = Depends(get_photo_search_cache),
+    qr_cache: QRCodeCache = Depends(get_qr_code_cache),
+    job_queue: JobQueue = Depends(get_job_queue),
+    similar_index: SimilarPhotoIndex = Depends(get_similar_photo_index),
+    cooccurrence: TagCooccurrence = Depends(get_tag_cooccurrence),
+    tag_index: TagPhotoIndex = Depends(get_tag_photo_index),
 ):
     """
     Delete a photo by ID.
 
+    The stored image is deleted by the background worker.
+
     :param photo_id: ID of the photo to delete.
 
     :param current_user: The current authenticated user.
@@ -157,23 +421,35 @@ async def delete_photo(
         raise HTTPException(status_code=401, detail="Unauthorized")
 
     photo = await photos_repository.get_photo_by_id(photo_id)
+    if photo is None:
+        raise HTTPException(status_code=404, detail="Photo not found.")
     if photo.user_id != current_user.id and current_user.role != RoleEnum.admin:
         raise HTTPException(
             status_code=403,
             detail="You can't delete another user's photo if you're not an administrator.",
         )
+    photo_tags = [tag.id for tag in photo.tags]
 
     deleted_photo = await photos_repository.delete_photo(photo_id, current_user.id)
 
     if not deleted_photo:
         raise HTTPException(status_code=404, detail="Photo not found.")
-    image_provider.delete(deleted_photo.cloudinary_public_id)
+    await search_cache.invalidate()
+    await qr_cache.invalidate(
+        deleted_photo.image_url_transform or deleted_photo.image_url
+    )
+    similar_index.remove(photo_id)
+    cooccurrence.remove_photo(photo_tags)
+    await tag_index.publish(photo_id, [])
+    await job_queue.enqueue(
+        "delete_image", public_id=deleted_photo.cloudinary_public_id
+    )
     return deleted_photo
 
 
 @router.get(
     "/",
-    response_model=list[PhotoOut],
+    response_model=list[PhotoSummaryOut] | PhotoSearchOut,
     summary="Display and/or search and/or filter photos by criteria.",
 )
 async def get_photos(
@@ -183,12 +459,23 @@ async def get_photos(
     avg_rating_above: str = None,
     avg_rating_below: str = None,
     user_id: int = None,
+    sort: PhotoSort | None = None,
+    size: ImageSize | None = None,
+    webp: bool = False,
+    facets: bool = False,
     current_user: UserOut = Depends(get_current_user),
     photos_repository: PhotoRepository = Depends(get_photos_repository),
+    search_cache: PhotoSearchCache = Depends(get_photo_search_cache),
+    loaders: RequestLoaders = Depends(get_request_loaders),
 ):
     """
     Display and/or search and/or filter photos by criteria.
 
+    Results are cached as ordered photo ID lists per normalized filter set.
+    With facets the photos are returned together with their counts by the
+    most frequent tags, average rating and upload month, computed in a
+    single aggregate query and cached the same way.
+
     :param keyword: The parameter allows you to search for photos by keyword in fields such as Tag and Description.
 
     :param created_after: The parameter allows you to search for photos created after the specified date.
@@ -201,6 +488,14 @@ async def get_photos(
 
     :param user_id: The parameter allows you to search for photos of a specific user.
 
+    :param sort: Order of the photos: "newest" or "most_commented" first.
+
+    :param size: Size variant returned in display_url: "thumb", "small", "medium" or "large".
+
+    :param webp: Return the WebP versions of the size variants.
+
+    :param facets: Return {"photos": [...], "facets": {...}} instead of the list of photos.
+
     :param current_user: The current authenticated user.
 
     :return: List of filtered photos.
@@ -211,19 +506,155 @@ async def get_photos(
             detail="Only administrators and moderators can search for photos by user_id.",
         )
 
-    photos = await photos_repository.get_photos(
-        keyword,
-        created_after,
-        created_before,
-        avg_rating_above,
-        avg_rating_below,
-        user_id,
+    filters = search_cache.normalize_filters(
+        keyword=keyword,
+        created_after=created_after,
+        created_before=created_before,
+        avg_rating_above=avg_rating_above,
+        avg_rating_below=avg_rating_below,
+        user_id=user_id,
     )
+    # the facets do not depend on the order of the photos
+    ordered_filters = search_cache.normalize_filters(**filters, sort=sort)
+    photo_ids, generation = await search_cache.lookup(ordered_filters)
+    if photo_ids is not None:
+        photos = await photos_repository.get_photos_by_ids(photo_ids)
+    else:
+        photos = await photos_repository.get_photos(
+            keyword,
+            created_after,
+            created_before,
+            avg_rating_above,
+            avg_rating_below,
+            user_id,
+            sort,
+        )
+        await search_cache.store(
+            ordered_filters, generation, [photo.id for photo in photos]
+        )
 
     if not photos:
         raise HTTPException(status_code=404, detail="No photos found.")
+    await loaders.attach_tags(photos)
+
+    if size is not None:
+        photos = [
+            select_variant(PhotoSummaryOut.model_validate(photo), size, webp)
+            for photo in photos
+        ]
+    if not facets:
+        return photos
+
+    counts, generation = await search_cache.lookup_facets(filters)
+    if counts is None:
+        counts = await photos_repository.get_photo_facets(
+            keyword,
+            created_after,
+            created_before,
+            avg_rating_above,
+            avg_rating_below,
+            user_id,
+            tag_limit=FACET_TAGS_LIMIT,
+        )
+        await search_cache.store_facets(filters, generation, counts)
+    return {"photos": photos, "facets": counts}
+
+
+@router.get(
+    "/{photo_id}/similar",
+    response_model=list[PhotoSummaryOut],
+    summary="Find photos similar to a photo",
+)
+async def get_similar_photos(
+    photo_id: int,
+    max_distance: int = Query(default=10, ge=0, le=32),
+    limit: int = Query(default=20, ge=1, le=100),
+    current_user: UserOut = Depends(get_current_user),
+    photos_repository: PhotoRepository = Depends(get_photos_repository),
+    similar_index: SimilarPhotoIndex = Depends(get_similar_photo_index),
+    loaders: RequestLoaders = Depends(get_request_loaders),
+):
+    """
+    Find photos that look like the given photo.
 
-    return photos
+    Photos are compared by the Hamming distance of their 64-bit perceptual
+    hashes, looked up in an in-memory BK-tree.
+
+    :param photo_id: ID of the photo to compare with.
+
+    :param max_distance: Number of differing hash bits up to which photos count as similar.
+
+    :param limit: Maximum number of returned photos.
+
+    :return: Similar photos, most similar first.
+    """
+    photo_ids = await similar_index.find_similar(
+        photos_repository, photo_id, max_distance, limit
+    )
+    if photo_ids is None:
+        raise HTTPException(status_code=404, detail="Photo not found.")
+    photos = await photos_repository.get_photos_by_ids(photo_ids)
+    return await loaders.attach_tags(photos)
+
+
+@router.get(
+    "/{photo_id}/related",
+    response_model=list[PhotoSummaryOut],
+    summary="Find photos sharing tags with a photo",
+)
+async def get_related_photos(
+    photo_id: int,
+    limit: int = Query(default=20, ge=1, le=100),
+    current_user: UserOut = Depends(get_current_user),
+    photos_repository: PhotoRepository = Depends(get_photos_repository),
+    tags_repository: TagRepository = Depends(get_tags_repository),
+    tag_index: TagPhotoIndex = Depends(get_tag_photo_index),
+    loaders: RequestLoaders = Depends(get_request_loaders),
+):
+    """
+    Find the photos that share the most tags with the given photo.
+
+    Served from an in-memory inverted index of tags to photos.
+
+    :param photo_id: ID of the photo to compare with.
+
+    :param limit: Maximum number of returned photos.
+
+    :return: Related photos, most shared tags first, newer photos first on ties.
+    """
+    photo_ids = await tag_index.find_related(tags_repository, photo_id, limit)
+    if not photo_ids and await photos_repository.get_photo_by_id(photo_id) is None:
+        raise HTTPException(status_code=404, detail="Photo not found.")
+    photos = await photos_repository.get_photos_by_ids(photo_ids)
+    return await loaders.attach_tags(photos)
+
+
+@router.get("/{photo_id}/events", summary="Stream comment and rating changes")
+async def get_photo_events_stream(
+    photo_id: int,
+    current_user: UserOut = Depends(get_current_user),
+    photos_repository: PhotoRepository = Depends(get_photos_repository),
+    events: PhotoEventHub = Depends(get_photo_events),
+):
+    """
+    Stream the changes of a photo's comments and ratings as Server-Sent Events.
+
+    Events are comment.created, comment.updated, comment.deleted (data is
+    the comment), rating.updated and rating.deleted (data is the rating).
+    The photo is looked up once when the stream opens; afterwards the
+    stream is fed from Redis without database queries.
+
+    :param photo_id: ID of the photo.
+
+    :return: text/event-stream response.
+    """
+    if await photos_repository.get_photo_by_id(photo_id) is None:
+        raise HTTPException(status_code=404, detail="Photo not found.")
+    return StreamingResponse(
+        events.stream(photo_id, keepalive=settings.photo_events_keepalive),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @router.post(
@@ -237,6 +668,7 @@ async def transform_photo(
     photos_repository: PhotoRepository = Depends(get_photos_repository),
     image_provider: AbstractImageProvider = Depends(get_image_provider),
     current_user: UserOut = Depends(get_current_user),
+    qr_cache: QRCodeCache = Depends(get_qr_code_cache),
 ) -> PhotoOut:
     """
     Apply transformation to a photo by ID.
@@ -254,6 +686,8 @@ async def transform_photo(
     gravity: "face"; automatic face detection
 
     radius: pixel or max; radius for corner rounding
+
+    fetch_format: "jpg", "png", "webp"; output format
     """
     photo = await photos_repository.get_photo_by_id(photo_id=photo_id)
     if not photo:
@@ -264,11 +698,19 @@ async def transform_photo(
             status_code=401, detail="You shall not change someone else's photo!"
         )
 
-    transformed_url = image_provider.transform(
-        public_id=photo.cloudinary_public_id, transform=trans_body
-    )
+    previous_url = photo.image_url_transform or photo.image_url
+    try:
+        transformed_url = await image_provider.transform_async(
+            public_id=photo.cloudinary_public_id, transform=trans_body
+        )
+    except (ValueError, Image.DecompressionBombError) as err:
+        raise HTTPException(status_code=400, detail=str(err))
+    except OSError:
+        raise HTTPException(status_code=415, detail="Image cannot be decoded.")
 
     trans_photo = await photos_repository.update_photo_trans_url(
         photo_id=photo_id, url=transformed_url
     )
+    if transformed_url != previous_url:
+        await qr_cache.invalidate(previous_url)
     return trans_photo
@@ -1,9 +1,18 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Response
 from src.repository.ratings import RatingRepository
-from dependencies import get_rating_repository, get_photos_repository, PhotoRepository
-from src.schemas.ratings import RatingOut
+from dependencies import (
+    get_rating_repository,
+    get_photos_repository,
+    get_photo_search_cache,
+    get_rating_buffer,
+    PhotoRepository,
+)
+from src.config import settings
+from src.schemas.ratings import RatingIn, RatingOut
 from src.services.auth_user import get_current_user
 from src.schemas.users import UserOut, RoleEnum
+from src.services.rating_buffer import RatingBuffer
+from src.services.search_cache import PhotoSearchCache
 
 router = APIRouter(prefix="/ratings", tags=["ratings"])
 
@@ -94,36 +103,50 @@ async def get_user_ratings(
     return existing_ratings
 
 
-@router.post("/", response_model=RatingOut)
+@router.post("/", response_model=RatingOut | RatingIn)
 async def create_rating(
     photo_id: int,
     rating: int,
+    response: Response,
     photos_repository: PhotoRepository = Depends(get_photos_repository),
     rating_repo: RatingRepository = Depends(get_rating_repository),
     current_user: UserOut = Depends(get_current_user),
+    search_cache: PhotoSearchCache = Depends(get_photo_search_cache),
+    rating_buffer: RatingBuffer = Depends(get_rating_buffer),
 ):
     """
-    Create a new rating for a photo.
-    """
-    if not await photos_repository.get_photo_by_id(photo_id):
-        raise HTTPException(status_code=400, detail="No photo found with the given ID.")
-
-    photo = await photos_repository.get_photo_by_id(photo_id)
-    if photo.user_id == current_user.id:
-        raise HTTPException(status_code=400, detail="You can't rate your own photos.")
-
-    existing_rating = await rating_repo.get_user_rating_for_photo(
-        photo_id, current_user.id
-    )
-    if existing_rating:
-        raise HTTPException(
-            status_code=400, detail="You have already rated this photo."
-        )
+    Rate a photo, or change the rating if the user has already rated it.
 
+    The rating is stored with a single statement; the photo is only looked
+    up again to explain why a rating was refused. With write-behind enabled
+    the rating is buffered instead, written by the worker with the next
+    batch, and answered with 202 Accepted.
+    """
     if rating < 1 or rating > 5:
         raise HTTPException(status_code=400, detail="Rating must be between 1 and 5.")
-    created_rating = await rating_repo.create_rating(photo_id, current_user.id, rating)
-    return created_rating
+    if settings.rating_write_behind:
+        photo = await photos_repository.get_photo_by_id(photo_id)
+        if not photo:
+            raise HTTPException(
+                status_code=400, detail="No photo found with the given ID."
+            )
+        if photo.user_id == current_user.id:
+            raise HTTPException(
+                status_code=400, detail="You can't rate your own photos."
+            )
+        await rating_buffer.add(photo_id, current_user.id, rating)
+        response.status_code = 202
+        return RatingIn(photo_id=photo_id, user_id=current_user.id, rating=rating)
+
+    stored_rating = await rating_repo.upsert_rating(photo_id, current_user.id, rating)
+    if stored_rating is None:
+        if not await photos_repository.get_photo_by_id(photo_id):
+            raise HTTPException(
+                status_code=400, detail="No photo found with the given ID."
+            )
+        raise HTTPException(status_code=400, detail="You can't rate your own photos.")
+    await search_cache.invalidate()
+    return stored_rating
 
 
 @router.delete("/{rating_id}", response_model=RatingOut)
@@ -131,6 +154,7 @@ async def delete_rating(
     rating_id: int,
     rating_repo: RatingRepository = Depends(get_rating_repository),
     current_user: UserOut = Depends(get_current_user),
+    search_cache: PhotoSearchCache = Depends(get_photo_search_cache),
 ):
     """
     Delete a rating.
@@ -153,5 +177,6 @@ async def delete_rating(
     )
     if not deleted:
         raise HTTPException(status_code=404, detail="Rating not found.")
+    await search_cache.invalidate()
 
     return existing_rating
@@ -0,0 +1,187 @@
+import anyio
+from fastapi import (
+    APIRouter,
+    Depends,
+    File,
+    Form,
+    HTTPException,
+    Request,
+    Response,
+    UploadFile,
+    status,
+)
+from fastapi.responses import FileResponse
+from PIL import Image
+from pydantic import ValidationError
+from dependencies import get_image_provider
+from src.services.image_provider import AbstractImageProvider, LocalImageProvider
+from src.schemas.photo import TransformationInput
+from src.services.etag import etag_matches, make_etag, not_modified
+from src.services.image_transform import canonical_params
+from src.services.file_responses import RangeFileResponse, parse_byte_range
+
+router = APIRouter(prefix="/storage", tags=["storage"])
+
+# stored files are content-addressed, so their content never changes
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+def get_local_image_provider(
+    image_provider: AbstractImageProvider = Depends(get_image_provider),
+) -> LocalImageProvider:
+    if not isinstance(image_provider, LocalImageProvider):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Local storage is not enabled.",
+        )
+    return image_provider
+
+
+@router.post("/upload", status_code=status.HTTP_201_CREATED)
+async def upload_image(
+    file: UploadFile = File(),
+    timestamp: int = Form(),
+    user_id: int = Form(),
+    signature: str = Form(),
+    image_provider: LocalImageProvider = Depends(get_local_image_provider),
+) -> dict:
+    """
+    Endpoint receiving direct uploads for the local image provider.
+
+    Mirrors the provider upload API: the form fields come from
+    POST /api/photos/upload_signature and the signed response is passed on
+    to POST /api/photos/direct.
+
+    :param file: The image file.
+    :type file: UploadFile
+
+    :param timestamp: Signed upload timestamp.
+    :type timestamp: int
+
+    :param user_id: Signed ID of the uploading user.
+    :type user_id: int
+
+    :param signature: Signature of the upload parameters.
+    :type signature: str
+
+    :return: Signed upload response (public_id, version, signature, url).
+    :rtype: dict
+
+    :raises HTTPException 403: If the signature is invalid or expired.
+    """
+    try:
+        return await image_provider.accept_upload_async(
+            file.file, timestamp, user_id, signature
+        )
+    except ValueError as err:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=str(err))
+
+
+@router.get("/{public_id}")
+async def serve_image(
+    public_id: str,
+    request: Request,
+    image_provider: LocalImageProvider = Depends(get_local_image_provider),
+):
+    """
+    Endpoint serving images stored by the local image provider.
+
+    Whole files are sent with FileResponse, which hands the file to the server
+    (sendfile) when the server supports it. Single byte ranges are answered
+    with 206 Partial Content.
+
+    Transformation parameters in the query string (width, height, crop,
+    effect, angle, gravity, radius) return the transformed image, rendered
+    once and then served from the derived image cache. They must come with
+    the sig parameter of a URL issued by the provider, so clients cannot
+    have arbitrary variants rendered.
+
+    :param public_id: Content address of the image.
+    :type public_id: str
+
+    :param request: The incoming request.
+    :type request: Request
+
+    :return: The image or the requested part of it.
+    :rtype: Response
+
+    :raises HTTPException 400: If the transformation parameters are invalid.
+    :raises HTTPException 403: If the transformation parameters are not signed.
+    :raises HTTPException 404: If the image does not exist.
+    :raises HTTPException 415: If the stored image cannot be decoded.
+    """
+    try:
+        path = image_provider.path(public_id)
+        await anyio.to_thread.run_sync(path.stat)
+    except (ValueError, FileNotFoundError):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Image not found.")
+
+    params = {
+        name: request.query_params[name]
+        for name in TransformationInput.model_fields
+        if name in request.query_params
+    }
+    transform = None
+    if params:
+        try:
+            transform = TransformationInput(**params)
+        except ValidationError as err:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail=str(err)
+            )
+        try:
+            image_provider.verify_transform(
+                public_id, transform, request.query_params.get("sig")
+            )
+        except ValueError as err:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=str(err))
+    if transform is None:
+        etag = f'"{public_id.split(".")[0]}"'
+    else:
+        etag = make_etag(public_id, canonical_params(transform))
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag, IMMUTABLE_CACHE_CONTROL)
+
+    if transform is not None:
+        try:
+            path = await image_provider.render_async(public_id, transform)
+        except (ValueError, Image.DecompressionBombError) as err:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail=str(err)
+            )
+        except FileNotFoundError:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Image not found."
+            )
+        except OSError:
+            raise HTTPException(
+                status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                detail="Stored image cannot be decoded.",
+            )
+    stat_result = await anyio.to_thread.run_sync(path.stat)
+    media_type = image_provider.media_type(path.name)
+    headers = {
+        "Accept-Ranges": "bytes",
+        "Cache-Control": IMMUTABLE_CACHE_CONTROL,
+        "ETag": etag,
+    }
+    range_header = request.headers.get("range")
+    if range_header:
+        try:
+            byte_range = parse_byte_range(range_header, stat_result.st_size)
+        except ValueError:
+            return Response(
+                status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+                headers={"Content-Range": f"bytes */{stat_result.st_size}"},
+            )
+        if byte_range is not None:
+            return RangeFileResponse(
+                path,
+                *byte_range,
+                size=stat_result.st_size,
+                media_type=media_type,
+                headers=headers,
+            )
+    return FileResponse(
+        path, media_type=media_type, headers=headers, stat_result=stat_result
+    )
@@ -1,24 +1,67 @@
-from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response, status
 from src.schemas.users import UserOut
 from src.schemas.tags import TagOut, TagIn
 from src.services.auth_user import get_current_user
+from src.services.etag import make_etag, etag_matches, not_modified
 from src.repository.tags import TagRepository
-from dependencies import get_tags_repository
+from src.services.search_cache import PhotoSearchCache
+from src.services.tag_suggestions import TagCooccurrence
+from src.services.related_photos import TagPhotoIndex
+from dependencies import (
+    get_tags_repository,
+    get_photo_search_cache,
+    get_tag_cooccurrence,
+    get_tag_photo_index,
+)
 
 router = APIRouter(prefix="/tags", tags=["tags"])
 
+# tags change rarely, a short freshness window saves most revalidations
+TAGS_CACHE_CONTROL = "private, max-age=30, must-revalidate"
+
 
 @router.get("/", response_model=list[TagOut])
 async def read_all_tags(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     tags_repository: TagRepository = Depends(get_tags_repository),
     current_user: UserOut = Depends(get_current_user),
 ):
+    version = await tags_repository.get_tags_version()
+    etag = make_etag("tags", skip, limit, *version)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag, TAGS_CACHE_CONTROL)
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = TAGS_CACHE_CONTROL
     tags = await tags_repository.get_all_tags(skip, limit)
     return tags
 
 
+@router.get("/suggestions", response_model=list[TagOut])
+async def suggest_tags(
+    tags: list[str] = Query(),
+    limit: int = Query(5, ge=1, le=50),
+    tags_repository: TagRepository = Depends(get_tags_repository),
+    cooccurrence: TagCooccurrence = Depends(get_tag_cooccurrence),
+    current_user: UserOut = Depends(get_current_user),
+):
+    """
+    Suggest tags that often accompany the given tags on other photos.
+
+    :param tags: Names of the tags a photo already has.
+    :param limit: Maximum number of suggested tags.
+    :return: Suggested tags, best first.
+    """
+    tag_ids = []
+    for tag_name in tags:
+        tag = await tags_repository.get_tag_by_name(tag_name)
+        if tag is not None:
+            tag_ids.append(tag.id)
+    return await cooccurrence.suggest_tags(tags_repository, tag_ids, limit)
+
+
 @router.get("/{tag_id}", response_model=TagOut)
 async def read_tag_by_id(
     tag_id: int,
@@ -63,12 +106,15 @@ async def update_tag(
     new_name: str,
     tags_repository: TagRepository = Depends(get_tags_repository),
     current_user: UserOut = Depends(get_current_user),
+    search_cache: PhotoSearchCache = Depends(get_photo_search_cache),
 ):
     tag = await tags_repository.update_tag(tag_id, new_name)
     if tag is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Tag not found."
         )
+    # keyword search matches tag names
+    await search_cache.invalidate()
     return tag
 
 
@@ -77,10 +123,15 @@ async def remove_tag(
     tag_id: int,
     tags_repository: TagRepository = Depends(get_tags_repository),
     current_user: UserOut = Depends(get_current_user),
+    search_cache: PhotoSearchCache = Depends(get_photo_search_cache),
+    tag_index: TagPhotoIndex = Depends(get_tag_photo_index),
 ):
     if tag_id is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Tag not found."
         )
     tag = await tags_repository.delete_tag(tag_id)
+    await search_cache.invalidate()
+    if tag is not None:
+        await tag_index.publish_tag_deleted(tag_id)
     return tag
@@ -1,4 +1,5 @@
 from datetime import datetime
+from enum import Enum
 from pydantic import BaseModel, Field, field_validator, model_validator
 from typing import List, Optional
 import json
@@ -24,16 +25,39 @@ class PhotoIn(BaseModel):
         return tags
 
 
+class UploadSignatureOut(BaseModel):
+    """
+    Pydantic model with the parameters of a direct upload to the image provider.
+
+    """
+
+    upload_url: str
+    fields: dict[str, str | int]
+
+
+class DirectUploadResult(BaseModel):
+    public_id: str = Field(max_length=255)
+    version: int | str
+    signature: str
+
+
+class PhotoDirectIn(PhotoIn):
+    upload: DirectUploadResult
+
+
 class PhotoCreate(BaseModel):
     description: str = Field(max_length=500)
     tags: Optional[List[int]] | None = None
     image_url: str = Field(max_length=255, default=None)
     cloudinary_public_id: str = Field(max_length=255, default=None)
+    content_hash: Optional[str] = Field(max_length=64, default=None)
+    phash: Optional[int] = None
+    variants: Optional[dict[str, dict[str, str]]] = None
 
 
-class PhotoOut(BaseModel):
+class PhotoSummaryOut(BaseModel):
     """
-    Pydantic model representing output data for retrieving a photo.
+    Pydantic model representing a photo in lists, without its comments.
 
     """
 
@@ -46,11 +70,40 @@ class PhotoOut(BaseModel):
     user_id: int
     created_at: datetime
     average_rating: Optional[float]
-    comments: Optional[List[CommentOut]] | None = None
+    rating_histogram: Optional[dict[int, int]] = None
+    comment_count: int = 0
+    variants: Optional[dict[str, dict[str, str]]] = None
+    display_url: Optional[str] = None
+    suggested_tags: Optional[List[TagOut]] = None
 
     model_config = {"from_attributes": True}
 
 
+class PhotoOut(PhotoSummaryOut):
+    """
+    Pydantic model representing output data for retrieving a photo.
+
+    """
+
+    comments: Optional[List[CommentOut]] | None = None
+
+
+class FacetCount(BaseModel):
+    value: str
+    count: int
+
+
+class PhotoFacets(BaseModel):
+    tags: List[FacetCount]
+    ratings: List[FacetCount]
+    months: List[FacetCount]
+
+
+class PhotoSearchOut(BaseModel):
+    photos: List[PhotoSummaryOut]
+    facets: PhotoFacets
+
+
 class PhotoUpdateIn(BaseModel):
     description: str = Field(max_length=500)
     tags: Optional[List[str]] | None = None
@@ -88,6 +141,7 @@ class TransformationInput(BaseModel):
     angle: int | None = None
     gravity: str | None = None
     radius: str | None = None
+    fetch_format: str | None = None
 
     model_config = {
         "json_schema_extra": {
@@ -102,3 +156,20 @@ class TransformationInput(BaseModel):
             }
         }
     }
+
+
+class ImageSize(str, Enum):
+    thumb = "thumb"
+    small = "small"
+    medium = "medium"
+    large = "large"
+
+
+class PhotoSort(str, Enum):
+    newest = "newest"
+    most_commented = "most_commented"
+
+
+class QRCodeFormat(str, Enum):
+    png = "png"
+    svg = "svg"
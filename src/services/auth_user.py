@@ -1,18 +1,29 @@
 import pickle
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from redis.asyncio import Redis
-from dependencies import get_users_repository, get_redis_client
+from dependencies import get_users_repository, get_coalescing_cache
+from src.config import settings
 from src.services.auth import auth_service
 from src.schemas.users import UserOut
 from src.repository.abstract import AbstractUserRepository
+from src.services.single_flight import CoalescingCache
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
 
+def user_cache_key(email: str) -> str:
+    """
+    :param email: Email of the user.
+    :return: Key of the cached user in the coalescing cache.
+    :rtype: str
+    """
+    return f"user:{email}"
+
+
 async def get_current_user(
     token: OAuth2PasswordBearer = Depends(oauth2_scheme),
     users_repository: AbstractUserRepository = Depends(get_users_repository),
+    cache: CoalescingCache = Depends(get_coalescing_cache),
 ) -> UserOut:
     """
     Get the current authenticated user.
@@ -23,8 +34,8 @@ async def get_current_user(
     :param users_repository: The repository for user data.
     :type users_repository: AbstractUserRepository
 
-    :param redis: The Redis client.
-    :type redis: Redis
+    :param cache: Redis cache sharing a single user lookup between concurrent misses.
+    :type cache: CoalescingCache
 
     :param auth_service: The JWT handling service.
     :type auth_service: HandleJWT
@@ -36,19 +47,18 @@ async def get_current_user(
     """
     user_email = await auth_service.get_email_from_access_token(token=token)
 
-    async with get_redis_client() as redis:
-        user = await redis.get(f"user:{user_email}")
-        if user is not None:
-            return pickle.loads(user)
+    async def load_user() -> bytes | None:
+        user = await users_repository.get_user_by_email(user_email)
+        if user is None:
+            return None
+        return pickle.dumps(user)
 
-    user = await users_repository.get_user_by_email(user_email)
+    user = await cache.get_or_load(
+        user_cache_key(user_email), load_user, ttl=settings.user_cache_ttl
+    )
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
         )
-
-    async with get_redis_client() as redis:
-        await redis.set(f"user:{user_email}", pickle.dumps(user))
-        await redis.expire(f"user:{user_email}", 900)
-    return user
+    return pickle.loads(user)
@@ -0,0 +1,106 @@
+import asyncio
+from typing import Awaitable, Callable, Hashable, Iterable
+from sqlalchemy.orm.attributes import set_committed_value
+
+
+class BatchLoader:
+    """
+    Loads entities by key in batches, DataLoader style.
+
+    Keys requested during the same event loop iteration, e.g. by every
+    item of a list being resolved, are collected and fetched with a single
+    call of batch_fn, which typically runs one WHERE id IN (...) query.
+    Every key is fetched at most once per loader; a loader lives as long
+    as the request that created it.
+
+    :param batch_fn: Returns the values of a list of keys as a dict; keys
+        missing from it resolve to None.
+    :type batch_fn: Callable
+    :param max_batch_size: Most keys fetched with one call.
+    :type max_batch_size: int
+    """
+
+    def __init__(
+        self,
+        batch_fn: Callable[[list], Awaitable[dict]],
+        max_batch_size: int = 1000,
+    ) -> None:
+        self._batch_fn = batch_fn
+        self._max_batch_size = max_batch_size
+        self._futures: dict[Hashable, asyncio.Future] = {}
+        self._queue: list = []
+        self._running: set[asyncio.Task] = set()
+
+    def load(self, key: Hashable) -> asyncio.Future:
+        """
+        Request the value of a key.
+
+        :param key: The key, e.g. an ID.
+        :return: Awaitable resolving to the value.
+        :rtype: asyncio.Future
+        """
+        future = self._futures.get(key)
+        if future is not None:
+            return future
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._futures[key] = future
+        if not self._queue:
+            loop.call_soon(self._dispatch)
+        self._queue.append(key)
+        return future
+
+    async def load_many(self, keys: Iterable[Hashable]) -> list:
+        """
+        Request the values of many keys.
+
+        :param keys: The keys.
+        :return: Values in the order of the keys.
+        :rtype: list
+        """
+        return list(await asyncio.gather(*[self.load(key) for key in keys]))
+
+    def _dispatch(self) -> None:
+        keys, self._queue = self._queue, []
+        for start in range(0, len(keys), self._max_batch_size):
+            task = asyncio.create_task(
+                self._fetch(keys[start : start + self._max_batch_size])
+            )
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _fetch(self, keys: list) -> None:
+        try:
+            values = await self._batch_fn(keys)
+        except Exception as err:
+            for key in keys:
+                # not memoized, a later load tries again
+                self._futures.pop(key).set_exception(err)
+            return
+        for key in keys:
+            self._futures[key].set_result(values.get(key))
+
+
+class RequestLoaders:
+    """
+    Batch loaders of a single request.
+
+    :param tags_repository: The repository for tag data.
+    """
+
+    def __init__(self, tags_repository) -> None:
+        self.photo_tags = BatchLoader(tags_repository.get_tags_for_photos)
+
+    async def attach_tags(self, photos: list) -> list:
+        """
+        Load the tags of many photos with one query and set them on the
+        photos, so that serializing the photos does not load them one by one.
+
+        :param photos: Photo objects.
+        :return: The photos.
+        :rtype: list
+        """
+        tags = await self.photo_tags.load_many([photo.id for photo in photos])
+        for photo, photo_tags in zip(photos, tags):
+            set_committed_value(photo, "tags", photo_tags or [])
+        return photos
@@ -0,0 +1,48 @@
+import hashlib
+from fastapi import Response, status
+
+
+def make_etag(*parts) -> str:
+    """
+    Build a strong ETag from the values describing a resource version.
+
+    :param parts: Values that change whenever the representation changes.
+    :return: Quoted ETag value.
+    :rtype: str
+    """
+    digest = hashlib.sha256(repr(parts).encode("utf-8")).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """
+    Check an If-None-Match request header against the current ETag.
+
+    Uses the weak comparison required for If-None-Match (RFC 9110, 13.1.2).
+
+    :param if_none_match: Value of the If-None-Match header, if sent.
+    :param etag: Current ETag of the resource.
+    :return: True if the client copy is still current.
+    :rtype: bool
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip() for tag in if_none_match.split(","))
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+def not_modified(etag: str, cache_control: str) -> Response:
+    """
+    Build an empty 304 response carrying the validator and caching hints.
+
+    :param etag: Current ETag of the resource.
+    :param cache_control: Value of the Cache-Control header.
+    :return: 304 Not Modified response.
+    :rtype: Response
+    """
+    return Response(
+        status_code=status.HTTP_304_NOT_MODIFIED,
+        headers={"ETag": etag, "Cache-Control": cache_control},
+    )
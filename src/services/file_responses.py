@@ -0,0 +1,89 @@
+import anyio
+from fastapi import Response, status
+
+
+def parse_byte_range(header: str, size: int) -> tuple[int, int] | None:
+    """
+    Parse a single-range Range header.
+
+    :param header: Value of the Range header.
+    :param size: Size of the file in bytes.
+    :return: First and last byte position (inclusive), or None if the header
+        should be ignored (other units, multiple ranges, malformed values).
+    :raises ValueError: If the range cannot be satisfied.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, sep, last = spec.strip().partition("-")
+    if not sep or not (first + last).isdigit():
+        return None
+    if size == 0:
+        raise ValueError("Range not satisfiable")
+    if not first:
+        suffix = int(last)
+        if suffix == 0:
+            raise ValueError("Range not satisfiable")
+        return max(0, size - suffix), size - 1
+    start = int(first)
+    end = int(last) if last else size - 1
+    if start >= size or end < start:
+        raise ValueError("Range not satisfiable")
+    return start, min(end, size - 1)
+
+
+class RangeFileResponse(Response):
+    """
+    206 Partial Content response streaming one byte range of a file.
+    """
+
+    chunk_size = 64 * 1024
+
+    def __init__(
+        self,
+        path,
+        start: int,
+        end: int,
+        size: int,
+        media_type: str,
+        headers: dict | None = None,
+    ) -> None:
+        super().__init__(
+            status_code=status.HTTP_206_PARTIAL_CONTENT,
+            media_type=media_type,
+            headers={
+                **(headers or {}),
+                "Content-Range": f"bytes {start}-{end}/{size}",
+                "Content-Length": str(end - start + 1),
+            },
+        )
+        self.path = path
+        self.start = start
+        self.end = end
+
+    async def __call__(self, scope, receive, send) -> None:
+        await send(
+            {
+                "type": "http.response.start",
+                "status": self.status_code,
+                "headers": self.raw_headers,
+            }
+        )
+        remaining = 0 if scope["method"].upper() == "HEAD" else self.end - self.start + 1
+        if remaining:
+            async with await anyio.open_file(self.path, "rb") as file:
+                await file.seek(self.start)
+                while remaining > 0:
+                    chunk = await file.read(min(self.chunk_size, remaining))
+                    if not chunk:
+                        break
+                    remaining -= len(chunk)
+                    await send(
+                        {
+                            "type": "http.response.body",
+                            "body": chunk,
+                            "more_body": remaining > 0,
+                        }
+                    )
+        if remaining or scope["method"].upper() == "HEAD":
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
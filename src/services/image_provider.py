@@ -1,9 +1,23 @@
+import asyncio
+import hashlib
+import hmac
+import os
+import re
+import tempfile
+import time
 import cloudinary
 import cloudinary.uploader
 import cloudinary.api
+import cloudinary.utils
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from pathlib import Path
+from urllib.parse import urlencode
 from fastapi import UploadFile
 from src.schemas.users import UserOut
 from src.schemas.photo import TransformationInput
+from src.services.image_transform import DerivedImageCache, canonical_params
+from src.services.single_flight import SingleFlight
 from abc import ABC, abstractmethod
 
 
@@ -11,8 +25,69 @@ class AbstractImageProvider(ABC):
     """
     An abstract base class defining the interface for a image service.
 
+    The blocking methods have async counterparts that run them in a thread
+    pool shared by all providers, so a slow provider call never blocks the
+    event loop and the number of concurrent provider calls stays bounded.
+
     """
 
+    _executor: ThreadPoolExecutor | None = None
+    _max_workers: int = 8
+
+    @classmethod
+    def configure_executor(cls, max_workers: int) -> None:
+        """
+        Set the number of threads used for provider calls.
+
+        Must be called before the first async provider call.
+
+        :param max_workers: Maximum number of concurrent provider calls.
+        :type max_workers: int
+        """
+        AbstractImageProvider._max_workers = max_workers
+
+    async def _run_in_executor(self, func, *args, **kwargs):
+        if AbstractImageProvider._executor is None:
+            AbstractImageProvider._executor = ThreadPoolExecutor(
+                max_workers=AbstractImageProvider._max_workers,
+                thread_name_prefix="image-provider",
+            )
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            AbstractImageProvider._executor, partial(func, *args, **kwargs)
+        )
+
+    async def upload_async(self, file, user: UserOut) -> tuple[str, str]:
+        """
+        Upload an image without blocking the event loop.
+
+        :param file: The file to upload.
+        :param user: The user uploading the file.
+        :return: tuple (url_to_image, public_id)
+        :rtype: (str,str)
+        """
+        return await self._run_in_executor(self.upload, file, user)
+
+    async def transform_async(
+        self, public_id: str, transform: TransformationInput
+    ) -> str:
+        """
+        Apply transformation to an image without blocking the event loop.
+
+        :param public_id: identifier of an image.
+        :param transform: Transformation parameters.
+        :return: Transformed image URL.
+        """
+        return await self._run_in_executor(self.transform, public_id, transform)
+
+    async def delete_async(self, public_id: str) -> None:
+        """
+        Delete an image without blocking the event loop.
+
+        :param public_id: identifier of an image.
+        """
+        await self._run_in_executor(self.delete, public_id)
+
     @abstractmethod
     def upload(self, file, user: UserOut) -> tuple[str, str]:
         """
@@ -46,6 +121,35 @@ class AbstractImageProvider(ABC):
         """
         ...
 
+    @abstractmethod
+    def sign_upload(self, user: UserOut) -> dict:
+        """
+        Issue parameters that let a client upload an image straight to the provider.
+
+        :param user: The user who is going to upload the image.
+        :return: dict with the "upload_url" and the form "fields" to send along with the file.
+        :rtype: dict
+        """
+        ...
+
+    @abstractmethod
+    def verify_upload(
+        self, user: UserOut, public_id: str, version: str, signature: str
+    ) -> str:
+        """
+        Verify the provider's response to a direct upload made by the user.
+
+        :param user: The user claiming the uploaded image.
+        :param public_id: identifier of the uploaded image.
+        :param version: version of the uploaded image.
+        :param signature: signature of the response.
+        :return: URL of the uploaded image.
+        :rtype: str
+        :raises ValueError: If the signature does not match or the image was
+            uploaded with another user's parameters.
+        """
+        ...
+
 
 class CloudinaryImageProvider(AbstractImageProvider):
     def __init__(self, settings) -> None:
@@ -103,3 +207,379 @@ class CloudinaryImageProvider(AbstractImageProvider):
         :param public_id: Public ID of the image.
         """
         cloudinary.uploader.destroy(public_id, invalidate=True)
+
+    @staticmethod
+    def _upload_folder(user: UserOut) -> str:
+        return f"users/{user.id}"
+
+    def sign_upload(self, user: UserOut) -> dict:
+        """
+        Sign parameters for an upload straight to the Cloudinary upload API.
+
+        The signed folder is per user, so the public_id of the uploaded image
+        tells who the upload parameters were issued to.
+
+        :param user: The user who is going to upload the image.
+        :return: Upload URL and form fields (timestamp, folder, api_key, signature).
+        """
+        params = {"timestamp": int(time.time()), "folder": self._upload_folder(user)}
+        signature = cloudinary.utils.api_sign_request(params, self.config.api_secret)
+        return {
+            "upload_url": cloudinary.utils.cloudinary_api_url("upload"),
+            "fields": {**params, "api_key": self.config.api_key, "signature": signature},
+        }
+
+    def verify_upload(
+        self, user: UserOut, public_id: str, version: str, signature: str
+    ) -> str:
+        """
+        Verify the signature of a Cloudinary upload API response and that the
+        image was uploaded into the user's folder.
+
+        :param user: The user claiming the uploaded image.
+        :param public_id: public_id from the upload response.
+        :param version: version from the upload response.
+        :param signature: signature from the upload response.
+        :return: URL of the uploaded image.
+        """
+        if not public_id.startswith(self._upload_folder(user) + "/"):
+            raise ValueError("Image was not uploaded by this user")
+        if not cloudinary.utils.verify_api_response_signature(
+            public_id, version, signature
+        ):
+            raise ValueError("Invalid upload signature")
+        return cloudinary.CloudinaryImage(public_id).build_url(version=version)
+
+
+# leading bytes of the image formats accepted by the local provider
+IMAGE_SIGNATURES = {
+    b"\xff\xd8\xff": "jpg",
+    b"\x89PNG\r\n\x1a\n": "png",
+    b"GIF87a": "gif",
+    b"GIF89a": "gif",
+}
+
+IMAGE_MEDIA_TYPES = {
+    "jpg": "image/jpeg",
+    "png": "image/png",
+    "gif": "image/gif",
+    "webp": "image/webp",
+    "bin": "application/octet-stream",
+}
+
+
+def sniff_extension(head: bytes) -> str:
+    """
+    Guess the file extension of an image from its first bytes.
+
+    :param head: At least the first 12 bytes of the file.
+    :return: Extension without the dot, "bin" if the format is unknown.
+    :rtype: str
+    """
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    for signature, extension in IMAGE_SIGNATURES.items():
+        if head.startswith(signature):
+            return extension
+    return "bin"
+
+
+class LocalImageProvider(AbstractImageProvider):
+    """
+    Image provider storing images in a local, content-addressed directory tree.
+
+    An image is stored once under the SHA-256 of its content
+    (root/ab/cd/abcd...ef.png), so its public_id is stable and identical
+    uploads share one file. Uploads are written to a temporary file in
+    chunks while being hashed and then moved into place atomically.
+
+    Transformations are rendered locally with Pillow and kept in a
+    DerivedImageCache; concurrent requests for the same variant in this
+    process share a single render. Transformed URLs carry an HMAC of their
+    canonical parameters, so only variants issued by transform() are served.
+
+    Stands in for Cloudinary in development, tests and load tests, including
+    the direct upload flow: upload parameters and upload responses are signed
+    with an HMAC of the application secret.
+
+    :param root: Directory where the images are stored.
+    :type root: Path
+    :param base_url: Public URL under which the stored images are served.
+    :type base_url: str
+    :param secret_key: Key used to sign upload parameters and responses.
+    :type secret_key: str
+    :param signature_ttl: Seconds for which signed upload parameters stay valid.
+    :type signature_ttl: int
+    :param derived_cache: Cache of transformed images, defaults to a 512 MB
+        cache in root/derived.
+    :type derived_cache: DerivedImageCache | None
+    """
+
+    CHUNK_SIZE = 1024 * 1024
+    PUBLIC_ID_PATTERN = re.compile(r"^[0-9a-f]{64}\.[a-z]{3,4}$")
+
+    _render_flight = SingleFlight()
+
+    def __init__(
+        self,
+        root: Path,
+        base_url: str,
+        secret_key: str,
+        signature_ttl: int = 3600,
+        derived_cache: DerivedImageCache | None = None,
+    ) -> None:
+        self._root = Path(root)
+        self._base_url = base_url.rstrip("/")
+        self._secret_key = secret_key.encode("utf-8")
+        self._signature_ttl = signature_ttl
+        self._derived_cache = derived_cache or DerivedImageCache(
+            self._root / "derived", max_bytes=512 * 1024 * 1024
+        )
+
+    def _sign(self, *parts) -> str:
+        message = ":".join(str(part) for part in parts).encode("utf-8")
+        return hmac.new(self._secret_key, message, hashlib.sha256).hexdigest()
+
+    def path(self, public_id: str) -> Path:
+        """
+        :param public_id: identifier of a stored image.
+        :return: Location of the image file.
+        :rtype: Path
+        :raises ValueError: If public_id is not a content address.
+        """
+        if not self.PUBLIC_ID_PATTERN.match(public_id):
+            raise ValueError("Invalid public_id")
+        return self._root / public_id[:2] / public_id[2:4] / public_id
+
+    @staticmethod
+    def media_type(public_id: str) -> str:
+        """
+        :param public_id: identifier of a stored image.
+        :return: Media type of the image.
+        :rtype: str
+        """
+        return IMAGE_MEDIA_TYPES.get(public_id.rsplit(".", 1)[-1], "application/octet-stream")
+
+    def url(self, public_id: str) -> str:
+        """
+        :param public_id: identifier of a stored image.
+        :return: URL under which the image is served.
+        :rtype: str
+        """
+        return f"{self._base_url}/{public_id}"
+
+    def _store(self, file) -> str:
+        tmp_dir = self._root / "tmp"
+        tmp_dir.mkdir(parents=True, exist_ok=True)
+        digest = hashlib.sha256()
+        head = b""
+        fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+        try:
+            with os.fdopen(fd, "wb") as destination:
+                while chunk := file.read(self.CHUNK_SIZE):
+                    if len(head) < 16:
+                        head += chunk[: 16 - len(head)]
+                    digest.update(chunk)
+                    destination.write(chunk)
+            public_id = f"{digest.hexdigest()}.{sniff_extension(head)}"
+            path = self.path(public_id)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            if path.exists():
+                os.unlink(tmp_path)
+            else:
+                os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        return public_id
+
+    def upload(self, file: UploadFile, current_user: UserOut) -> tuple[str, str]:
+        """
+        Stores the uploaded file, copying it in chunks.
+
+        :param file: The file to upload.
+        :param current_user: The current user.
+        :return: tuple (url_to_image, public_id)
+        """
+        public_id = self._store(file.file)
+        return (self.url(public_id), public_id)
+
+    def transformed_url(self, public_id: str, transform: TransformationInput) -> str:
+        """
+        :param public_id: identifier of an image.
+        :param transform: Transformation parameters.
+        :return: URL under which the transformed image is served.
+        :rtype: str
+        """
+        params = canonical_params(transform)
+        if not params:
+            return self.url(public_id)
+        query = urlencode(
+            sorted(params.items()) + [("sig", self._transform_signature(public_id, params))]
+        )
+        return f"{self.url(public_id)}?{query}"
+
+    def _transform_signature(self, public_id: str, params: dict) -> str:
+        return self._sign("transform", public_id, urlencode(sorted(params.items())))
+
+    def verify_transform(
+        self, public_id: str, transform: TransformationInput, signature: str | None
+    ) -> None:
+        """
+        Check that a transformed URL was issued by transformed_url.
+
+        :param public_id: identifier of an image.
+        :param transform: Transformation parameters from the URL.
+        :param signature: sig parameter from the URL.
+        :raises ValueError: If the signature is missing or does not match.
+        """
+        expected = self._transform_signature(public_id, canonical_params(transform))
+        if signature is None or not hmac.compare_digest(expected, signature):
+            raise ValueError("Invalid transformation signature")
+
+    def render(self, public_id: str, transform: TransformationInput) -> Path:
+        """
+        Return the transformed image, rendering it if it is not cached.
+
+        :param public_id: identifier of an image.
+        :param transform: Transformation parameters.
+        :return: Location of the transformed image.
+        :rtype: Path
+        :raises ValueError: If the image or the parameters are invalid.
+        :raises FileNotFoundError: If the image does not exist.
+        """
+        params = canonical_params(transform)
+        if not params:
+            return self.path(public_id)
+        return self._derived_cache.get_or_render(
+            public_id, self.path(public_id), params
+        )
+
+    async def render_async(
+        self, public_id: str, transform: TransformationInput
+    ) -> Path:
+        """
+        Return the transformed image without blocking the event loop.
+
+        Concurrent calls for the same variant wait for one render.
+
+        See render.
+        """
+        key = DerivedImageCache.key(public_id, canonical_params(transform))
+        return await self._render_flight.do(
+            (self._root, key), lambda: self._run_in_executor(self.render, public_id, transform)
+        )
+
+    def transform(self, public_id: str, transform: TransformationInput) -> str:
+        """
+        Render a transformed image and return its URL.
+
+        The image is rendered up front so invalid parameters are reported
+        to the caller; the URL renders it again if it was evicted.
+
+        :param public_id: identifier of an image.
+        :param transform: Transformation parameters.
+        :return: Transformed image URL.
+        :raises ValueError: If the parameters are not supported.
+        """
+        self.render(public_id, transform)
+        return self.transformed_url(public_id, transform)
+
+    async def transform_async(
+        self, public_id: str, transform: TransformationInput
+    ) -> str:
+        """
+        Render a transformed image without blocking the event loop and return its URL.
+
+        See transform.
+        """
+        await self.render_async(public_id, transform)
+        return self.transformed_url(public_id, transform)
+
+    def delete(self, public_id: str) -> None:
+        """
+        Deletes a stored image.
+
+        :param public_id: identifier of the image.
+        """
+        self.path(public_id).unlink(missing_ok=True)
+
+    def sign_upload(self, user: UserOut) -> dict:
+        """
+        Sign parameters for an upload to the local storage endpoint.
+
+        :param user: The user who is going to upload the image.
+        :return: Upload URL and form fields (timestamp, user_id, signature).
+        """
+        timestamp = int(time.time())
+        return {
+            "upload_url": f"{self._base_url}/upload",
+            "fields": {
+                "timestamp": timestamp,
+                "user_id": user.id,
+                "signature": self._sign("upload", user.id, timestamp),
+            },
+        }
+
+    def accept_upload(
+        self, file, timestamp: int, user_id: int, signature: str
+    ) -> dict:
+        """
+        Store a directly uploaded image after checking its upload parameters.
+
+        Plays the role of the provider's upload API.
+
+        :param file: File object with the image.
+        :param timestamp: timestamp field issued by sign_upload.
+        :param user_id: user_id field issued by sign_upload.
+        :param signature: signature field issued by sign_upload.
+        :return: Signed upload response (public_id, version, signature, url);
+            the response signature covers the user_id.
+        :rtype: dict
+        :raises ValueError: If the parameters are forged or expired.
+        """
+        expected = self._sign("upload", user_id, timestamp)
+        if not hmac.compare_digest(expected, signature):
+            raise ValueError("Invalid upload signature")
+        if time.time() - timestamp > self._signature_ttl:
+            raise ValueError("Upload signature expired")
+        public_id = self._store(file)
+        version = int(time.time())
+        return {
+            "public_id": public_id,
+            "version": version,
+            "signature": self._sign("response", user_id, public_id, version),
+            "url": self.url(public_id),
+        }
+
+    async def accept_upload_async(
+        self, file, timestamp: int, user_id: int, signature: str
+    ) -> dict:
+        """
+        Store a directly uploaded image without blocking the event loop.
+
+        See accept_upload.
+        """
+        return await self._run_in_executor(
+            self.accept_upload, file, timestamp, user_id, signature
+        )
+
+    def verify_upload(
+        self, user: UserOut, public_id: str, version: str, signature: str
+    ) -> str:
+        """
+        Verify a response returned by accept_upload for the user's upload.
+
+        :param user: The user claiming the uploaded image.
+        :param public_id: public_id from the upload response.
+        :param version: version from the upload response.
+        :param signature: signature from the upload response.
+        :return: URL of the uploaded image.
+        """
+        expected = self._sign("response", user.id, public_id, version)
+        if not hmac.compare_digest(expected, signature):
+            raise ValueError("Invalid upload signature")
+        if not self.path(public_id).is_file():
+            raise ValueError("Uploaded image not found")
+        return self.url(public_id)
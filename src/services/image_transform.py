@@ -0,0 +1,354 @@
+import hashlib
+import io
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+from PIL import Image, ImageDraw, ImageEnhance, ImageFilter, ImageOps
+from src.schemas.photo import TransformationInput
+
+# largest width or height a transformation may produce
+MAX_DIMENSION = 4096
+
+CROP_MODES = {"scale", "fit", "limit", "fill", "lfill", "thumb", "crop", "pad"}
+
+# horizontal and vertical anchor of the kept area, 0 = left/top, 1 = right/bottom
+GRAVITY_ANCHORS = {
+    "center": (0.5, 0.5),
+    "north": (0.5, 0.0),
+    "south": (0.5, 1.0),
+    "east": (1.0, 0.5),
+    "west": (0.0, 0.5),
+    "north_east": (1.0, 0.0),
+    "north_west": (0.0, 0.0),
+    "south_east": (1.0, 1.0),
+    "south_west": (0.0, 1.0),
+    # no face detection locally, keep the centre
+    "face": (0.5, 0.5),
+    "faces": (0.5, 0.5),
+    "auto": (0.5, 0.5),
+}
+
+SAVE_FORMATS = {"jpg": "JPEG", "png": "PNG", "webp": "WEBP"}
+
+
+def canonical_params(transform: TransformationInput) -> dict:
+    """
+    Bring equivalent transformations to the same form.
+
+    Unset parameters are dropped and names of modes and effects are
+    compared case-insensitively.
+
+    :param transform: Transformation parameters.
+    :return: Normalized parameters.
+    :rtype: dict
+    """
+    params = {}
+    for name, value in transform.model_dump(exclude_none=True).items():
+        if isinstance(value, str):
+            value = value.strip().lower()
+        params[name] = value
+    return params
+
+
+def _anchor(gravity: str | None) -> tuple[float, float]:
+    try:
+        return GRAVITY_ANCHORS[gravity or "center"]
+    except KeyError:
+        raise ValueError(f"Unsupported gravity: {gravity}")
+
+
+def _target_size(image: Image.Image, width, height) -> tuple[int, int]:
+    if width is None and height is None:
+        return image.size
+    if width is None:
+        width = round(image.width * height / image.height)
+    elif height is None:
+        height = round(image.height * width / image.width)
+    if not (0 < width <= MAX_DIMENSION and 0 < height <= MAX_DIMENSION):
+        raise ValueError(f"Width and height must be between 1 and {MAX_DIMENSION}")
+    return max(width, 1), max(height, 1)
+
+
+def _crop_at(image: Image.Image, size: tuple[int, int], gravity) -> Image.Image:
+    width, height = min(size[0], image.width), min(size[1], image.height)
+    x_anchor, y_anchor = _anchor(gravity)
+    left = round((image.width - width) * x_anchor)
+    top = round((image.height - height) * y_anchor)
+    return image.crop((left, top, left + width, top + height))
+
+
+def _resize(image: Image.Image, params: dict) -> Image.Image:
+    crop = params.get("crop", "scale")
+    if crop not in CROP_MODES:
+        raise ValueError(f"Unsupported crop mode: {crop}")
+    width, height = params.get("width"), params.get("height")
+    if width is None and height is None:
+        return image
+    size = _target_size(image, width, height)
+    gravity = params.get("gravity")
+
+    if crop == "scale":
+        return image.resize(size, Image.LANCZOS)
+    if crop == "crop":
+        return _crop_at(image, size, gravity)
+
+    fit_ratio = min(size[0] / image.width, size[1] / image.height)
+    cover_ratio = max(size[0] / image.width, size[1] / image.height)
+    if crop in ("fit", "limit", "pad"):
+        ratio = min(fit_ratio, 1.0) if crop == "limit" else fit_ratio
+    else:
+        ratio = min(cover_ratio, 1.0) if crop == "lfill" else cover_ratio
+    scaled = image.resize(
+        (max(round(image.width * ratio), 1), max(round(image.height * ratio), 1)),
+        Image.LANCZOS,
+    )
+    if crop in ("fit", "limit"):
+        return scaled
+    if crop == "pad":
+        canvas = Image.new("RGBA", size, (255, 255, 255, 0))
+        x_anchor, y_anchor = _anchor(gravity)
+        offset = (
+            round((size[0] - scaled.width) * x_anchor),
+            round((size[1] - scaled.height) * y_anchor),
+        )
+        canvas.paste(scaled, offset)
+        return canvas
+    return _crop_at(scaled, size, gravity)
+
+
+def _apply_effect(image: Image.Image, effect: str) -> Image.Image:
+    name, _, argument = effect.partition(":")
+    try:
+        amount = int(argument) if argument else None
+    except ValueError:
+        raise ValueError(f"Invalid effect strength: {effect}")
+
+    alpha = image.getchannel("A") if image.mode == "RGBA" else None
+    rgb = image.convert("RGB")
+    if name in ("grayscale", "blackwhite"):
+        rgb = ImageOps.grayscale(rgb).convert("RGB")
+    elif name == "sepia":
+        rgb = ImageOps.colorize(ImageOps.grayscale(rgb), "#2e1f0f", "#f5e6c8")
+    elif name == "negate":
+        rgb = ImageOps.invert(rgb)
+    elif name == "blur":
+        rgb = rgb.filter(ImageFilter.GaussianBlur((amount or 100) / 20))
+    elif name == "pixelate":
+        block = max(amount or 10, 1)
+        small = rgb.resize(
+            (max(rgb.width // block, 1), max(rgb.height // block, 1)), Image.BOX
+        )
+        rgb = small.resize(rgb.size, Image.NEAREST)
+    elif name == "sharpen":
+        rgb = rgb.filter(ImageFilter.UnsharpMask(percent=amount or 100))
+    elif name in ("brightness", "contrast", "saturation"):
+        enhancer = {
+            "brightness": ImageEnhance.Brightness,
+            "contrast": ImageEnhance.Contrast,
+            "saturation": ImageEnhance.Color,
+        }[name]
+        # Cloudinary levels run from -100 to 100, 0 leaves the image unchanged
+        level = max(-100, min(amount if amount is not None else 80, 100))
+        rgb = enhancer(rgb).enhance(1 + level / 100)
+    else:
+        raise ValueError(f"Unsupported effect: {name}")
+
+    if alpha is not None:
+        rgb.putalpha(alpha)
+    return rgb
+
+
+def _round_corners(image: Image.Image, radius: str) -> Image.Image:
+    image = image.convert("RGBA")
+    mask = Image.new("L", image.size, 0)
+    draw = ImageDraw.Draw(mask)
+    box = (0, 0, image.width - 1, image.height - 1)
+    if radius == "max":
+        draw.ellipse(box, fill=255)
+    else:
+        try:
+            pixels = int(radius)
+        except ValueError:
+            raise ValueError(f"Invalid radius: {radius}")
+        draw.rounded_rectangle(box, radius=max(pixels, 0), fill=255)
+    alpha = image.getchannel("A")
+    image.putalpha(Image.composite(alpha, mask, mask))
+    return image
+
+
+def render_transformation(source: Path, params: dict) -> tuple[bytes, str]:
+    """
+    Render a transformed copy of an image.
+
+    Supports the Cloudinary-style parameters of TransformationInput:
+    resizing with the scale, fit, limit, fill, lfill, thumb, crop and pad
+    modes anchored by gravity, effects with an optional strength
+    ("blur:300"), clockwise rotation by angle, rounded corners and the
+    output format (fetch_format: jpg, png or webp).
+
+    :param source: Location of the original image.
+    :param params: Parameters returned by canonical_params.
+    :return: (encoded image, file extension)
+    :rtype: tuple
+    :raises ValueError: If the parameters are not supported.
+    """
+    with Image.open(source) as original:
+        original.seek(0)
+        image = ImageOps.exif_transpose(original)
+        image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+
+    image = _resize(image, params)
+    if "effect" in params:
+        image = _apply_effect(image, params["effect"])
+    if params.get("angle"):
+        image = image.convert("RGBA").rotate(
+            -params["angle"], resample=Image.BICUBIC, expand=True
+        )
+    if "radius" in params:
+        image = _round_corners(image, params["radius"])
+
+    fetch_format = params.get("fetch_format")
+    if fetch_format:
+        extension = "jpg" if fetch_format == "jpeg" else fetch_format
+        if extension not in SAVE_FORMATS:
+            raise ValueError(f"Unsupported format: {fetch_format}")
+    else:
+        extension = source.suffix.lstrip(".")
+        if extension not in SAVE_FORMATS:
+            extension = "png"
+    if extension == "jpg" and image.mode == "RGBA":
+        if fetch_format:
+            background = Image.new("RGB", image.size, "white")
+            background.paste(image, mask=image.getchannel("A"))
+            image = background
+        else:
+            extension = "png"
+    buffer = io.BytesIO()
+    image.save(buffer, SAVE_FORMATS[extension])
+    return buffer.getvalue(), extension
+
+
+class DerivedImageCache:
+    """
+    Disk cache of transformed images with a size limit.
+
+    A derived image is stored under a hash of the original's public_id and
+    the canonical transformation parameters, so equivalent requests share
+    one file. Hits refresh the file's modification time; when the cache
+    grows past max_bytes the least recently used files are removed until it
+    is back under low_water of the limit.
+
+    :param root: Directory of the derived images.
+    :type root: Path
+    :param max_bytes: Size limit of the cache.
+    :type max_bytes: int
+    :param low_water: Fraction of max_bytes the eviction shrinks the cache to.
+    :type low_water: float
+    """
+
+    def __init__(self, root: Path, max_bytes: int, low_water: float = 0.9) -> None:
+        self._root = Path(root)
+        self._max_bytes = max_bytes
+        self._low_water = low_water
+        self._lock = threading.Lock()
+        self._size: int | None = None
+
+    @staticmethod
+    def key(public_id: str, params: dict) -> str:
+        """
+        :param public_id: identifier of the original image.
+        :param params: Parameters returned by canonical_params.
+        :return: Cache key of the derived image.
+        :rtype: str
+        """
+        payload = json.dumps([public_id, params], sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _files(self) -> list[Path]:
+        return [path for path in self._root.glob("*/*") if path.is_file()]
+
+    def lookup(self, key: str) -> Path | None:
+        """
+        Find a cached derived image and mark it as recently used.
+
+        :param key: Cache key of the derived image.
+        :return: Location of the derived image or None on a miss.
+        :rtype: Path | None
+        """
+        for path in self._root.glob(f"{key[:2]}/{key}.*"):
+            try:
+                os.utime(path)
+            except FileNotFoundError:
+                continue
+            return path
+        return None
+
+    def store(self, key: str, extension: str, data: bytes) -> Path:
+        """
+        Add a derived image to the cache, evicting old entries if needed.
+
+        :param key: Cache key of the derived image.
+        :param extension: File extension of the derived image.
+        :param data: Encoded image.
+        :return: Location of the derived image.
+        :rtype: Path
+        """
+        path = self._root / key[:2] / f"{key}.{extension}"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent)
+        try:
+            with os.fdopen(fd, "wb") as destination:
+                destination.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+        with self._lock:
+            if self._size is None:
+                self._size = sum(file.stat().st_size for file in self._files())
+            else:
+                self._size += len(data)
+            if self._size > self._max_bytes:
+                self._evict(keep=path)
+        return path
+
+    def _evict(self, keep: Path) -> None:
+        entries = []
+        for file in self._files():
+            try:
+                stat = file.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, file))
+        entries.sort()
+        # other processes share the directory, so recount instead of trusting _size
+        self._size = sum(size for _, size, _ in entries)
+        target = self._max_bytes * self._low_water
+        for _, size, file in entries:
+            if self._size <= target:
+                break
+            if file == keep:
+                continue
+            file.unlink(missing_ok=True)
+            self._size -= size
+
+    def get_or_render(self, public_id: str, source: Path, params: dict) -> Path:
+        """
+        Return the derived image, rendering and caching it on a miss.
+
+        :param public_id: identifier of the original image.
+        :param source: Location of the original image.
+        :param params: Parameters returned by canonical_params.
+        :return: Location of the derived image.
+        :rtype: Path
+        """
+        key = self.key(public_id, params)
+        path = self.lookup(key)
+        if path is None:
+            data, extension = render_transformation(source, params)
+            path = self.store(key, extension, data)
+        return path
@@ -0,0 +1,429 @@
+import asyncio
+import json
+import logging
+import signal
+import time
+import traceback
+import uuid
+from dataclasses import dataclass, field
+from typing import AsyncContextManager, Awaitable, Callable
+from redis.asyncio import Redis
+
+logger = logging.getLogger(__name__)
+
+# moves the oldest ready job to the processing set and counts the attempt
+RESERVE_SCRIPT = """
+local job_id = redis.call("rpop", KEYS[1])
+if not job_id then
+    return nil
+end
+redis.call("zadd", KEYS[2], ARGV[1], job_id)
+local attempts = redis.call("hincrby", KEYS[4], job_id, 1)
+return {job_id, redis.call("hget", KEYS[3], job_id), attempts}
+"""
+
+# puts jobs whose score (deadline or retry time) has passed back on the ready list
+REQUEUE_DUE_SCRIPT = """
+local due = redis.call("zrangebyscore", KEYS[1], "-inf", ARGV[1], "LIMIT", 0, 100)
+for _, job_id in ipairs(due) do
+    redis.call("zrem", KEYS[1], job_id)
+    redis.call("lpush", KEYS[2], job_id)
+end
+return #due
+"""
+
+# handles reservations whose deadline has passed: the reservation already
+# counted as an attempt, so the job is dead-lettered after the last one and
+# put back on the ready list otherwise
+EXPIRE_SCRIPT = """
+local expired = redis.call("zrangebyscore", KEYS[1], "-inf", ARGV[1], "LIMIT", 0, 100)
+local max_attempts = tonumber(ARGV[2])
+for _, job_id in ipairs(expired) do
+    redis.call("zrem", KEYS[1], job_id)
+    local attempts = tonumber(redis.call("hget", KEYS[4], job_id) or "0")
+    local payload = redis.call("hget", KEYS[3], job_id)
+    if attempts >= max_attempts and payload then
+        local data = cjson.decode(payload)
+        redis.call("lpush", KEYS[5], cjson.encode({
+            id = job_id,
+            name = data["name"],
+            kwargs = data["kwargs"],
+            attempts = attempts,
+            error = "Reservation expired",
+            failed_at = tonumber(ARGV[1]),
+        }))
+        redis.call("hdel", KEYS[3], job_id)
+        redis.call("hdel", KEYS[4], job_id)
+    else
+        redis.call("lpush", KEYS[2], job_id)
+    end
+end
+return #expired
+"""
+
+# removes a finished job; does nothing if the reservation already expired
+ACK_SCRIPT = """
+if redis.call("zrem", KEYS[1], ARGV[1]) == 0 then
+    return 0
+end
+redis.call("hdel", KEYS[2], ARGV[1])
+redis.call("hdel", KEYS[3], ARGV[1])
+return 1
+"""
+
+# schedules a retry of a failed job, or dead-letters it after the last attempt
+FAIL_SCRIPT = """
+if redis.call("zrem", KEYS[1], ARGV[1]) == 0 then
+    return 0
+end
+if ARGV[2] == "retry" then
+    redis.call("zadd", KEYS[4], ARGV[3], ARGV[1])
+    return 1
+end
+redis.call("lpush", KEYS[5], ARGV[3])
+redis.call("hdel", KEYS[2], ARGV[1])
+redis.call("hdel", KEYS[3], ARGV[1])
+return 2
+"""
+
+
+@dataclass
+class Job:
+    """
+    A unit of background work.
+
+    :param id: Identifier of the job.
+    :param name: Name of the handler that runs the job.
+    :param kwargs: JSON-serializable arguments of the handler.
+    :param attempts: Number of times the job has been reserved.
+    """
+
+    id: str
+    name: str
+    kwargs: dict = field(default_factory=dict)
+    attempts: int = 0
+
+
+class JobQueue:
+    """
+    Durable job queue on Redis lists and sorted sets.
+
+    Jobs wait on a ready list. A worker reserving a job moves it to a
+    processing set scored by its visibility deadline; a job that is neither
+    acknowledged nor failed by then (e.g. its worker crashed) is put back on
+    the ready list. Failed jobs are retried with exponential backoff. Every
+    reservation counts as an attempt, so a job is moved to a dead-letter list
+    once max_attempts reservations have failed or expired. Every state change is
+    a single Lua script, so jobs are not lost between steps.
+
+    Delivery is at least once; handlers must be idempotent.
+
+    :param redis_client: Factory returning an async context manager with a Redis client.
+    :type redis_client: Callable
+    :param name: Name of the queue, prefix of its Redis keys.
+    :type name: str
+    :param visibility_timeout: Seconds a reserved job may run before it is handed out again.
+    :type visibility_timeout: float
+    :param max_attempts: Number of attempts before a job is dead-lettered.
+    :type max_attempts: int
+    :param retry_delay: Delay in seconds before the first retry, doubled for every further one.
+    :type retry_delay: float
+    """
+
+    def __init__(
+        self,
+        redis_client: Callable[[], AsyncContextManager[Redis]],
+        name: str = "jobs",
+        visibility_timeout: float = 300.0,
+        max_attempts: int = 5,
+        retry_delay: float = 5.0,
+    ) -> None:
+        self._redis_client = redis_client
+        self._visibility_timeout = visibility_timeout
+        self._max_attempts = max_attempts
+        self._retry_delay = retry_delay
+        prefix = f"queue:{name}"
+        self.ready_key = f"{prefix}:ready"
+        self.processing_key = f"{prefix}:processing"
+        self.delayed_key = f"{prefix}:delayed"
+        self.dead_key = f"{prefix}:dead"
+        self.payloads_key = f"{prefix}:payloads"
+        self.attempts_key = f"{prefix}:attempts"
+
+    async def enqueue(self, name: str, **kwargs) -> str:
+        """
+        Add a job to the queue.
+
+        :param name: Name of the handler that runs the job.
+        :param kwargs: JSON-serializable arguments of the handler.
+        :return: ID of the job.
+        :rtype: str
+        """
+        job_id = uuid.uuid4().hex
+        payload = json.dumps({"name": name, "kwargs": kwargs})
+        async with self._redis_client() as redis:
+            async with redis.pipeline(transaction=True) as pipe:
+                pipe.hset(self.payloads_key, job_id, payload)
+                pipe.lpush(self.ready_key, job_id)
+                await pipe.execute()
+        return job_id
+
+    async def reserve(self) -> Job | None:
+        """
+        Take the oldest ready job, hiding it from other workers until its
+        visibility timeout passes.
+
+        :return: The job or None if no job is ready.
+        :rtype: Job | None
+        """
+        deadline = time.time() + self._visibility_timeout
+        async with self._redis_client() as redis:
+            result = await redis.eval(
+                RESERVE_SCRIPT,
+                4,
+                self.ready_key,
+                self.processing_key,
+                self.payloads_key,
+                self.attempts_key,
+                deadline,
+            )
+        if result is None:
+            return None
+        job_id, payload, attempts = result
+        job_id = job_id.decode() if isinstance(job_id, bytes) else job_id
+        if payload is None:
+            # payload removed by an ack racing an expired reservation
+            await self.ack(Job(id=job_id, name=""))
+            return None
+        data = json.loads(payload)
+        return Job(
+            id=job_id, name=data["name"], kwargs=data["kwargs"], attempts=int(attempts)
+        )
+
+    async def requeue_due(self) -> int:
+        """
+        Make expired reservations and jobs due for a retry ready again.
+
+        Jobs whose reservation expired on their last attempt are dead-lettered
+        instead.
+
+        :return: Number of expired reservations and retried jobs handled.
+        :rtype: int
+        """
+        now = time.time()
+        async with self._redis_client() as redis:
+            expired = await redis.eval(
+                EXPIRE_SCRIPT,
+                5,
+                self.processing_key,
+                self.ready_key,
+                self.payloads_key,
+                self.attempts_key,
+                self.dead_key,
+                now,
+                self._max_attempts,
+            )
+            retried = await redis.eval(
+                REQUEUE_DUE_SCRIPT, 2, self.delayed_key, self.ready_key, now
+            )
+        return int(expired) + int(retried)
+
+    async def ack(self, job: Job) -> bool:
+        """
+        Mark a job as done.
+
+        :param job: The reserved job.
+        :return: False if the reservation had already expired.
+        :rtype: bool
+        """
+        async with self._redis_client() as redis:
+            removed = await redis.eval(
+                ACK_SCRIPT,
+                3,
+                self.processing_key,
+                self.payloads_key,
+                self.attempts_key,
+                job.id,
+            )
+        return bool(removed)
+
+    async def fail(self, job: Job, error: str) -> bool:
+        """
+        Schedule a retry of a failed job or dead-letter it after the last attempt.
+
+        :param job: The reserved job.
+        :param error: Description of the failure, kept with dead letters.
+        :return: True if the job was dead-lettered.
+        :rtype: bool
+        """
+        if job.attempts < self._max_attempts:
+            action = "retry"
+            argument = time.time() + self._retry_delay * 2 ** (job.attempts - 1)
+        else:
+            action = "dead"
+            argument = json.dumps(
+                {
+                    "id": job.id,
+                    "name": job.name,
+                    "kwargs": job.kwargs,
+                    "attempts": job.attempts,
+                    "error": error,
+                    "failed_at": time.time(),
+                }
+            )
+        async with self._redis_client() as redis:
+            result = await redis.eval(
+                FAIL_SCRIPT,
+                5,
+                self.processing_key,
+                self.payloads_key,
+                self.attempts_key,
+                self.delayed_key,
+                self.dead_key,
+                job.id,
+                action,
+                argument,
+            )
+        return int(result) == 2
+
+    async def dead_letters(self, limit: int = 100) -> list[dict]:
+        """
+        :param limit: Maximum number of entries returned.
+        :return: Most recent dead-lettered jobs with their last error.
+        :rtype: list[dict]
+        """
+        async with self._redis_client() as redis:
+            entries = await redis.lrange(self.dead_key, 0, limit - 1)
+        return [json.loads(entry) for entry in entries]
+
+    async def requeue_dead(self) -> int:
+        """
+        Enqueue all dead-lettered jobs again with a fresh attempt count.
+
+        :return: Number of requeued jobs.
+        :rtype: int
+        """
+        count = 0
+        async with self._redis_client() as redis:
+            while (entry := await redis.rpop(self.dead_key)) is not None:
+                data = json.loads(entry)
+                # Lua's cjson encodes empty kwargs of expired jobs as []
+                await self.enqueue(data["name"], **(data["kwargs"] or {}))
+                count += 1
+        return count
+
+    async def stats(self) -> dict:
+        """
+        :return: Number of ready, processing, delayed and dead jobs.
+        :rtype: dict
+        """
+        async with self._redis_client() as redis:
+            async with redis.pipeline(transaction=False) as pipe:
+                pipe.llen(self.ready_key)
+                pipe.zcard(self.processing_key)
+                pipe.zcard(self.delayed_key)
+                pipe.llen(self.dead_key)
+                ready, processing, delayed, dead = await pipe.execute()
+        return {
+            "ready": ready,
+            "processing": processing,
+            "delayed": delayed,
+            "dead": dead,
+        }
+
+
+class Worker:
+    """
+    Runs jobs from a JobQueue with the registered handlers.
+
+    :param queue: The queue to take jobs from.
+    :type queue: JobQueue
+    :param handlers: Coroutine functions by job name, called with the job's kwargs.
+    :type handlers: dict
+    :param concurrency: Maximum number of jobs run at the same time.
+    :type concurrency: int
+    :param poll_interval: Seconds to wait when no job is ready.
+    :type poll_interval: float
+    """
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        handlers: dict[str, Callable[..., Awaitable]],
+        concurrency: int = 4,
+        poll_interval: float = 1.0,
+    ) -> None:
+        self._queue = queue
+        self._handlers = handlers
+        self._slots = asyncio.Semaphore(concurrency)
+        self._poll_interval = poll_interval
+        self._stopping = asyncio.Event()
+        self._running: set[asyncio.Task] = set()
+
+    def stop(self) -> None:
+        """
+        Stop taking new jobs; run() returns when the running jobs finish.
+        """
+        self._stopping.set()
+
+    async def run_job(self, job: Job) -> None:
+        """
+        Run a single job and acknowledge or fail it.
+
+        :param job: The reserved job.
+        """
+        handler = self._handlers.get(job.name)
+        try:
+            if handler is None:
+                raise LookupError(f"No handler for job {job.name!r}")
+            await handler(**job.kwargs)
+        except Exception:
+            dead = await self._queue.fail(job, traceback.format_exc())
+            logger.exception(
+                "Job %s (%s) failed on attempt %s, %s",
+                job.id,
+                job.name,
+                job.attempts,
+                "moved to dead letters" if dead else "will retry",
+            )
+        else:
+            await self._queue.ack(job)
+
+    async def run(self) -> None:
+        """
+        Take and run jobs until stop() is called or SIGINT/SIGTERM is received.
+        """
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(signum, self.stop)
+            except (NotImplementedError, RuntimeError):
+                pass
+
+        while not self._stopping.is_set():
+            await self._slots.acquire()
+            try:
+                await self._queue.requeue_due()
+                job = await self._queue.reserve()
+            except Exception:
+                self._slots.release()
+                raise
+            if job is None:
+                self._slots.release()
+                try:
+                    await asyncio.wait_for(
+                        self._stopping.wait(), timeout=self._poll_interval
+                    )
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            task = asyncio.create_task(self.run_job(job))
+            self._running.add(task)
+            task.add_done_callback(self._finished)
+
+        if self._running:
+            await asyncio.gather(*self._running, return_exceptions=True)
+
+    def _finished(self, task: asyncio.Task) -> None:
+        self._running.discard(task)
+        self._slots.release()
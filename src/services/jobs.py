@@ -0,0 +1,36 @@
+from dependencies import get_image_provider, get_photos_repository
+from src.services.variants import generate_photo_variants
+
+
+async def delete_image(public_id: str) -> None:
+    """
+    Delete a stored image unless a photo still uses it.
+
+    Content-addressed providers share one stored image between identical
+    uploads, so the check runs right before the deletion.
+
+    :param public_id: identifier of the image.
+    """
+    photos_repository = get_photos_repository()
+    if await photos_repository.count_photos_with_public_id(public_id):
+        return
+    await get_image_provider().delete_async(public_id)
+
+
+async def generate_variants(photo_id: int, public_id: str) -> None:
+    """
+    Generate the resized variants of a photo and store their URLs.
+
+    :param photo_id: ID of the photo.
+    :param public_id: identifier of the photo's image.
+    """
+    await generate_photo_variants(
+        photo_id, public_id, get_image_provider(), get_photos_repository()
+    )
+
+
+# handlers run by worker.py, by job name
+JOB_HANDLERS = {
+    "delete_image": delete_image,
+    "generate_variants": generate_variants,
+}
@@ -0,0 +1,151 @@
+import asyncio
+import json
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncContextManager, AsyncIterator, Callable
+from redis.asyncio import Redis
+
+logger = logging.getLogger(__name__)
+
+
+class PhotoEventHub:
+    """
+    Push channel of comment and rating changes, one stream per photo.
+
+    Repositories publish every change of a photo's comments or ratings on
+    a Redis channel of the photo. Each API process holds a single pattern
+    subscription to all photo channels while it has viewers and hands the
+    messages to the in-memory queues of the viewers of that photo, so open
+    streams cost no database queries and one Redis connection per process.
+
+    Events published before a stream was opened are not replayed. A viewer
+    that falls more than queue_size events behind misses the newer ones.
+
+    :param redis_client: Factory returning an async context manager with a Redis client.
+    :type redis_client: Callable
+    :param channel_prefix: Prefix of the Redis channels, followed by the photo ID.
+    :type channel_prefix: str
+    :param queue_size: Events kept for a viewer that has not read them yet.
+    :type queue_size: int
+    """
+
+    def __init__(
+        self,
+        redis_client: Callable[[], AsyncContextManager[Redis]],
+        channel_prefix: str = "photos:events:",
+        queue_size: int = 100,
+    ) -> None:
+        self._redis_client = redis_client
+        self._channel_prefix = channel_prefix
+        self._queue_size = queue_size
+        self._subscribers: dict[int, set[asyncio.Queue]] = {}
+        self._listener: asyncio.Task | None = None
+        self._subscribed = asyncio.Event()
+
+    async def publish(self, photo_id: int, event: str, data: dict) -> None:
+        """
+        Send an event to all viewers of a photo.
+
+        :param photo_id: ID of the photo.
+        :param event: Name of the event, e.g. "comment.created".
+        :param data: JSON-serializable payload.
+        """
+        message = json.dumps({"event": event, "data": data}, default=str)
+        async with self._redis_client() as redis:
+            await redis.publish(f"{self._channel_prefix}{photo_id}", message)
+
+    def dispatch(self, photo_id: int, message: dict) -> None:
+        """
+        Hand a received event to the viewers of a photo in this process.
+
+        :param photo_id: ID of the photo.
+        :param message: Event with "event" and "data" keys.
+        """
+        for queue in self._subscribers.get(photo_id, ()):
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                pass
+
+    @asynccontextmanager
+    async def subscribe(
+        self, photo_id: int, connect_timeout: float = 5.0
+    ) -> AsyncIterator[asyncio.Queue]:
+        """
+        Receive the events of a photo while the context is open.
+
+        The first viewer of the process starts the Redis subscription and
+        the last one stops it.
+
+        :param photo_id: ID of the photo.
+        :param connect_timeout: Seconds to wait for the subscription to be ready.
+        :return: Queue of events.
+        """
+        queue: asyncio.Queue = asyncio.Queue(self._queue_size)
+        self._subscribers.setdefault(photo_id, set()).add(queue)
+        if self._listener is None or self._listener.done():
+            self._subscribed.clear()
+            self._listener = asyncio.create_task(self.listen())
+        try:
+            try:
+                await asyncio.wait_for(
+                    self._subscribed.wait(), timeout=connect_timeout
+                )
+            except asyncio.TimeoutError:
+                pass
+            yield queue
+        finally:
+            queues = self._subscribers[photo_id]
+            queues.discard(queue)
+            if not queues:
+                del self._subscribers[photo_id]
+            if not self._subscribers and self._listener is not None:
+                self._listener.cancel()
+                self._listener = None
+
+    async def stream(self, photo_id: int, keepalive: float = 15.0):
+        """
+        Server-Sent Events of a photo, until the client disconnects.
+
+        :param photo_id: ID of the photo.
+        :param keepalive: Seconds of silence after which a comment line is sent.
+        :return: Async iterator of SSE messages.
+        """
+        async with self.subscribe(photo_id) as queue:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), timeout=keepalive)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                data = json.dumps(message["data"])
+                yield f"event: {message['event']}\ndata: {data}\n\n"
+
+    async def listen(self, retry_delay: float = 1.0) -> None:
+        """
+        Dispatch the events of all photos until cancelled.
+
+        :param retry_delay: Seconds to wait before reconnecting.
+        """
+        while True:
+            try:
+                async with self._redis_client() as redis:
+                    async with redis.pubsub() as pubsub:
+                        await pubsub.psubscribe(f"{self._channel_prefix}*")
+                        self._subscribed.set()
+                        async for message in pubsub.listen():
+                            if message["type"] != "pmessage":
+                                continue
+                            channel = _decode(message["channel"])
+                            photo_id = int(channel[len(self._channel_prefix) :])
+                            self.dispatch(photo_id, json.loads(message["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Photo events interrupted")
+                await asyncio.sleep(retry_delay)
+
+
+def _decode(value) -> str:
+    return value.decode() if isinstance(value, bytes) else value
@@ -1,5 +1,11 @@
 from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+import asyncio
+import multiprocessing
+import time
 import bcrypt
+from fastapi import HTTPException, status
 
 
 class AbstractPasswordHashHandler(ABC):
@@ -40,6 +46,20 @@ class AbstractPasswordHashHandler(ABC):
         """
         ...
 
+    @abstractmethod
+    def needs_rehash(self, hashed_password: str) -> bool:
+        """
+        Check if a stored hash was created with parameters other than the current ones.
+
+        :param hashed_password: The stored hashed password.
+        :type hashed_password: str
+
+        :return: True if the password should be hashed again, False otherwise.
+        :rtype: bool
+
+        """
+        ...
+
 
 class BcryptPasswordHandler(AbstractPasswordHashHandler):
     """
@@ -71,3 +91,209 @@ class BcryptPasswordHandler(AbstractPasswordHashHandler):
         return bcrypt.checkpw(
             password=password_bytes, hashed_password=hashed_password_bytes
         )
+
+    def needs_rehash(self, hashed_password: str) -> bool:
+        # bcrypt hashes look like $2b$<rounds>$<salt+digest>
+        try:
+            rounds = int(hashed_password.split("$")[2])
+        except (IndexError, ValueError):
+            return True
+        return rounds != self._rounds
+
+
+def calibrate_bcrypt_rounds(
+    target_ms: float, min_rounds: int = 4, max_rounds: int = 16, samples: int = 3
+) -> tuple[int, dict[int, float]]:
+    """
+    Find the highest bcrypt cost whose hashing time stays within the target on this machine.
+
+    Every extra round doubles the hashing time, so costs are measured in
+    increasing order until the target is exceeded.
+
+    :param target_ms: Target time of a single hash in milliseconds.
+    :type target_ms: float
+    :param min_rounds: Lowest cost that may be returned.
+    :type min_rounds: int
+    :param max_rounds: Highest cost that is measured.
+    :type max_rounds: int
+    :param samples: Number of hashes measured per cost; the median is used.
+    :type samples: int
+
+    :return: The chosen cost and the measured median time in milliseconds per cost.
+    :rtype: tuple[int, dict[int, float]]
+    """
+    password = b"calibration-password"
+    chosen = min_rounds
+    timings = {}
+    for rounds in range(min_rounds, max_rounds + 1):
+        durations = []
+        for _ in range(samples):
+            salt = bcrypt.gensalt(rounds=rounds)
+            start = time.perf_counter()
+            bcrypt.hashpw(password, salt)
+            durations.append((time.perf_counter() - start) * 1000)
+        timings[rounds] = sorted(durations)[len(durations) // 2]
+        if timings[rounds] > target_ms:
+            break
+        chosen = rounds
+    return chosen, timings
+
+
+def _timed_call(func, *args):
+    # executed in a worker process; reports the pure CPU time of the call
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+@dataclass
+class PasswordHashStats:
+    """
+    Timing counters of a PasswordHashPool, per operation name.
+    """
+
+    calls: dict[str, int] = field(default_factory=dict)
+    rejected: int = 0
+    timed_out: int = 0
+    run_seconds: dict[str, float] = field(default_factory=dict)
+    wait_seconds: dict[str, float] = field(default_factory=dict)
+    max_seconds: dict[str, float] = field(default_factory=dict)
+
+    def record(self, operation: str, run_time: float, total_time: float) -> None:
+        self.calls[operation] = self.calls.get(operation, 0) + 1
+        self.run_seconds[operation] = self.run_seconds.get(operation, 0.0) + run_time
+        self.wait_seconds[operation] = self.wait_seconds.get(operation, 0.0) + (
+            total_time - run_time
+        )
+        self.max_seconds[operation] = max(self.max_seconds.get(operation, 0.0), total_time)
+
+
+class PasswordHashPool:
+    """
+    Runs the CPU-bound calls of a password handler in a dedicated process pool,
+    so that hashing never blocks the event loop.
+
+    The number of calls waiting for or running in the pool is bounded; above the
+    limit new calls are rejected with 503 instead of queueing indefinitely.
+    A call that times out is answered with 503 as well, but keeps its slot
+    until the worker process has actually finished it.
+
+    :param handler: The password handler doing the actual work. Must be picklable.
+    :type handler: AbstractPasswordHashHandler
+    :param max_workers: Number of worker processes.
+    :type max_workers: int
+    :param max_pending: Maximum number of calls queued or running at once.
+    :type max_pending: int
+    :param timeout: Seconds after which a waiting caller gives up.
+    :type timeout: float
+    """
+
+    def __init__(
+        self,
+        handler: AbstractPasswordHashHandler,
+        max_workers: int = 2,
+        max_pending: int = 64,
+        timeout: float = 10.0,
+    ) -> None:
+        self._handler = handler
+        self._max_workers = max_workers
+        self._max_pending = max_pending
+        self._timeout = timeout
+        self._executor: ProcessPoolExecutor | None = None
+        self._pending = 0
+        self.stats = PasswordHashStats()
+
+    @property
+    def pending(self) -> int:
+        """
+        :return: Number of calls currently queued or running.
+        :rtype: int
+        """
+        return self._pending
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawned workers do not inherit the event loop, sockets or DB connections
+            self._executor = ProcessPoolExecutor(
+                max_workers=self._max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    def _unavailable(self) -> HTTPException:
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many authentication requests, try again later.",
+            headers={"Retry-After": "1"},
+        )
+
+    def _release(self) -> None:
+        self._pending -= 1
+
+    async def _run(self, operation: str, func, *args):
+        if self._pending >= self._max_pending:
+            self.stats.rejected += 1
+            raise self._unavailable()
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        future = self._get_executor().submit(_timed_call, func, *args)
+        self._pending += 1
+        # runs when the worker is done (or the queued call got cancelled),
+        # not when the caller stops waiting
+        future.add_done_callback(lambda _: loop.call_soon_threadsafe(self._release))
+        try:
+            result, run_time = await asyncio.wait_for(
+                asyncio.wrap_future(future), timeout=self._timeout
+            )
+        except asyncio.TimeoutError:
+            self.stats.timed_out += 1
+            raise self._unavailable()
+        self.stats.record(operation, run_time, time.perf_counter() - start)
+        return result
+
+    async def get_password_hash(self, password: str) -> str:
+        """
+        Hash a password in the process pool.
+
+        :param password: The plain password to be hashed.
+        :type password: str
+        :return: The hashed password.
+        :rtype: str
+        """
+        return await self._run("hash", self._handler.get_password_hash, password)
+
+    def needs_rehash(self, hashed_password: str) -> bool:
+        """
+        Check if a stored hash uses a cost other than the configured one.
+
+        Only parses the hash, so it runs in the calling process.
+
+        :param hashed_password: The stored hashed password.
+        :type hashed_password: str
+        :return: True if the password should be hashed again, False otherwise.
+        :rtype: bool
+        """
+        return self._handler.needs_rehash(hashed_password)
+
+    async def verify_password(self, plain_password: str, hashed_password: str) -> bool:
+        """
+        Verify a password against its hash in the process pool.
+
+        :param plain_password: The plain password to be verified.
+        :type plain_password: str
+        :param hashed_password: The hashed password to be compared against.
+        :type hashed_password: str
+        :return: True if the plain password matches the hashed password, False otherwise.
+        :rtype: bool
+        """
+        return await self._run(
+            "verify", self._handler.verify_password, plain_password, hashed_password
+        )
+
+    def shutdown(self) -> None:
+        """
+        Stop the worker processes.
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
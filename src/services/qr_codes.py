@@ -0,0 +1,101 @@
+import hashlib
+import io
+from typing import AsyncContextManager, Callable
+import qrcode
+from qrcode.image.pure import PyPNGImage
+from qrcode.image.svg import SvgPathImage
+from redis.asyncio import Redis
+from starlette.concurrency import run_in_threadpool
+from src.schemas.photo import QRCodeFormat
+
+QR_CODE_BORDER = 4
+QR_CODE_DEFAULT_BOX_SIZE = 10
+
+QR_CODE_FACTORIES = {
+    QRCodeFormat.png: PyPNGImage,
+    QRCodeFormat.svg: SvgPathImage,
+}
+
+QR_CODE_MEDIA_TYPES = {
+    QRCodeFormat.png: "image/png",
+    QRCodeFormat.svg: "image/svg+xml",
+}
+
+
+def render_qr_code(url: str, size: int | None, fmt: QRCodeFormat) -> bytes:
+    """
+    Render a QR code pointing to the given URL.
+
+    CPU bound; call it from a worker thread.
+
+    :param url: URL encoded in the QR code.
+    :param size: Approximate image width in pixels, None for the library default.
+    :param fmt: Output image format.
+    :return: Encoded image.
+    :rtype: bytes
+    """
+    qr = qrcode.QRCode(border=QR_CODE_BORDER, box_size=QR_CODE_DEFAULT_BOX_SIZE)
+    qr.add_data(url)
+    qr.make(fit=True)
+    if size is not None:
+        qr.box_size = max(1, size // (qr.modules_count + 2 * QR_CODE_BORDER))
+    buf = io.BytesIO()
+    qr.make_image(image_factory=QR_CODE_FACTORIES[fmt]).save(buf)
+    return buf.getvalue()
+
+
+class QRCodeCache:
+    """
+    Redis cache of rendered QR codes.
+
+    All renders of a URL live in one hash with a field per size and format,
+    so they are dropped together with a single DEL.
+
+    :param redis_client: Factory returning an async context manager with a Redis client.
+    :type redis_client: Callable
+    :param ttl: Lifetime of a cached image in seconds.
+    :type ttl: int
+    """
+
+    KEY_PREFIX = "qr:"
+
+    def __init__(
+        self, redis_client: Callable[[], AsyncContextManager[Redis]], ttl: int
+    ) -> None:
+        self._redis_client = redis_client
+        self._ttl = ttl
+
+    def _key(self, url: str) -> str:
+        return self.KEY_PREFIX + hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+    async def get_or_render(
+        self, url: str, size: int | None, fmt: QRCodeFormat
+    ) -> bytes:
+        """
+        Return the cached QR code image, rendering it off the event loop on a miss.
+
+        :param url: URL encoded in the QR code.
+        :param size: Approximate image width in pixels.
+        :param fmt: Output image format.
+        :return: Encoded image.
+        :rtype: bytes
+        """
+        key = self._key(url)
+        field = f"{size or 'default'}:{fmt.value}"
+        async with self._redis_client() as redis:
+            image = await redis.hget(key, field)
+            if image is not None:
+                return image
+            image = await run_in_threadpool(render_qr_code, url, size, fmt)
+            await redis.hset(key, field, image)
+            await redis.expire(key, self._ttl)
+        return image
+
+    async def invalidate(self, url: str) -> None:
+        """
+        Drop every cached QR code rendered for the given URL.
+
+        :param url: URL that is no longer served for a photo.
+        """
+        async with self._redis_client() as redis:
+            await redis.delete(self._key(url))
@@ -0,0 +1,203 @@
+import asyncio
+import logging
+import os
+import socket
+import time
+from typing import AsyncContextManager, Awaitable, Callable
+from redis.asyncio import Redis
+from redis.exceptions import ResponseError
+
+logger = logging.getLogger(__name__)
+
+
+class RatingBuffer:
+    """
+    Write-behind buffer of ratings on a Redis stream.
+
+    The API appends every rating to the stream instead of committing it.
+    A flusher reads the stream in batches through a consumer group, keeps
+    only the latest rating of every user for a photo, writes the batch with
+    a single statement and then acknowledges and deletes the entries.
+    Entries of a flusher that crashed before acknowledging are claimed by
+    another flusher once they have been pending for claim_idle seconds.
+
+    Ratings become visible after the next flush. Batches are written in
+    stream order as long as a single flusher runs.
+
+    :param redis_client: Factory returning an async context manager with a Redis client.
+    :type redis_client: Callable
+    :param stream: Key of the Redis stream.
+    :type stream: str
+    :param batch_size: Maximum number of entries written at once.
+    :type batch_size: int
+    :param claim_idle: Seconds after which entries of another flusher are taken over.
+    :type claim_idle: float
+    """
+
+    GROUP = "flushers"
+
+    def __init__(
+        self,
+        redis_client: Callable[[], AsyncContextManager[Redis]],
+        stream: str = "ratings:buffer",
+        batch_size: int = 500,
+        claim_idle: float = 60.0,
+    ) -> None:
+        self._redis_client = redis_client
+        self._stream = stream
+        self._batch_size = batch_size
+        self._claim_idle = claim_idle
+
+    async def add(self, photo_id: int, user_id: int, rating: int) -> None:
+        """
+        Buffer a rating.
+
+        :param photo_id: Photo ID.
+        :param user_id: The ID of the user who is rating.
+        :param rating: The rating value (from 1 to 5 stars).
+        """
+        fields = {"photo_id": photo_id, "user_id": user_id, "rating": rating}
+        async with self._redis_client() as redis:
+            await redis.xadd(self._stream, fields)
+
+    async def read_batch(self, consumer: str) -> list[tuple[str, dict]]:
+        """
+        Take the next batch of buffered ratings.
+
+        Entries this flusher failed to write come first, then entries left
+        pending by a crashed flusher, then new ones.
+
+        :param consumer: Name of the flusher within the consumer group.
+        :return: (entry ID, fields) pairs in stream order.
+        :rtype: list[tuple[str, dict]]
+        """
+        async with self._redis_client() as redis:
+            try:
+                await redis.xgroup_create(
+                    self._stream, self.GROUP, id="0", mkstream=True
+                )
+            except ResponseError as err:
+                if "BUSYGROUP" not in str(err):
+                    raise
+            entries = await self._read_group(redis, consumer, "0")
+            if not entries:
+                _, entries, *_ = await redis.xautoclaim(
+                    self._stream,
+                    self.GROUP,
+                    consumer,
+                    min_idle_time=int(self._claim_idle * 1000),
+                    count=self._batch_size,
+                )
+            if not entries:
+                entries = await self._read_group(redis, consumer, ">")
+        return [
+            (_decode(entry_id), _decode_fields(fields)) for entry_id, fields in entries
+        ]
+
+    async def _read_group(self, redis: Redis, consumer: str, start: str) -> list:
+        response = await redis.xreadgroup(
+            self.GROUP, consumer, {self._stream: start}, count=self._batch_size
+        )
+        return response[0][1] if response else []
+
+    async def ack(self, entry_ids: list[str]) -> None:
+        """
+        Remove written entries from the stream.
+
+        :param entry_ids: IDs returned by read_batch.
+        """
+        if not entry_ids:
+            return
+        async with self._redis_client() as redis:
+            async with redis.pipeline(transaction=True) as pipe:
+                pipe.xack(self._stream, self.GROUP, *entry_ids)
+                pipe.xdel(self._stream, *entry_ids)
+                await pipe.execute()
+
+    @staticmethod
+    def latest_ratings(entries: list[tuple[str, dict]]) -> list[tuple[int, int, int]]:
+        """
+        Keep the latest rating of every user for a photo.
+
+        :param entries: Entries in stream order.
+        :return: (photo ID, user ID, rating) triples.
+        :rtype: list[tuple[int, int, int]]
+        """
+        latest: dict[tuple[int, int], int] = {}
+        for _, fields in entries:
+            key = (int(fields["photo_id"]), int(fields["user_id"]))
+            latest[key] = int(fields["rating"])
+        return [(*key, rating) for key, rating in latest.items()]
+
+    async def flush(
+        self,
+        rating_repository_factory: Callable,
+        consumer: str,
+        on_flushed: Callable[[], Awaitable] | None = None,
+    ) -> int:
+        """
+        Write one batch of buffered ratings to the database.
+
+        :param rating_repository_factory: Returns a rating repository.
+        :param consumer: Name of the flusher within the consumer group.
+        :param on_flushed: Awaited after a non-empty batch was written.
+        :return: Number of entries taken from the stream.
+        :rtype: int
+        """
+        entries = await self.read_batch(consumer)
+        if not entries:
+            return 0
+        ratings = self.latest_ratings(entries)
+        await rating_repository_factory().upsert_ratings(ratings)
+        await self.ack([entry_id for entry_id, _ in entries])
+        if on_flushed is not None:
+            await on_flushed()
+        return len(entries)
+
+    async def run(
+        self,
+        rating_repository_factory: Callable,
+        interval: float,
+        stopping: asyncio.Event,
+        on_flushed: Callable[[], Awaitable] | None = None,
+    ) -> None:
+        """
+        Flush batches until stopping is set, then flush what is left.
+
+        A full batch is followed by the next one right away; otherwise the
+        flusher waits interval seconds.
+
+        :param rating_repository_factory: Returns a rating repository.
+        :param interval: Seconds between flushes of a quiet stream.
+        :param stopping: Event ending the loop.
+        :param on_flushed: Awaited after every non-empty batch.
+        """
+        consumer = f"{socket.gethostname()}-{os.getpid()}"
+        while True:
+            started = time.monotonic()
+            try:
+                flushed = await self.flush(
+                    rating_repository_factory, consumer, on_flushed
+                )
+            except Exception:
+                logger.exception("Rating flush failed")
+                flushed = 0
+            if flushed >= self._batch_size:
+                continue
+            if stopping.is_set():
+                return
+            try:
+                await asyncio.wait_for(
+                    stopping.wait(),
+                    timeout=max(0.0, interval - (time.monotonic() - started)),
+                )
+            except asyncio.TimeoutError:
+                pass
+
+
+def _decode(value) -> str:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def _decode_fields(fields: dict) -> dict:
+    return {_decode(name): _decode(value) for name, value in fields.items()}
@@ -0,0 +1,228 @@
+import asyncio
+import json
+import logging
+from typing import AsyncContextManager, Callable
+import numpy as np
+from redis.asyncio import Redis
+
+logger = logging.getLogger(__name__)
+
+_NO_PHOTOS = np.empty(0, dtype=np.int64)
+
+
+class TagPhotoIndex:
+    """
+    In-process inverted index from tags to the photos carrying them.
+
+    Every tag maps to a sorted NumPy array of photo IDs. Related photos of a
+    photo are ranked by the number of tags they share with it: the posting
+    arrays of the photo's tags are concatenated and counted with np.unique,
+    and only the best candidates are sorted.
+
+    The index is loaded from photo_m2m_tags and kept current through change
+    notifications on a Redis channel: every process publishes the new tag
+    set of a photo it creates, retags or deletes, and the tags it deletes,
+    and every process applies the notifications it receives (including its
+    own, which is harmless as applying a notification twice changes nothing).
+
+    :param redis_client: Factory returning an async context manager with a Redis client.
+    :type redis_client: Callable
+    :param channel: Redis channel of the change notifications.
+    :type channel: str
+    """
+
+    def __init__(
+        self,
+        redis_client: Callable[[], AsyncContextManager[Redis]],
+        channel: str = "photos:tags:changes",
+    ) -> None:
+        self._redis_client = redis_client
+        self._channel = channel
+        self._postings: dict[int, np.ndarray] = {}
+        self._photo_tags: dict[int, tuple[int, ...]] = {}
+        self._loaded = False
+        self._lock = asyncio.Lock()
+
+    def set_photo_tags(self, photo_id: int, tag_ids: list[int]) -> None:
+        """
+        Replace the tags of a photo; an empty list removes the photo.
+
+        :param photo_id: ID of the photo.
+        :param tag_ids: All tags of the photo.
+        """
+        old_tags = set(self._photo_tags.pop(photo_id, ()))
+        new_tags = set(tag_ids)
+        for tag_id in old_tags - new_tags:
+            postings = self._postings.get(tag_id)
+            if postings is None:
+                continue
+            index = np.searchsorted(postings, photo_id)
+            if index < len(postings) and postings[index] == photo_id:
+                postings = np.delete(postings, index)
+            if len(postings):
+                self._postings[tag_id] = postings
+            else:
+                del self._postings[tag_id]
+        for tag_id in new_tags - old_tags:
+            postings = self._postings.get(tag_id, _NO_PHOTOS)
+            index = np.searchsorted(postings, photo_id)
+            if index == len(postings) or postings[index] != photo_id:
+                self._postings[tag_id] = np.insert(postings, index, photo_id)
+        if new_tags:
+            self._photo_tags[photo_id] = tuple(sorted(new_tags))
+
+    def remove_tag(self, tag_id: int) -> None:
+        """
+        Drop a deleted tag from the index.
+
+        :param tag_id: ID of the deleted tag.
+        """
+        postings = self._postings.pop(tag_id, None)
+        if postings is None:
+            return
+        for photo_id in postings.tolist():
+            tags = tuple(
+                other for other in self._photo_tags.get(photo_id, ()) if other != tag_id
+            )
+            if tags:
+                self._photo_tags[photo_id] = tags
+            else:
+                self._photo_tags.pop(photo_id, None)
+
+    def load(self, photo_tags: list[tuple[int, int]]) -> None:
+        """
+        Replace the whole index.
+
+        :param photo_tags: (photo ID, tag ID) pairs ordered by photo ID.
+        """
+        postings: dict[int, list[int]] = {}
+        grouped: dict[int, list[int]] = {}
+        for photo_id, tag_id in photo_tags:
+            # photo IDs arrive in order, so every array stays sorted
+            postings.setdefault(tag_id, []).append(photo_id)
+            grouped.setdefault(photo_id, []).append(tag_id)
+        self._postings = {
+            tag_id: np.unique(np.array(photo_ids, dtype=np.int64))
+            for tag_id, photo_ids in postings.items()
+        }
+        self._photo_tags = {
+            photo_id: tuple(sorted(set(tag_ids)))
+            for photo_id, tag_ids in grouped.items()
+        }
+        self._loaded = True
+
+    async def refresh(self, tags_repository) -> None:
+        """
+        Load the index from the database.
+
+        :param tags_repository: The repository for tag data.
+        """
+        async with self._lock:
+            self.load(await tags_repository.get_photo_tag_ids())
+
+    def related(self, photo_id: int, limit: int) -> list[int]:
+        """
+        Rank photos by the number of tags they share with a photo.
+
+        :param photo_id: ID of the photo.
+        :param limit: Maximum number of results.
+        :return: IDs of related photos, most shared tags (then newest) first.
+        :rtype: list[int]
+        """
+        tag_ids = self._photo_tags.get(photo_id, ())
+        if not tag_ids or limit <= 0:
+            return []
+        candidates = np.concatenate([self._postings[tag_id] for tag_id in tag_ids])
+        # sorted unique IDs with the number of shared tags of each
+        ids, counts = np.unique(candidates, return_counts=True)
+        others = ids != photo_id
+        ids, counts = ids[others], counts[others]
+        if not len(ids):
+            return []
+        # one key orders by shared tags, then by ID
+        scores = counts.astype(np.int64) * (int(ids[-1]) + 1) + ids
+        if len(scores) > limit:
+            best = np.argpartition(scores, len(scores) - limit)[-limit:]
+        else:
+            best = np.arange(len(scores))
+        best = best[np.argsort(scores[best])[::-1]]
+        return ids[best].tolist()
+
+    async def find_related(
+        self, tags_repository, photo_id: int, limit: int
+    ) -> list[int]:
+        """
+        Find the photos sharing the most tags with a photo.
+
+        The index is loaded on first use if no listener has loaded it yet.
+
+        :param tags_repository: The repository for tag data.
+        :param photo_id: ID of the photo.
+        :param limit: Maximum number of results.
+        :return: IDs of related photos, best first.
+        :rtype: list[int]
+        """
+        if not self._loaded:
+            async with self._lock:
+                if not self._loaded:
+                    self.load(await tags_repository.get_photo_tag_ids())
+        return self.related(photo_id, limit)
+
+    async def publish(self, photo_id: int, tag_ids: list[int]) -> None:
+        """
+        Apply a change of a photo's tags and notify the other processes.
+
+        :param photo_id: ID of the photo.
+        :param tag_ids: All tags of the photo, empty when the photo was deleted.
+        """
+        self.set_photo_tags(photo_id, tag_ids)
+        message = json.dumps({"photo_id": photo_id, "tags": list(tag_ids)})
+        async with self._redis_client() as redis:
+            await redis.publish(self._channel, message)
+
+    async def publish_tag_deleted(self, tag_id: int) -> None:
+        """
+        Drop a deleted tag and notify the other processes.
+
+        :param tag_id: ID of the deleted tag.
+        """
+        self.remove_tag(tag_id)
+        message = json.dumps({"deleted_tag_id": tag_id})
+        async with self._redis_client() as redis:
+            await redis.publish(self._channel, message)
+
+    async def listen(
+        self, tags_repository_factory: Callable, retry_delay: float = 1.0
+    ) -> None:
+        """
+        Apply change notifications until cancelled.
+
+        The index is reloaded after subscribing, so no change made while the
+        process was not subscribed is missed; notifications received during
+        the load are applied after it. A lost connection is re-established
+        the same way.
+
+        :param tags_repository_factory: Returns a tag repository for every load.
+        :param retry_delay: Seconds to wait before reconnecting.
+        """
+        while True:
+            try:
+                async with self._redis_client() as redis:
+                    async with redis.pubsub() as pubsub:
+                        await pubsub.subscribe(self._channel)
+                        await self.refresh(tags_repository_factory())
+                        async for message in pubsub.listen():
+                            if message["type"] != "message":
+                                continue
+                            change = json.loads(message["data"])
+                            if "deleted_tag_id" in change:
+                                self.remove_tag(change["deleted_tag_id"])
+                            else:
+                                self.set_photo_tags(
+                                    change["photo_id"], change["tags"]
+                                )
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Tag index notifications interrupted")
+                await asyncio.sleep(retry_delay)
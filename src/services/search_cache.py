@@ -0,0 +1,163 @@
+import hashlib
+import json
+from typing import AsyncContextManager, Callable
+from redis.asyncio import Redis
+
+
+class PhotoSearchCache:
+    """
+    Redis cache of photo search results keyed by the normalized filter set.
+
+    Only the ordered list of matching photo IDs is stored, and separately the
+    facet counts of the result when they were asked for. Every entry records
+    the generation it was computed for; bumping the generation counter
+    invalidates all entries at once without scanning keys.
+
+    Results ordered by the number of comments additionally record the
+    generation of the comment counts, so a new or deleted comment only
+    invalidates those and leaves the other results cached.
+
+    :param redis_client: Factory returning an async context manager with a Redis client.
+    :type redis_client: Callable
+    :param ttl: Lifetime of a cached result in seconds.
+    :type ttl: int
+    """
+
+    GENERATION_KEY = "photos:search:generation"
+    COMMENTS_GENERATION_KEY = "photos:search:generation:comments"
+    KEY_PREFIX = "photos:search:result:"
+    FACETS_KEY_PREFIX = "photos:search:facets:"
+
+    def __init__(
+        self, redis_client: Callable[[], AsyncContextManager[Redis]], ttl: int
+    ) -> None:
+        self._redis_client = redis_client
+        self._ttl = ttl
+
+    @staticmethod
+    def normalize_filters(**filters) -> dict:
+        """
+        Bring equivalent filter sets to the same form.
+
+        Unused filters are dropped, keywords are matched case-insensitively
+        and rating thresholds are compared as numbers. Whitespace in keywords
+        is kept, because it is part of the searched substring.
+
+        :return: Normalized filters.
+        :rtype: dict
+        """
+        normalized = {}
+        for name, value in filters.items():
+            if value is None or value == "":
+                continue
+            if name == "keyword":
+                value = value.lower()
+            elif name.startswith("avg_rating"):
+                try:
+                    value = float(value)
+                except ValueError:
+                    pass
+            normalized[name] = value
+        return normalized
+
+    def _key(self, filters: dict, prefix: str = KEY_PREFIX) -> str:
+        payload = json.dumps(filters, sort_keys=True, default=str)
+        return prefix + hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _generation_keys(self, filters: dict) -> list[str]:
+        if filters.get("sort") == "most_commented":
+            return [self.GENERATION_KEY, self.COMMENTS_GENERATION_KEY]
+        return [self.GENERATION_KEY]
+
+    async def lookup(
+        self, filters: dict
+    ) -> tuple[list[int] | None, int | list[int]]:
+        """
+        Fetch cached photo IDs for a filter set together with the current generation.
+
+        The generations and the entry are read with a single MGET.
+
+        :param filters: Normalized filters.
+        :return: (photo IDs or None on a miss, current generation); the
+            generation is a list with the comment counts generation for
+            results sorted by the number of comments.
+        :rtype: tuple
+        """
+        generation_keys = self._generation_keys(filters)
+        async with self._redis_client() as redis:
+            *generations, entry = await redis.mget(
+                *generation_keys, self._key(filters)
+            )
+        generations = [int(value or 0) for value in generations]
+        generation = generations[0] if len(generations) == 1 else generations
+        if entry is None:
+            return None, generation
+        entry = json.loads(entry)
+        if entry["generation"] != generation:
+            return None, generation
+        return entry["ids"], generation
+
+    async def store(
+        self, filters: dict, generation: int | list[int], photo_ids: list[int]
+    ) -> None:
+        """
+        Cache photo IDs computed while the given generation was current.
+
+        A result computed concurrently with an invalidation carries the old
+        generation and is ignored by later lookups.
+
+        :param filters: Normalized filters.
+        :param generation: Generation returned by the preceding lookup.
+        :param photo_ids: Ordered IDs of the matching photos.
+        """
+        entry = json.dumps({"generation": generation, "ids": photo_ids})
+        async with self._redis_client() as redis:
+            await redis.set(self._key(filters), entry, ex=self._ttl)
+
+    async def lookup_facets(self, filters: dict) -> tuple[dict | None, int]:
+        """
+        Fetch cached facet counts for a filter set together with the current generation.
+
+        :param filters: Normalized filters.
+        :return: (facets or None on a miss, current generation)
+        :rtype: tuple
+        """
+        async with self._redis_client() as redis:
+            generation, entry = await redis.mget(
+                self.GENERATION_KEY, self._key(filters, self.FACETS_KEY_PREFIX)
+            )
+        generation = int(generation or 0)
+        if entry is None:
+            return None, generation
+        entry = json.loads(entry)
+        if entry["generation"] != generation:
+            return None, generation
+        return entry["facets"], generation
+
+    async def store_facets(self, filters: dict, generation: int, facets: dict) -> None:
+        """
+        Cache facet counts computed while the given generation was current.
+
+        :param filters: Normalized filters.
+        :param generation: Generation returned by the preceding lookup.
+        :param facets: Facet counts of the matching photos.
+        """
+        entry = json.dumps({"generation": generation, "facets": facets})
+        async with self._redis_client() as redis:
+            await redis.set(
+                self._key(filters, self.FACETS_KEY_PREFIX), entry, ex=self._ttl
+            )
+
+    async def invalidate(self) -> None:
+        """
+        Invalidate all cached search results.
+        """
+        async with self._redis_client() as redis:
+            await redis.incr(self.GENERATION_KEY)
+
+    async def invalidate_comment_counts(self) -> None:
+        """
+        Invalidate the cached search results sorted by the number of comments.
+        """
+        async with self._redis_client() as redis:
+            await redis.incr(self.COMMENTS_GENERATION_KEY)
@@ -0,0 +1,216 @@
+import asyncio
+from PIL import Image, ImageOps
+
+HASH_BITS = 64
+
+
+def perceptual_hash(file) -> int:
+    """
+    Compute the 64-bit difference hash (dHash) of an image.
+
+    The image is reduced to 9x8 grayscale pixels and every bit tells whether
+    a pixel is brighter than its right neighbour, so resized, recompressed
+    or slightly edited copies get hashes a small Hamming distance apart.
+
+    :param file: Binary file object with the image; read from its start.
+    :return: Unsigned 64-bit hash.
+    :rtype: int
+    :raises OSError: If the image cannot be decoded.
+    :raises Image.DecompressionBombError: If the image exceeds Pillow's pixel limit.
+    """
+    file.seek(0)
+    with Image.open(file) as image:
+        # let the JPEG decoder skip most of the pixels
+        image.draft("L", (64, 64))
+        image = ImageOps.exif_transpose(image).convert("L")
+        small = image.resize((9, 8), Image.LANCZOS)
+    file.seek(0)
+    pixels = list(small.getdata())
+    value = 0
+    for row in range(8):
+        for column in range(8):
+            left = pixels[row * 9 + column]
+            right = pixels[row * 9 + column + 1]
+            value = (value << 1) | (left > right)
+    return value
+
+
+def to_signed(value: int) -> int:
+    """
+    :param value: Unsigned 64-bit hash.
+    :return: The same bits as a signed 64-bit integer, as stored in BIGINT columns.
+    :rtype: int
+    """
+    return value - (1 << HASH_BITS) if value >= 1 << (HASH_BITS - 1) else value
+
+
+def to_unsigned(value: int) -> int:
+    """
+    :param value: Signed 64-bit integer from a BIGINT column.
+    :return: The hash as an unsigned 64-bit integer.
+    :rtype: int
+    """
+    return value & ((1 << HASH_BITS) - 1)
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """
+    :return: Number of bits in which two hashes differ.
+    :rtype: int
+    """
+    return (a ^ b).bit_count()
+
+
+class BKTree:
+    """
+    Burkhard-Keller tree of hashes under the Hamming distance.
+
+    Every node keeps its children by their distance to it. By the triangle
+    inequality a search for hashes within radius r of a query at distance d
+    from a node only has to visit children at distances d - r to d + r,
+    which skips most of the tree for small radii.
+
+    Hashes are never removed from the tree; photos are, and a hash without
+    photos is skipped by searches.
+    """
+
+    def __init__(self) -> None:
+        self._root: tuple[int, dict] | None = None
+        self._photos: dict[int, set[int]] = {}
+        self._hashes: dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    def get(self, photo_id: int) -> int | None:
+        """
+        :param photo_id: ID of a photo.
+        :return: Hash of the photo, None if it is not in the tree.
+        :rtype: int | None
+        """
+        return self._hashes.get(photo_id)
+
+    def add(self, value: int, photo_id: int) -> None:
+        """
+        Add a photo with the given hash.
+
+        :param value: Unsigned 64-bit hash.
+        :param photo_id: ID of the photo.
+        """
+        self.remove(photo_id)
+        self._hashes[photo_id] = value
+        photos = self._photos.get(value)
+        if photos is not None:
+            photos.add(photo_id)
+            return
+        self._photos[value] = {photo_id}
+        if self._root is None:
+            self._root = (value, {})
+            return
+        node_value, children = self._root
+        while True:
+            distance = hamming_distance(value, node_value)
+            child = children.get(distance)
+            if child is None:
+                children[distance] = (value, {})
+                return
+            node_value, children = child
+
+    def remove(self, photo_id: int) -> None:
+        """
+        Remove a photo; unknown IDs are ignored.
+
+        :param photo_id: ID of the photo.
+        """
+        value = self._hashes.pop(photo_id, None)
+        if value is not None:
+            self._photos[value].discard(photo_id)
+
+    def search(self, value: int, max_distance: int) -> list[tuple[int, int]]:
+        """
+        Find the photos whose hashes are within max_distance of the given hash.
+
+        :param value: Unsigned 64-bit hash.
+        :param max_distance: Largest Hamming distance to include.
+        :return: (distance, photo ID) pairs sorted by distance.
+        :rtype: list[tuple[int, int]]
+        """
+        if self._root is None:
+            return []
+        matches = []
+        stack = [self._root]
+        while stack:
+            node_value, children = stack.pop()
+            distance = hamming_distance(value, node_value)
+            if distance <= max_distance:
+                photos = self._photos[node_value]
+                matches.extend((distance, photo_id) for photo_id in photos)
+            low, high = distance - max_distance, distance + max_distance
+            stack.extend(
+                child for edge, child in children.items() if low <= edge <= high
+            )
+        matches.sort()
+        return matches
+
+
+class SimilarPhotoIndex:
+    """
+    In-process index of the perceptual hashes of all photos.
+
+    The first use loads every hash from the database into a BKTree. Photos
+    created by this process are added as they are created; photos created
+    by other processes are picked up before each query by loading the hashes
+    of photos with IDs above the highest one seen so far. Deleted photos are
+    removed locally, and query results are resolved against the database,
+    which drops photos deleted elsewhere.
+    """
+
+    def __init__(self) -> None:
+        self._tree = BKTree()
+        self._last_id = 0
+        self._lock = asyncio.Lock()
+
+    def add(self, photo_id: int, value: int) -> None:
+        """
+        :param photo_id: ID of a new photo.
+        :param value: Unsigned 64-bit hash of the photo.
+        """
+        self._tree.add(value, photo_id)
+
+    def remove(self, photo_id: int) -> None:
+        """
+        :param photo_id: ID of a deleted photo.
+        """
+        self._tree.remove(photo_id)
+
+    async def refresh(self, photos_repository) -> None:
+        """
+        Load the hashes of the photos created since the last refresh.
+
+        :param photos_repository: The repository for photo data.
+        """
+        async with self._lock:
+            rows = await photos_repository.get_photo_hashes(after_id=self._last_id)
+            for photo_id, value in rows:
+                self._tree.add(to_unsigned(value), photo_id)
+                self._last_id = max(self._last_id, photo_id)
+
+    async def find_similar(
+        self, photos_repository, photo_id: int, max_distance: int, limit: int
+    ) -> list[int] | None:
+        """
+        Find the photos most similar to a photo.
+
+        :param photos_repository: The repository for photo data.
+        :param photo_id: ID of the photo to compare with.
+        :param max_distance: Largest Hamming distance to include.
+        :param limit: Maximum number of results.
+        :return: IDs of similar photos, closest first, or None if the photo has no hash.
+        :rtype: list[int] | None
+        """
+        await self.refresh(photos_repository)
+        value = self._tree.get(photo_id)
+        if value is None:
+            return None
+        matches = self._tree.search(value, max_distance)
+        return [match_id for _, match_id in matches if match_id != photo_id][:limit]
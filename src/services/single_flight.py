@@ -0,0 +1,145 @@
+import asyncio
+import uuid
+from typing import AsyncContextManager, Awaitable, Callable, Hashable, TypeVar
+from redis.asyncio import Redis
+
+T = TypeVar("T")
+
+# deletes the lock only if it is still owned by the caller
+RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+class SingleFlight:
+    """
+    Share one in-flight call per key between concurrent callers in this process.
+
+    The first caller starts the load as a task, later callers with the same
+    key await that task instead of starting their own. A caller being
+    cancelled does not cancel the shared load.
+    """
+
+    def __init__(self) -> None:
+        self._tasks: dict[Hashable, asyncio.Task] = {}
+
+    async def do(self, key: Hashable, loader: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run the loader for the key unless a call for the key is already in flight.
+
+        :param key: Identifier of the loaded resource.
+        :param loader: Coroutine function producing the value.
+        :return: The value produced by the in-flight call.
+        """
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(loader())
+            self._tasks[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+
+    def in_flight(self) -> int:
+        """
+        :return: Number of keys currently being loaded.
+        :rtype: int
+        """
+        return len(self._tasks)
+
+
+class CoalescingCache:
+    """
+    Redis read-through cache that lets only one loader run per key at a time.
+
+    Within a process concurrent misses share a single load (SingleFlight).
+    Across processes the loader runs under a short Redis lock; processes that
+    fail to take the lock poll the cache until the lock holder fills it, and
+    fall back to loading themselves if it does not do so in time.
+
+    :param redis_client: Factory returning an async context manager with a Redis client.
+    :type redis_client: Callable
+    :param lock_timeout: Seconds after which a lock of a crashed loader expires.
+    :type lock_timeout: float
+    :param poll_interval: Seconds between cache reads while waiting for another process.
+    :type poll_interval: float
+    """
+
+    def __init__(
+        self,
+        redis_client: Callable[[], AsyncContextManager[Redis]],
+        lock_timeout: float = 5.0,
+        poll_interval: float = 0.05,
+    ) -> None:
+        self._redis_client = redis_client
+        self._lock_timeout = lock_timeout
+        self._poll_interval = poll_interval
+        self._flight = SingleFlight()
+
+    async def get_or_load(
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[bytes | None]],
+        ttl: int,
+    ) -> bytes | None:
+        """
+        Return the cached value for the key, loading and caching it on a miss.
+
+        :param key: Redis key of the cached value.
+        :param loader: Coroutine function producing the serialized value,
+            or None if the resource does not exist (None is not cached).
+        :param ttl: Lifetime of the cached value in seconds.
+        :return: Serialized value or None.
+        """
+        return await self._flight.do(key, lambda: self._load(key, loader, ttl))
+
+    async def invalidate(self, key: str) -> None:
+        """
+        Drop the cached value, so the next lookup loads it again.
+
+        :param key: Redis key of the cached value.
+        """
+        async with self._redis_client() as redis:
+            await redis.delete(key)
+
+    async def _load(
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[bytes | None]],
+        ttl: int,
+    ) -> bytes | None:
+        async with self._redis_client() as redis:
+            value = await redis.get(key)
+            if value is not None:
+                return value
+
+            lock_key = f"lock:{key}"
+            token = uuid.uuid4().hex
+            locked = await redis.set(
+                lock_key, token, nx=True, px=int(self._lock_timeout * 1000)
+            )
+            if locked:
+                try:
+                    value = await loader()
+                    if value is not None:
+                        await redis.set(key, value, ex=ttl)
+                    return value
+                finally:
+                    await redis.eval(RELEASE_LOCK_SCRIPT, 1, lock_key, token)
+
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + self._lock_timeout
+            while loop.time() < deadline:
+                await asyncio.sleep(self._poll_interval)
+                value = await redis.get(key)
+                if value is not None:
+                    return value
+                if not await redis.exists(lock_key):
+                    break
+        # the lock holder gave up or found nothing; load without the lock
+        return await loader()
@@ -0,0 +1,215 @@
+import asyncio
+import time
+from typing import Callable, Iterable
+import numpy as np
+from scipy import sparse
+from starlette.concurrency import run_in_threadpool
+from src.database.models import Tag
+
+
+def count_cooccurrences(
+    photo_tags: Iterable[tuple[int, int]],
+) -> tuple[sparse.csr_matrix, np.ndarray, np.ndarray]:
+    """
+    Build the sparse tag co-occurrence matrix from photo-tag pairs.
+
+    The photo-tag incidence matrix A is built once and the co-occurrence
+    matrix is its Gram matrix A.T @ A; its diagonal holds the number of
+    photos per tag and is moved out of the matrix.
+
+    :param photo_tags: (photo ID, tag ID) pairs.
+    :return: (co-occurrence counts, number of photos by column, tag ID by column)
+    :rtype: tuple
+    """
+    pairs = np.array(list(photo_tags), dtype=np.int64).reshape(-1, 2)
+    photo_ids, photo_rows = np.unique(pairs[:, 0], return_inverse=True)
+    tag_ids, tag_columns = np.unique(pairs[:, 1], return_inverse=True)
+    incidence = sparse.csr_matrix(
+        (np.ones(len(pairs), dtype=np.int64), (photo_rows, tag_columns)),
+        shape=(len(photo_ids), len(tag_ids)),
+    )
+    # a pair listed twice still counts the photo once
+    incidence.sum_duplicates()
+    incidence.data[:] = 1
+    matrix = (incidence.T @ incidence).tocsr()
+    tag_counts = matrix.diagonal().astype(np.int64)
+    matrix.setdiag(0)
+    matrix.eliminate_zeros()
+    return matrix, tag_counts, tag_ids
+
+
+class TagCooccurrence:
+    """
+    In-memory tag co-occurrence matrix used to suggest tags.
+
+    The matrix is a SciPy sparse matrix: entry (t, s) is the number of
+    photos tagged with both t and s. It is built from photo_m2m_tags on
+    first use and rebuilt in the background once it is older than
+    rebuild_interval, which also picks up changes made by other processes.
+    Tags that this process adds to or removes from photos are collected in a
+    small sparse delta matrix that is folded into the main matrix once it
+    grows. Updates that happen while a rebuild is running are lost until the
+    next rebuild.
+
+    :param tags_repository_factory: Returns a tag repository for every build.
+    :type tags_repository_factory: Callable
+    :param rebuild_interval: Seconds after which the matrix is rebuilt.
+    :type rebuild_interval: float
+    :param max_delta: Number of delta entries above which the delta matrix is folded in.
+    :type max_delta: int
+    """
+
+    def __init__(
+        self,
+        tags_repository_factory: Callable,
+        rebuild_interval: float = 3600.0,
+        max_delta: int = 10000,
+    ) -> None:
+        self._tags_repository_factory = tags_repository_factory
+        self._rebuild_interval = rebuild_interval
+        self._max_delta = max_delta
+        self._matrix = sparse.csr_matrix((0, 0), dtype=np.int64)
+        self._delta = sparse.dok_matrix((0, 0), dtype=np.int64)
+        self._tag_counts = np.zeros(0, dtype=np.int64)
+        self._tag_ids = np.zeros(0, dtype=np.int64)
+        self._columns: dict[int, int] = {}
+        self._built_at: float | None = None
+        self._lock = asyncio.Lock()
+        self._rebuild_task: asyncio.Task | None = None
+
+    def _column(self, tag_id: int) -> int:
+        column = self._columns.get(tag_id)
+        if column is None:
+            column = len(self._tag_ids)
+            self._columns[tag_id] = column
+            self._tag_ids = np.append(self._tag_ids, tag_id)
+            self._tag_counts = np.append(self._tag_counts, 0)
+            size = column + 1
+            self._matrix.resize((size, size))
+            self._delta.resize((size, size))
+        return column
+
+    def _count_photo(self, tag_ids: list[int], sign: int) -> None:
+        if self._built_at is None:
+            return
+        columns = [self._column(tag_id) for tag_id in set(tag_ids)]
+        for column in columns:
+            self._tag_counts[column] += sign
+            for other in columns:
+                if other != column:
+                    self._delta[column, other] += sign
+        if self._delta.nnz > self._max_delta:
+            self._matrix = (self._matrix + self._delta.tocsr()).tocsr()
+            self._delta = sparse.dok_matrix(self._matrix.shape, dtype=np.int64)
+
+    def add_photo(self, tag_ids: list[int]) -> None:
+        """
+        Count the tags of a newly tagged photo; ignored until the matrix is
+        built, as the build reads the photo from the database.
+
+        :param tag_ids: Tags of a newly tagged photo.
+        """
+        self._count_photo(tag_ids, 1)
+
+    def remove_photo(self, tag_ids: list[int]) -> None:
+        """
+        Uncount the tags a photo no longer has; ignored until the matrix is built.
+
+        :param tag_ids: Tags a photo no longer has.
+        """
+        self._count_photo(tag_ids, -1)
+
+    def suggest(self, tag_ids: list[int], limit: int) -> list[tuple[int, float]]:
+        """
+        Rank the tags that most often accompany the given tags.
+
+        A candidate scores the sum over the given tags t of the share of
+        photos tagged t that also carry the candidate. The rows of the given
+        tags are scaled and summed as one sparse operation.
+
+        :param tag_ids: Tags the photo already has.
+        :param limit: Maximum number of suggestions.
+        :return: (tag ID, score) pairs, best first.
+        :rtype: list[tuple[int, float]]
+        """
+        given = [
+            self._columns[tag_id] for tag_id in set(tag_ids) if tag_id in self._columns
+        ]
+        sources = [column for column in given if self._tag_counts[column] > 0]
+        if not sources or limit <= 0:
+            return []
+        rows = (self._matrix[sources] + self._delta.tocsr()[sources]).tocsr()
+        rows.data = np.maximum(rows.data, 0) / np.repeat(
+            self._tag_counts[sources], np.diff(rows.indptr)
+        )
+        scores = np.asarray(rows.sum(axis=0)).ravel()
+        scores[given] = 0
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > limit:
+            # keep everything tied with the last place, then order exactly
+            threshold = np.partition(scores[candidates], -limit)[-limit]
+            candidates = candidates[scores[candidates] >= threshold]
+        order = np.lexsort((self._tag_ids[candidates], -scores[candidates]))
+        best = candidates[order[:limit]]
+        return [
+            (int(tag_id), float(score))
+            for tag_id, score in zip(self._tag_ids[best], scores[best])
+        ]
+
+    def _is_stale(self) -> bool:
+        return (
+            self._built_at is None
+            or time.monotonic() - self._built_at > self._rebuild_interval
+        )
+
+    async def rebuild(self) -> None:
+        """
+        Rebuild the matrix from the database unless another caller has just
+        rebuilt it.
+
+        The tag data is read through a repository of its own, so a rebuild
+        running in the background does not use the session of a request.
+        """
+        async with self._lock:
+            if not self._is_stale():
+                return
+            photo_tags = await self._tags_repository_factory().get_photo_tag_ids()
+            matrix, tag_counts, tag_ids = await run_in_threadpool(
+                count_cooccurrences, photo_tags
+            )
+            self._matrix, self._tag_counts, self._tag_ids = matrix, tag_counts, tag_ids
+            self._delta = sparse.dok_matrix(matrix.shape, dtype=np.int64)
+            self._columns = {
+                int(tag_id): column for column, tag_id in enumerate(tag_ids)
+            }
+            self._built_at = time.monotonic()
+
+    async def ensure_fresh(self) -> None:
+        """
+        Build the matrix on first use and start a background rebuild when it is stale.
+        """
+        if self._built_at is None:
+            await self.rebuild()
+            return
+        if self._is_stale() and (
+            self._rebuild_task is None or self._rebuild_task.done()
+        ):
+            self._rebuild_task = asyncio.create_task(self.rebuild())
+
+    async def suggest_tags(
+        self, tags_repository, tag_ids: list[int], limit: int
+    ) -> list[Tag]:
+        """
+        Suggest further tags for a photo with the given tags.
+
+        :param tags_repository: The repository used to load the suggested tags.
+        :param tag_ids: Tags the photo already has.
+        :param limit: Maximum number of suggestions.
+        :return: Suggested tags, best first.
+        :rtype: list[Tag]
+        """
+        await self.ensure_fresh()
+        # ask for spares in case some suggested tags were deleted meanwhile
+        ranked = self.suggest(tag_ids, limit * 2)
+        tags = await tags_repository.get_tags_by_ids([tag_id for tag_id, _ in ranked])
+        return tags[:limit]
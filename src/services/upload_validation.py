@@ -0,0 +1,320 @@
+import hashlib
+import json
+import struct
+from dataclasses import dataclass
+from multipart.multipart import MultipartParser, parse_options_header
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from src.services.image_provider import sniff_extension
+
+# bytes of a file part inspected before giving up on finding its dimensions
+HEADER_LIMIT = 64 * 1024
+# bytes needed to recognize any supported image format
+SIGNATURE_LENGTH = 16
+
+# JPEG start-of-frame markers, which carry the image dimensions
+JPEG_SOF_MARKERS = {
+    0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF,
+}
+
+
+@dataclass
+class ImageHeader:
+    extension: str
+    width: int | None = None
+    height: int | None = None
+
+
+class UploadRejected(Exception):
+    """
+    Raised when an upload fails validation.
+
+    :param status_code: HTTP status of the error response.
+    :param detail: Error message.
+    """
+
+    def __init__(self, status_code: int, detail: str) -> None:
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def _jpeg_dimensions(head: bytes) -> tuple[int, int] | None:
+    offset = 2
+    while offset + 9 <= len(head):
+        if head[offset] != 0xFF:
+            return None
+        marker = head[offset + 1]
+        if marker == 0xFF:
+            # fill byte before a marker
+            offset += 1
+            continue
+        if marker in JPEG_SOF_MARKERS:
+            height, width = struct.unpack(">HH", head[offset + 5 : offset + 9])
+            return width, height
+        (length,) = struct.unpack(">H", head[offset + 2 : offset + 4])
+        offset += 2 + length
+    return None
+
+
+def _webp_dimensions(head: bytes) -> tuple[int, int] | None:
+    chunk = head[12:16]
+    if chunk == b"VP8 " and len(head) >= 30:
+        width, height = struct.unpack("<HH", head[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b"VP8L" and len(head) >= 25:
+        bits = int.from_bytes(head[21:25], "little")
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b"VP8X" and len(head) >= 30:
+        width = int.from_bytes(head[24:27], "little") + 1
+        height = int.from_bytes(head[27:30], "little") + 1
+        return width, height
+    return None
+
+
+def read_image_header(head: bytes) -> ImageHeader | None:
+    """
+    Identify an image and read its dimensions from the first bytes of the file.
+
+    Supports JPEG, PNG, GIF and WebP. Width and height are None when they
+    are not within the given bytes (e.g. a JPEG with large metadata).
+
+    :param head: The first bytes of the file.
+    :return: Format and dimensions, or None if the bytes are not an image.
+    :rtype: ImageHeader | None
+    """
+    extension = sniff_extension(head)
+    if extension == "bin":
+        return None
+    dimensions = None
+    if extension == "png" and len(head) >= 24 and head[12:16] == b"IHDR":
+        dimensions = struct.unpack(">II", head[16:24])
+    elif extension == "gif" and len(head) >= 10:
+        dimensions = struct.unpack("<HH", head[6:10])
+    elif extension == "jpg":
+        dimensions = _jpeg_dimensions(head)
+    elif extension == "webp":
+        dimensions = _webp_dimensions(head)
+    if dimensions is None:
+        return ImageHeader(extension)
+    return ImageHeader(extension, *dimensions)
+
+
+class MultipartUploadValidator:
+    """
+    Validates a multipart body while it is being received.
+
+    The body is fed in chunks as they arrive. Every file part must start
+    with the signature of a supported image whose dimensions, when found in
+    its first HEADER_LIMIT bytes, stay within max_pixels. The body must not
+    exceed max_bytes. Violations are reported as soon as they are detected,
+    so a bad upload is rejected after its first few kilobytes.
+
+    The SHA-256 of every file part is computed on the way and stored in
+    digests under the part's field name once the part is complete.
+
+    :param boundary: Multipart boundary from the Content-Type header.
+    :type boundary: bytes
+    :param max_bytes: Maximum size of the request body.
+    :type max_bytes: int
+    :param max_pixels: Maximum width times height of an uploaded image.
+    :type max_pixels: int
+    """
+
+    def __init__(self, boundary: bytes, max_bytes: int, max_pixels: int) -> None:
+        self._max_bytes = max_bytes
+        self._max_pixels = max_pixels
+        self._received = 0
+        self._header_field = b""
+        self._header_value = b""
+        self._is_file = False
+        self._field_name = ""
+        self._digest = hashlib.sha256()
+        self._head = bytearray()
+        self._checked = False
+        self.digests: dict[str, str] = {}
+        self._error: UploadRejected | None = None
+        self._parser = MultipartParser(
+            boundary,
+            {
+                "on_part_begin": self._on_part_begin,
+                "on_header_field": self._on_header_field,
+                "on_header_value": self._on_header_value,
+                "on_header_end": self._on_header_end,
+                "on_part_data": self._on_part_data,
+                "on_part_end": self._on_part_end,
+            },
+        )
+
+    def _on_part_begin(self) -> None:
+        self._is_file = False
+        self._field_name = ""
+        self._digest = hashlib.sha256()
+        self._head = bytearray()
+        self._checked = False
+
+    def _on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_field += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def _on_header_end(self) -> None:
+        if self._header_field.lower() == b"content-disposition":
+            _, options = parse_options_header(self._header_value)
+            self._is_file = b"filename" in options
+            self._field_name = options.get(b"name", b"").decode("latin-1")
+        self._header_field = b""
+        self._header_value = b""
+
+    def _on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if not self._is_file:
+            return
+        self._digest.update(data[start:end])
+        if self._checked:
+            return
+        self._head += data[start : min(end, start + HEADER_LIMIT - len(self._head))]
+        header = read_image_header(bytes(self._head))
+        if header is None and len(self._head) >= SIGNATURE_LENGTH:
+            self._check(None)
+        elif header is not None and header.width is not None:
+            self._check(header)
+        elif len(self._head) >= HEADER_LIMIT:
+            self._check(header)
+
+    def _on_part_end(self) -> None:
+        if not self._is_file:
+            return
+        if not self._checked:
+            self._check(read_image_header(bytes(self._head)))
+        self.digests[self._field_name] = self._digest.hexdigest()
+
+    def _check(self, header: ImageHeader | None) -> None:
+        self._checked = True
+        if header is None:
+            self._error = UploadRejected(415, "Uploaded file is not a supported image.")
+        elif header.width is not None and header.width * header.height > self._max_pixels:
+            self._error = UploadRejected(
+                422,
+                f"Image dimensions {header.width}x{header.height} exceed "
+                f"the limit of {self._max_pixels} pixels.",
+            )
+
+    def feed(self, chunk: bytes) -> None:
+        """
+        Validate the next chunk of the body.
+
+        :param chunk: Bytes received from the client.
+        :raises UploadRejected: If the upload is invalid.
+        """
+        self._received += len(chunk)
+        if self._received > self._max_bytes:
+            raise UploadRejected(
+                413, f"Upload exceeds the limit of {self._max_bytes} bytes."
+            )
+        self._parser.write(chunk)
+        if self._error is not None:
+            raise self._error
+
+
+class UploadValidationMiddleware:
+    """
+    ASGI middleware validating multipart uploads while they stream in.
+
+    Requests whose Content-Length exceeds max_bytes are refused before the
+    body is read. Other multipart bodies pass through a
+    MultipartUploadValidator chunk by chunk; on the first violation the
+    client gets the error response and the application sees a disconnect,
+    so at most a few chunks of a bad upload are ever spooled.
+
+    The SHA-256 digests of the uploaded files are available to the
+    application as request.state.upload_digests (field name -> hex digest).
+
+    :param app: The wrapped application.
+    :param max_bytes: Maximum size of a multipart request body.
+    :param max_pixels: Maximum width times height of an uploaded image.
+    """
+
+    def __init__(self, app: ASGIApp, max_bytes: int, max_pixels: int) -> None:
+        self.app = app
+        self.max_bytes = max_bytes
+        self.max_pixels = max_pixels
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope["headers"])
+        content_type, options = parse_options_header(
+            headers.get(b"content-type", b"")
+        )
+        if content_type != b"multipart/form-data" or b"boundary" not in options:
+            await self.app(scope, receive, send)
+            return
+
+        content_length = headers.get(b"content-length", b"")
+        if content_length.isdigit() and int(content_length) > self.max_bytes:
+            error = UploadRejected(
+                413, f"Upload exceeds the limit of {self.max_bytes} bytes."
+            )
+            await self._reject(send, error)
+            return
+
+        validator = MultipartUploadValidator(
+            options[b"boundary"], self.max_bytes, self.max_pixels
+        )
+        scope.setdefault("state", {})["upload_digests"] = validator.digests
+        rejected = False
+
+        async def validating_receive() -> Message:
+            nonlocal rejected
+            if rejected:
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.request":
+                try:
+                    validator.feed(message.get("body", b""))
+                except UploadRejected as err:
+                    rejected = True
+                    await self._reject(send, err)
+                    return {"type": "http.disconnect"}
+            return message
+
+        async def guarded_send(message: Message) -> None:
+            # the client already got the rejection
+            if not rejected:
+                await send(message)
+
+        await self.app(scope, validating_receive, guarded_send)
+
+    @staticmethod
+    async def _reject(send: Send, error: UploadRejected) -> None:
+        body = json.dumps({"detail": error.detail}).encode("utf-8")
+        await send(
+            {
+                "type": "http.response.start",
+                "status": error.status_code,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"connection", b"close"),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
+
+
+def hash_file(file) -> str:
+    """
+    Compute the SHA-256 of a file object from its start, reading it in chunks.
+
+    :param file: Binary file object; its position is restored afterwards.
+    :return: Hex digest.
+    :rtype: str
+    """
+    position = file.tell()
+    file.seek(0)
+    digest = hashlib.sha256()
+    while chunk := file.read(1024 * 1024):
+        digest.update(chunk)
+    file.seek(position)
+    return digest.hexdigest()
@@ -0,0 +1,94 @@
+import asyncio
+from src.schemas.photo import ImageSize, PhotoSummaryOut, TransformationInput
+from src.repository.photos import PhotoRepository
+from src.services.image_provider import AbstractImageProvider
+
+# fixed set of sizes generated for every photo
+VARIANT_TRANSFORMATIONS = {
+    ImageSize.thumb: TransformationInput(
+        width=150, height=150, crop="thumb", gravity="auto"
+    ),
+    ImageSize.small: TransformationInput(width=320, crop="limit"),
+    ImageSize.medium: TransformationInput(width=640, crop="limit"),
+    ImageSize.large: TransformationInput(width=1280, crop="limit"),
+}
+
+# output formats of every size, None keeps the format of the original
+VARIANT_FORMATS = {"original": None, "webp": "webp"}
+
+
+async def generate_variants(
+    image_provider: AbstractImageProvider, public_id: str
+) -> dict[str, dict[str, str]]:
+    """
+    Generate all sizes of an image in all variant formats.
+
+    The variants are requested from the provider concurrently.
+
+    :param image_provider: The image provider storing the image.
+    :param public_id: identifier of the image.
+    :return: Variant URLs by size and format.
+    :rtype: dict
+    """
+    requests = [
+        (size, fmt, transform.model_copy(update={"fetch_format": fetch_format}))
+        for size, transform in VARIANT_TRANSFORMATIONS.items()
+        for fmt, fetch_format in VARIANT_FORMATS.items()
+    ]
+    urls = await asyncio.gather(
+        *(
+            image_provider.transform_async(public_id, transform)
+            for _, _, transform in requests
+        )
+    )
+    variants: dict[str, dict[str, str]] = {}
+    for (size, fmt, _), url in zip(requests, urls):
+        variants.setdefault(size.value, {})[fmt] = url
+    return variants
+
+
+async def generate_photo_variants(
+    photo_id: int,
+    public_id: str,
+    image_provider: AbstractImageProvider,
+    photos_repository: PhotoRepository,
+) -> None:
+    """
+    Generate the variants of a photo's image and store their URLs on the photo.
+
+    Meant to run after the response has been sent.
+
+    :param photo_id: ID of the photo.
+    :param public_id: identifier of the photo's image.
+    :param image_provider: The image provider storing the image.
+    :param photos_repository: The repository for photo data.
+    """
+    variants = await generate_variants(image_provider, public_id)
+    await photos_repository.update_photo_variants(photo_id, variants)
+
+
+def select_variant(
+    photo: PhotoSummaryOut, size: ImageSize | None, webp: bool
+) -> PhotoSummaryOut:
+    """
+    Fill display_url with the variant of the photo a client asked for.
+
+    Falls back to the transformed or original image while the variants
+    are not generated yet.
+
+    :param photo: The photo.
+    :param size: Requested size, None leaves the photo unchanged.
+    :param webp: Prefer the WebP variant.
+    :return: The photo.
+    :rtype: PhotoSummaryOut
+    """
+    if size is None:
+        return photo
+    urls = (photo.variants or {}).get(size.value, {})
+    photo.display_url = (
+        urls.get("webp" if webp else "original")
+        or urls.get("original")
+        or photo.image_url_transform
+        or photo.image_url
+    )
+    return photo
@@ -1,5 +1,5 @@
 import unittest
-from unittest.mock import MagicMock
+from unittest.mock import AsyncMock, MagicMock
 from sqlalchemy.orm import Session
 from src.database.models import Comment
 from src.repository.comments import CommentsRepository
@@ -37,6 +37,29 @@ class TestComments(unittest.IsolatedAsyncioTestCase):
         self.assertEqual(result.content, self.comment_in.content)
         self.assertEqual(result.photo_id, self.comment_in.photo_id)
 
+    async def test_create_comment_counts_comment(self):
+        await self.comments_repository.create_comment(
+            new_comment=self.comment_in, user_id=1
+        )
+        update = self.session.query.return_value.filter.return_value.update
+        update.assert_called_once()
+        (values,) = update.call_args.args
+        self.assertEqual(
+            [str(value) for value in values.values()],
+            ["photos.comment_count + :comment_count_1"],
+        )
+
+    async def test_create_comment_publishes_event(self):
+        events = MagicMock()
+        events.publish = AsyncMock()
+        self.session.refresh.side_effect = lambda comment: setattr(comment, "id", 7)
+        repository = CommentsRepository(db_session=self.session, events=events)
+        await repository.create_comment(new_comment=self.comment_in, user_id=1)
+        photo_id, event, data = events.publish.await_args.args
+        self.assertEqual((photo_id, event), (1, "comment.created"))
+        self.assertEqual(data["id"], 7)
+        self.assertEqual(data["content"], self.comment_in.content)
+
     async def test_update_comment(self):
         new_content = CommentUpdate(content="New comment content")
         self.session.query.return_value.filter.return_value.first.return_value = (
@@ -71,6 +94,28 @@ class TestComments(unittest.IsolatedAsyncioTestCase):
         result = await self.comments_repository.get_comments_for_photo(photo_id=2)
         self.assertEqual(result, comments)
 
+    async def test_get_latest_comments_for_photos(self):
+        first, second, third = (
+            Comment(id=5, photo_id=1),
+            Comment(id=4, photo_id=1),
+            Comment(id=6, photo_id=2),
+        )
+        self.session.scalars.return_value = [first, second, third]
+        result = await self.comments_repository.get_latest_comments_for_photos(
+            photo_ids=[1, 2, 3], limit=2
+        )
+        self.assertEqual(result, {1: [first, second], 2: [third], 3: []})
+        self.session.scalars.assert_called_once()
+        sql = str(self.session.scalars.call_args.args[0])
+        self.assertIn("row_number() OVER (PARTITION BY comments.photo_id", sql)
+
+    async def test_get_latest_comments_for_no_photos(self):
+        result = await self.comments_repository.get_latest_comments_for_photos(
+            photo_ids=[], limit=2
+        )
+        self.assertEqual(result, {})
+        self.session.scalars.assert_not_called()
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -1,10 +1,12 @@
 import unittest
 from unittest.mock import AsyncMock, MagicMock, call
 from fastapi import HTTPException
+from sqlalchemy import create_engine
 from sqlalchemy.orm import Session
 from src.repository.photos import PhotoRepository
-from src.schemas.photo import PhotoCreate, PhotoUpdateOut
-from src.database.models import Photo, Tag, Rating
+from src.repository.tags import TagRepository
+from src.schemas.photo import PhotoCreate, PhotoSort, PhotoUpdateOut
+from src.database.models import Base, Photo, Tag, Rating
 from datetime import datetime
 
 
@@ -46,6 +48,71 @@ class TestPhotoRepository(unittest.IsolatedAsyncioTestCase):
 
         self.assertEqual(result, photo)
 
+    async def test_get_photo_by_content_hash(self):
+        photo = Photo(id=1, content_hash="ab" * 32)
+        query = self.db.query.return_value.filter.return_value
+        query.order_by.return_value.first.return_value = photo
+
+        result = await self.repository.get_photo_by_content_hash("ab" * 32)
+
+        self.assertEqual(result, photo)
+
+    async def test_get_photo_hashes(self):
+        query = self.db.query.return_value.filter.return_value.order_by.return_value
+        query.all.return_value = [(1, -5), (4, 17)]
+
+        result = await self.repository.get_photo_hashes(after_id=0)
+
+        self.assertEqual(result, [(1, -5), (4, 17)])
+
+    async def test_count_photos_with_public_id(self):
+        self.db.query.return_value.filter.return_value.scalar.return_value = 2
+
+        result = await self.repository.count_photos_with_public_id("abc.png")
+
+        self.assertEqual(result, 2)
+
+    async def test_get_photos_by_ids_keeps_order(self):
+        photos = [Photo(id=1), Photo(id=2), Photo(id=3)]
+        self.db.query.return_value.filter.return_value.all.return_value = photos
+
+        result = await self.repository.get_photos_by_ids([3, 1, 4, 2])
+
+        self.assertEqual([photo.id for photo in result], [3, 1, 2])
+
+    async def test_get_photos_by_ids_empty(self):
+        result = await self.repository.get_photos_by_ids([])
+
+        self.assertEqual(result, [])
+        self.db.query.assert_not_called()
+
+    async def test_get_photo_version(self):
+        version = (
+            datetime(2024, 5, 1), 0, 1, 0, 0, 1, 1, datetime(2024, 5, 2), None, 2
+        )
+        self.db.query.return_value.filter.return_value.first.return_value = version
+
+        result = await self.repository.get_photo_version(1)
+
+        self.assertEqual(result, version)
+
+    def test_rating_histogram(self):
+        photo = Photo(rating_1=1, rating_2=0, rating_3=0, rating_4=2, rating_5=3)
+        self.assertEqual(photo.rating_histogram, {1: 1, 2: 0, 3: 0, 4: 2, 5: 3})
+        self.assertAlmostEqual(photo.average_rating, 24 / 6)
+
+    def test_average_rating_without_ratings(self):
+        photo = Photo()
+        self.assertEqual(photo.rating_histogram, {1: 0, 2: 0, 3: 0, 4: 0, 5: 0})
+        self.assertIsNone(photo.average_rating)
+
+    async def test_get_photo_version_not_found(self):
+        self.db.query.return_value.filter.return_value.first.return_value = None
+
+        result = await self.repository.get_photo_version(999)
+
+        self.assertIsNone(result)
+
     async def test_update_photo(self):
         photo_id = 1
         photo_data = PhotoUpdateOut(
@@ -63,6 +130,24 @@ class TestPhotoRepository(unittest.IsolatedAsyncioTestCase):
         self.assertEqual(result, existing_photo)
         self.db.commit.assert_called_once()
 
+    async def test_update_photo_variants(self):
+        photo = Photo(id=1)
+        self.db.query.return_value.filter.return_value.first.return_value = photo
+        variants = {"thumb": {"original": "t.jpg", "webp": "t.webp"}}
+
+        result = await self.repository.update_photo_variants(1, variants)
+
+        self.assertEqual(result.variants, variants)
+        self.db.commit.assert_called_once()
+
+    async def test_update_photo_variants_not_found(self):
+        self.db.query.return_value.filter.return_value.first.return_value = None
+
+        result = await self.repository.update_photo_variants(1, {})
+
+        self.assertIsNone(result)
+        self.db.commit.assert_not_called()
+
     async def test_delete_photo_by_owner(self):
         photo_id = 1
         owner_id = 1
@@ -150,5 +235,82 @@ class TestPhotoRepository(unittest.IsolatedAsyncioTestCase):
         result = self.db.query.return_value.filter.return_value.all.return_value
         assert len(result) == len(expected_query)
 
+    async def test_get_photos_most_commented_first(self):
+        photos = [Photo(id=2, comment_count=5), Photo(id=1, comment_count=0)]
+        self.db.query.return_value.order_by.return_value.all.return_value = photos
+
+        result = await self.repository.get_photos(sort=PhotoSort.most_commented)
+
+        self.assertEqual(result, photos)
+        order_by = self.db.query.return_value.order_by.call_args.args
+        order = [str(clause) for clause in order_by]
+        self.assertEqual(order, ["photos.comment_count DESC", "photos.id DESC"])
+
+    async def test_get_photo_facets(self):
+        # a real query so that the aggregate statement can be built
+        self.db.query.side_effect = lambda *entities: Session().query(*entities)
+        self.db.execute.return_value.all.return_value = [
+            ("tags", "sun", 2),
+            ("tags", "sea", 5),
+            ("tags", "city", 2),
+            ("ratings", "unrated", 1),
+            ("ratings", "4", 3),
+            ("months", "202405", 2),
+            ("months", "202312", 4),
+        ]
+        facets = await self.repository.get_photo_facets(keyword="beach", tag_limit=3)
+        self.db.execute.assert_called_once()
+        statement = str(self.db.execute.call_args.args[0])
+        self.assertIn("WITH matching AS", statement)
+        self.assertEqual(statement.count("UNION ALL"), 2)
+        self.assertEqual(
+            facets["tags"],
+            [
+                {"value": "sea", "count": 5},
+                {"value": "city", "count": 2},
+                {"value": "sun", "count": 2},
+            ],
+        )
+        self.assertEqual(
+            facets["ratings"],
+            [{"value": "4", "count": 3}, {"value": "unrated", "count": 1}],
+        )
+        self.assertEqual(
+            facets["months"],
+            [{"value": "2023-12", "count": 4}, {"value": "2024-05", "count": 2}],
+        )
+
+
+class TestPhotoVersionAfterTagDelete(unittest.IsolatedAsyncioTestCase):
+    """
+    The photo version keys both the ETag and the cached photo detail body,
+    so it has to change when a tag of the photo is deleted.
+    """
+
+    def setUp(self):
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine)
+        self.db = Session(engine)
+        self.photo = Photo(
+            user_id=1,
+            cloudinary_public_id="pid",
+            image_url="http://images/pid",
+            tags=[Tag(name="old"), Tag(name="new")],
+        )
+        self.db.add(self.photo)
+        self.db.commit()
+
+    def tearDown(self):
+        self.db.close()
+
+    async def test_deleting_a_tag_changes_the_version(self):
+        repository = PhotoRepository(self.db)
+        before = await repository.get_photo_version(self.photo.id)
+
+        await TagRepository(db_session=self.db).delete_tag(self.photo.tags[0].id)
+
+        after = await repository.get_photo_version(self.photo.id)
+        self.assertNotEqual(before, after)
+
 if __name__ == "__main__":
     unittest.main()
@@ -1,5 +1,6 @@
 import unittest
 from unittest.mock import MagicMock
+from sqlalchemy.dialects import postgresql
 from src.database.models import Rating
 from src.repository.ratings import RatingRepository
 
@@ -24,6 +25,48 @@ class TestRatings(unittest.IsolatedAsyncioTestCase):
         self.assertEqual(created_rating.user_id, test_user_id)
         self.assertEqual(created_rating.rating, test_rating)
 
+    async def test_upsert_rating_is_one_statement(self):
+        stored = (1, 2, 3, 5)
+        self.db_session.execute.return_value.first.return_value = stored
+        result = await self.rating_repository.upsert_rating(
+            photo_id=2, user_id=3, rating=5
+        )
+        self.assertEqual(result, stored)
+        self.db_session.execute.assert_called_once()
+        self.db_session.commit.assert_called_once()
+        statement = self.db_session.execute.call_args.args[0]
+        sql = str(statement.compile(dialect=postgresql.dialect()))
+        self.assertIn("INSERT INTO ratings", sql)
+        self.assertIn("ON CONFLICT (photo_id, user_id) DO UPDATE", sql)
+        self.assertIn("RETURNING", sql)
+
+    async def test_upsert_rating_refused(self):
+        self.db_session.execute.return_value.first.return_value = None
+        result = await self.rating_repository.upsert_rating(
+            photo_id=2, user_id=3, rating=5
+        )
+        self.assertIsNone(result)
+
+    async def test_upsert_ratings_is_one_statement(self):
+        self.db_session.execute.return_value.all.return_value = [
+            (1, 1, 2, 5),
+            (2, 1, 3, 4),
+        ]
+        result = await self.rating_repository.upsert_ratings([(1, 2, 5), (1, 3, 4)])
+        self.assertEqual(result, 2)
+        self.db_session.execute.assert_called_once()
+        self.db_session.commit.assert_called_once()
+        statement = self.db_session.execute.call_args.args[0]
+        sql = str(statement.compile(dialect=postgresql.dialect()))
+        self.assertIn("INSERT INTO ratings", sql)
+        self.assertIn("VALUES", sql)
+        self.assertIn("ON CONFLICT (photo_id, user_id) DO UPDATE", sql)
+
+    async def test_upsert_ratings_empty(self):
+        result = await self.rating_repository.upsert_ratings([])
+        self.assertEqual(result, 0)
+        self.db_session.execute.assert_not_called()
+
     async def test_get_ratings(self):
         mock_rating_1 = Rating(id=1, photo_id=1, user_id=1, rating=4)
         mock_rating_2 = Rating(id=2, photo_id=2, user_id=2, rating=3)
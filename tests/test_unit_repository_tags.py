@@ -26,6 +26,11 @@ class TestTags(unittest.IsolatedAsyncioTestCase):
         result = await self.tags_repository.get_all_tags(skip=0, limit=10)
         self.assertEqual(result, tags)
 
+    async def test_get_tags_version(self):
+        self.session.query.return_value.first.return_value = (3, None)
+        result = await self.tags_repository.get_tags_version()
+        self.assertEqual(result, (3, None))
+
     async def test_get_tag_by_id_found(self):
         tag = Tag()
         self.session.query(Tag).filter(Tag.id == 1).first.return_value = tag
@@ -72,6 +77,37 @@ class TestTags(unittest.IsolatedAsyncioTestCase):
         self.assertIsNone(result)
         self.session.commit.assert_not_called()
 
+    async def test_get_tags_by_ids_keeps_order(self):
+        tags = [Tag(id=1), Tag(id=3)]
+        self.session.query().filter().all.return_value = tags
+        result = await self.tags_repository.get_tags_by_ids([3, 2, 1])
+        self.assertEqual([tag.id for tag in result], [3, 1])
+
+    async def test_get_tags_by_ids_empty(self):
+        result = await self.tags_repository.get_tags_by_ids([])
+        self.assertEqual(result, [])
+        self.session.query.assert_not_called()
+
+    async def test_get_photo_tag_ids(self):
+        self.session.query().order_by().all.return_value = [(1, 2), (1, 3)]
+        result = await self.tags_repository.get_photo_tag_ids()
+        self.assertEqual(result, [(1, 2), (1, 3)])
+
+    async def test_get_tags_for_photos(self):
+        sun, sea = Tag(id=1), Tag(id=2)
+        self.session.query().join().filter().order_by().all.return_value = [
+            (1, sun),
+            (1, sea),
+            (3, sea),
+        ]
+        result = await self.tags_repository.get_tags_for_photos([1, 2, 3])
+        self.assertEqual(result, {1: [sun, sea], 2: [], 3: [sea]})
+
+    async def test_get_tags_for_no_photos(self):
+        result = await self.tags_repository.get_tags_for_photos([])
+        self.assertEqual(result, {})
+        self.session.query.assert_not_called()
+
 
 if __name__ == "__main__":
     unittest.main()
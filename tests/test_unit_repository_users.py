@@ -37,6 +37,12 @@ class TestUsers(unittest.IsolatedAsyncioTestCase):
         await self.users_repository.update_token(user=user, token=token)
         self.session.commit.assert_called_once()
 
+    async def test_update_password(self):
+        user = User(email="drajkata@op.pl", password="old-hash")
+        await self.users_repository.update_password(user=user, hashed_password="new-hash")
+        self.assertEqual(user.password, "new-hash")
+        self.session.commit.assert_called_once()
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,59 @@
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, MagicMock
+from src.database.models import Photo, Tag
+from src.services.batch_loader import BatchLoader, RequestLoaders
+
+
+class TestBatchLoader(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.batch_fn = AsyncMock(
+            side_effect=lambda keys: {key: key * 10 for key in keys if key != 0}
+        )
+        self.loader = BatchLoader(self.batch_fn, max_batch_size=3)
+
+    async def test_loads_of_one_iteration_are_batched(self):
+        first, second = await asyncio.gather(self.loader.load(1), self.loader.load(2))
+        self.assertEqual((first, second), (10, 20))
+        self.batch_fn.assert_awaited_once_with([1, 2])
+
+    async def test_load_many_keeps_order_and_memoizes(self):
+        self.assertEqual(await self.loader.load_many([2, 1, 2]), [20, 10, 20])
+        self.assertEqual(await self.loader.load(1), 10)
+        self.batch_fn.assert_awaited_once_with([2, 1])
+
+    async def test_missing_key_resolves_to_none(self):
+        self.assertIsNone(await self.loader.load(0))
+
+    async def test_batches_are_split(self):
+        await self.loader.load_many([1, 2, 3, 4])
+        self.assertEqual(
+            [call.args[0] for call in self.batch_fn.await_args_list],
+            [[1, 2, 3], [4]],
+        )
+
+    async def test_failed_keys_are_not_memoized(self):
+        self.batch_fn.side_effect = [RuntimeError("db down"), {1: 10}]
+        with self.assertRaises(RuntimeError):
+            await self.loader.load(1)
+        self.assertEqual(await self.loader.load(1), 10)
+
+
+class TestRequestLoaders(unittest.IsolatedAsyncioTestCase):
+
+    async def test_attach_tags(self):
+        sun = Tag(id=1, name="sun")
+        tags_repository = MagicMock()
+        tags_repository.get_tags_for_photos = AsyncMock(return_value={1: [sun], 2: []})
+        photos = [Photo(id=1), Photo(id=2)]
+
+        result = await RequestLoaders(tags_repository).attach_tags(photos)
+
+        self.assertIs(result, photos)
+        self.assertEqual([photo.tags for photo in photos], [[sun], []])
+        tags_repository.get_tags_for_photos.assert_awaited_once_with([1, 2])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,31 @@
+import unittest
+from src.services.etag import make_etag, etag_matches, not_modified
+
+
+class TestETag(unittest.TestCase):
+
+    def test_make_etag_is_stable_and_quoted(self):
+        etag = make_etag("photo", 1, 3)
+        self.assertEqual(etag, make_etag("photo", 1, 3))
+        self.assertTrue(etag.startswith('"') and etag.endswith('"'))
+
+    def test_make_etag_changes_with_version(self):
+        self.assertNotEqual(make_etag("photo", 1, 3), make_etag("photo", 1, 4))
+
+    def test_etag_matches(self):
+        etag = make_etag("tags", 0, 100)
+        self.assertTrue(etag_matches(etag, etag))
+        self.assertTrue(etag_matches(f'"other", W/{etag}', etag))
+        self.assertTrue(etag_matches("*", etag))
+        self.assertFalse(etag_matches('"other"', etag))
+        self.assertFalse(etag_matches(None, etag))
+
+    def test_not_modified(self):
+        response = not_modified('"abc"', "private, no-cache")
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.headers["etag"], '"abc"')
+        self.assertEqual(response.headers["cache-control"], "private, no-cache")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,30 @@
+import unittest
+from src.services.file_responses import parse_byte_range
+
+
+class TestParseByteRange(unittest.TestCase):
+
+    def test_ranges(self):
+        self.assertEqual(parse_byte_range("bytes=0-99", 1000), (0, 99))
+        self.assertEqual(parse_byte_range("bytes=900-", 1000), (900, 999))
+        self.assertEqual(parse_byte_range("bytes=-100", 1000), (900, 999))
+        self.assertEqual(parse_byte_range("bytes=990-2000", 1000), (990, 999))
+        self.assertEqual(parse_byte_range("bytes=-5000", 1000), (0, 999))
+
+    def test_ignored_headers(self):
+        self.assertIsNone(parse_byte_range("items=0-1", 1000))
+        self.assertIsNone(parse_byte_range("bytes=0-1,5-6", 1000))
+        self.assertIsNone(parse_byte_range("bytes=a-b", 1000))
+        self.assertIsNone(parse_byte_range("bytes=-", 1000))
+
+    def test_unsatisfiable(self):
+        with self.assertRaises(ValueError):
+            parse_byte_range("bytes=1000-", 1000)
+        with self.assertRaises(ValueError):
+            parse_byte_range("bytes=10-5", 1000)
+        with self.assertRaises(ValueError):
+            parse_byte_range("bytes=-0", 1000)
+
+
+if __name__ == "__main__":
+    unittest.main()
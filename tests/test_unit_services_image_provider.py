@@ -0,0 +1,235 @@
+import asyncio
+import hashlib
+import io
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+from PIL import Image
+from src.schemas.photo import TransformationInput
+from src.services.image_provider import (
+    AbstractImageProvider,
+    CloudinaryImageProvider,
+    LocalImageProvider,
+    sniff_extension,
+)
+
+
+class RecordingImageProvider(AbstractImageProvider):
+    def __init__(self):
+        self.threads = []
+        self.deleted = []
+
+    def upload(self, file, user):
+        self.threads.append(threading.current_thread().name)
+        return (f"http://images/{file}", file)
+
+    def transform(self, public_id, transform):
+        return f"http://images/{public_id}?width={transform.width}"
+
+    def delete(self, public_id):
+        self.deleted.append(public_id)
+
+    def sign_upload(self, user):
+        return {"upload_url": "http://images/upload", "fields": {}}
+
+    def verify_upload(self, user, public_id, version, signature):
+        return f"http://images/{public_id}"
+
+
+class TestAbstractImageProviderAsync(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.provider = RecordingImageProvider()
+
+    async def test_upload_async_runs_in_worker_thread(self):
+        result = await self.provider.upload_async("a.png", None)
+        self.assertEqual(result, ("http://images/a.png", "a.png"))
+        self.assertTrue(self.provider.threads[0].startswith("image-provider"))
+
+    async def test_transform_and_delete_async(self):
+        url = await self.provider.transform_async("a.png", TransformationInput(width=10))
+        self.assertEqual(url, "http://images/a.png?width=10")
+        await self.provider.delete_async("a.png")
+        self.assertEqual(self.provider.deleted, ["a.png"])
+
+
+class TestLocalImageProvider(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.provider = LocalImageProvider(
+            root=self.root, base_url="http://localhost/api/storage/", secret_key="secret"
+        )
+        self.user = SimpleNamespace(id=7)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_upload_is_content_addressed(self):
+        content = b"\x89PNG\r\n\x1a\n" + b"image-bytes"
+        file = SimpleNamespace(file=io.BytesIO(content))
+        url, public_id = self.provider.upload(file, self.user)
+        digest = hashlib.sha256(content).hexdigest()
+        self.assertEqual(public_id, f"{digest}.png")
+        self.assertEqual(url, f"http://localhost/api/storage/{public_id}")
+        path = self.root / digest[:2] / digest[2:4] / public_id
+        self.assertEqual(path.read_bytes(), content)
+        self.assertEqual(self.provider.media_type(public_id), "image/png")
+
+        _, same_public_id = self.provider.upload(
+            SimpleNamespace(file=io.BytesIO(content)), self.user
+        )
+        self.assertEqual(same_public_id, public_id)
+        self.assertEqual(list((self.root / "tmp").iterdir()), [])
+
+        self.provider.delete(public_id)
+        self.assertFalse(path.exists())
+
+    def test_direct_upload_flow(self):
+        signed = self.provider.sign_upload(self.user)
+        self.assertEqual(signed["upload_url"], "http://localhost/api/storage/upload")
+        response = self.provider.accept_upload(io.BytesIO(b"image-bytes"), **signed["fields"])
+        url = self.provider.verify_upload(
+            self.user, response["public_id"], str(response["version"]), response["signature"]
+        )
+        self.assertEqual(url, response["url"])
+
+    def test_verify_upload_rejects_other_users_upload(self):
+        fields = self.provider.sign_upload(self.user)["fields"]
+        response = self.provider.accept_upload(io.BytesIO(b"image-bytes"), **fields)
+        with self.assertRaises(ValueError):
+            self.provider.verify_upload(
+                SimpleNamespace(id=8),
+                response["public_id"],
+                str(response["version"]),
+                response["signature"],
+            )
+
+    def test_accept_upload_rejects_forged_fields(self):
+        fields = self.provider.sign_upload(self.user)["fields"]
+        fields["user_id"] = 8
+        with self.assertRaises(ValueError):
+            self.provider.accept_upload(io.BytesIO(b"x"), **fields)
+
+    def test_accept_upload_rejects_expired_signature(self):
+        provider = LocalImageProvider(self.root, "http://localhost", "secret", signature_ttl=0)
+        fields = provider.sign_upload(self.user)["fields"]
+        fields["timestamp"] -= 10
+        fields["signature"] = provider._sign("upload", 7, fields["timestamp"])
+        with self.assertRaises(ValueError):
+            provider.accept_upload(io.BytesIO(b"x"), **fields)
+
+    def test_verify_upload_rejects_bad_signature(self):
+        with self.assertRaises(ValueError):
+            self.provider.verify_upload(self.user, "abc", "1", "forged")
+
+    def test_rejects_invalid_public_id(self):
+        with self.assertRaises(ValueError):
+            self.provider.delete("../outside")
+
+
+class TestCloudinaryImageProvider(unittest.TestCase):
+
+    def setUp(self):
+        self.provider = CloudinaryImageProvider(
+            {"cloud_name": "demo", "api_key": "key", "api_secret": "secret"}
+        )
+
+    def test_sign_upload_uses_user_folder(self):
+        fields = self.provider.sign_upload(SimpleNamespace(id=7))["fields"]
+        self.assertEqual(fields["folder"], "users/7")
+
+    def test_verify_upload_rejects_other_users_folder(self):
+        with self.assertRaises(ValueError):
+            self.provider.verify_upload(SimpleNamespace(id=8), "users/7/abc", "1", "any")
+
+
+class TestLocalImageProviderTransform(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.provider = LocalImageProvider(
+            root=Path(self.tmp.name), base_url="http://localhost/api/storage", secret_key="secret"
+        )
+        image = io.BytesIO()
+        Image.new("RGB", (40, 20), "blue").save(image, "PNG")
+        image.seek(0)
+        _, self.public_id = self.provider.upload(SimpleNamespace(file=image), None)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_transform_renders_and_returns_canonical_url(self):
+        url = self.provider.transform(
+            self.public_id, TransformationInput(width=10, crop="FILL", height=10)
+        )
+        query = "crop=fill&height=10&width=10"
+        self.assertTrue(
+            url.startswith(f"http://localhost/api/storage/{self.public_id}?{query}&sig=")
+        )
+        path = self.provider.render(
+            self.public_id, TransformationInput(width=10, crop="fill", height=10)
+        )
+        self.assertEqual(Image.open(path).size, (10, 10))
+
+    def test_verify_transform(self):
+        url = self.provider.transformed_url(
+            self.public_id, TransformationInput(width=10, crop="fill")
+        )
+        signature = url.rsplit("sig=", 1)[1]
+        self.provider.verify_transform(
+            self.public_id, TransformationInput(width=10, crop="FILL"), signature
+        )
+        with self.assertRaises(ValueError):
+            self.provider.verify_transform(
+                self.public_id, TransformationInput(width=11, crop="fill"), signature
+            )
+        with self.assertRaises(ValueError):
+            self.provider.verify_transform(
+                self.public_id, TransformationInput(width=10, crop="fill"), None
+            )
+
+    def test_render_of_corrupt_image_raises_os_error(self):
+        self.provider.path(self.public_id).write_bytes(b"\x89PNG\r\n\x1a\nbroken")
+        with self.assertRaises(OSError):
+            self.provider.render(self.public_id, TransformationInput(width=10))
+
+    def test_transform_rejects_unsupported_effect(self):
+        with self.assertRaises(ValueError):
+            self.provider.transform(
+                self.public_id, TransformationInput(effect="cartoonify")
+            )
+
+    async def test_concurrent_renders_share_one_call(self):
+        calls = []
+        render = self.provider.render
+
+        def counting_render(public_id, transform):
+            calls.append(public_id)
+            time.sleep(0.05)
+            return render(public_id, transform)
+
+        self.provider.render = counting_render
+        transform = TransformationInput(width=16)
+        paths = await asyncio.gather(
+            *(self.provider.render_async(self.public_id, transform) for _ in range(5))
+        )
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len(set(paths)), 1)
+
+
+class TestSniffExtension(unittest.TestCase):
+
+    def test_known_formats(self):
+        self.assertEqual(sniff_extension(b"\xff\xd8\xff\xe0"), "jpg")
+        self.assertEqual(sniff_extension(b"GIF89a...."), "gif")
+        self.assertEqual(sniff_extension(b"RIFF\x00\x00\x00\x00WEBPVP8 "), "webp")
+        self.assertEqual(sniff_extension(b"%PDF-1.4"), "bin")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+import io
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from PIL import Image
+from src.schemas.photo import TransformationInput
+from src.services.image_transform import (
+    DerivedImageCache,
+    canonical_params,
+    render_transformation,
+)
+
+
+class TestRenderTransformation(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.source = Path(self.tmp.name) / "source.jpg"
+        Image.new("RGB", (400, 200), "red").save(self.source, "JPEG")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def render(self, **params):
+        data, extension = render_transformation(
+            self.source, canonical_params(TransformationInput(**params))
+        )
+        return Image.open(io.BytesIO(data)), extension
+
+    def test_canonical_params(self):
+        params = canonical_params(TransformationInput(crop=" FILL", width=10))
+        self.assertEqual(params, {"crop": "fill", "width": 10})
+
+    def test_crop_modes(self):
+        self.assertEqual(self.render(width=100)[0].size, (100, 50))
+        self.assertEqual(self.render(width=100, height=100)[0].size, (100, 100))
+        self.assertEqual(self.render(width=100, height=100, crop="fit")[0].size, (100, 50))
+        self.assertEqual(self.render(width=800, height=800, crop="limit")[0].size, (400, 200))
+        self.assertEqual(self.render(width=100, height=100, crop="fill")[0].size, (100, 100))
+        self.assertEqual(self.render(width=50, height=60, crop="crop")[0].size, (50, 60))
+        image, extension = self.render(width=100, height=100, crop="pad")
+        self.assertEqual((image.size, extension), ((100, 100), "png"))
+
+    def test_effects_rotation_and_radius(self):
+        image, extension = self.render(effect="grayscale")
+        self.assertEqual(extension, "jpg")
+        red, green, blue = image.getpixel((200, 100))
+        self.assertAlmostEqual(red, green, delta=3)
+        image, _ = self.render(angle=90)
+        self.assertEqual(image.size, (200, 400))
+        image, extension = self.render(radius="max")
+        self.assertEqual((image.mode, extension), ("RGBA", "png"))
+        self.assertEqual(image.getpixel((0, 0))[3], 0)
+        self.assertEqual(image.getpixel((200, 100))[3], 255)
+
+    def test_output_format(self):
+        image, extension = self.render(width=50, fetch_format="webp")
+        self.assertEqual((image.format, extension), ("WEBP", "webp"))
+        image, extension = self.render(radius="max", fetch_format="jpg")
+        self.assertEqual((image.mode, extension), ("RGB", "jpg"))
+
+    def test_rejects_unsupported_parameters(self):
+        for params in (
+            {"effect": "cartoonify"},
+            {"crop": "smart", "width": 10},
+            {"gravity": "up", "width": 10, "crop": "fill", "height": 10},
+            {"width": 100000},
+            {"radius": "round"},
+            {"fetch_format": "tiff"},
+        ):
+            with self.subTest(params=params), self.assertRaises(ValueError):
+                self.render(**params)
+
+
+class TestDerivedImageCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.cache = DerivedImageCache(self.root, max_bytes=350, low_water=0.9)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_key_depends_on_image_and_parameters(self):
+        key = DerivedImageCache.key("a.jpg", {"width": 10, "crop": "fill"})
+        self.assertEqual(key, DerivedImageCache.key("a.jpg", {"crop": "fill", "width": 10}))
+        self.assertNotEqual(key, DerivedImageCache.key("b.jpg", {"crop": "fill", "width": 10}))
+
+    def test_store_and_lookup(self):
+        self.assertIsNone(self.cache.lookup("ab" * 32))
+        path = self.cache.store("ab" * 32, "png", b"data")
+        self.assertEqual(self.cache.lookup("ab" * 32), path)
+        self.assertEqual(path.read_bytes(), b"data")
+
+    def test_evicts_least_recently_used(self):
+        keys = ["a" * 64, "b" * 64, "c" * 64]
+        for age, key in enumerate(keys):
+            path = self.cache.store(key, "png", b"x" * 100)
+            os.utime(path, (1000 + age, 1000 + age))
+        # the first entry was used last, so the second one goes
+        self.assertIsNotNone(self.cache.lookup(keys[0]))
+        self.cache.store("d" * 64, "png", b"x" * 100)
+
+        self.assertIsNotNone(self.cache.lookup(keys[0]))
+        self.assertIsNone(self.cache.lookup(keys[1]))
+        self.assertIsNotNone(self.cache.lookup(keys[2]))
+        self.assertIsNotNone(self.cache.lookup("d" * 64))
+
+
+if __name__ == "__main__":
+    unittest.main()
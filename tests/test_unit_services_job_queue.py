@@ -0,0 +1,145 @@
+import asyncio
+import json
+import unittest
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock
+from src.services.job_queue import (
+    EXPIRE_SCRIPT,
+    FAIL_SCRIPT,
+    REQUEUE_DUE_SCRIPT,
+    Job,
+    JobQueue,
+    Worker,
+)
+
+
+class TestJobQueue(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.redis = AsyncMock()
+
+        @asynccontextmanager
+        async def redis_client():
+            yield self.redis
+
+        self.queue = JobQueue(redis_client, max_attempts=3, retry_delay=2.0)
+
+    async def test_reserve_empty(self):
+        self.redis.eval.return_value = None
+        self.assertIsNone(await self.queue.reserve())
+
+    async def test_reserve(self):
+        payload = json.dumps({"name": "delete_image", "kwargs": {"public_id": "a"}})
+        self.redis.eval.return_value = [b"job1", payload.encode(), 2]
+
+        job = await self.queue.reserve()
+
+        self.assertEqual(job, Job("job1", "delete_image", {"public_id": "a"}, 2))
+
+    async def test_fail_schedules_retry_with_backoff(self):
+        self.redis.eval.return_value = 1
+
+        dead = await self.queue.fail(Job("job1", "x", attempts=2), "error")
+
+        self.assertFalse(dead)
+        args = self.redis.eval.await_args.args
+        self.assertEqual(args[0], FAIL_SCRIPT)
+        self.assertEqual(args[-2], "retry")
+
+    async def test_fail_dead_letters_after_last_attempt(self):
+        self.redis.eval.return_value = 2
+
+        dead = await self.queue.fail(Job("job1", "x", {"a": 1}, attempts=3), "boom")
+
+        self.assertTrue(dead)
+        args = self.redis.eval.await_args.args
+        self.assertEqual(args[-2], "dead")
+        entry = json.loads(args[-1])
+        self.assertEqual((entry["kwargs"], entry["error"]), ({"a": 1}, "boom"))
+
+    async def test_requeue_due_counts_expired_reservations_as_attempts(self):
+        self.redis.eval.side_effect = [1, 2]
+
+        self.assertEqual(await self.queue.requeue_due(), 3)
+
+        expire, retry = self.redis.eval.await_args_list
+        self.assertEqual(expire.args[0], EXPIRE_SCRIPT)
+        self.assertEqual(
+            expire.args[2:7],
+            (
+                self.queue.processing_key,
+                self.queue.ready_key,
+                self.queue.payloads_key,
+                self.queue.attempts_key,
+                self.queue.dead_key,
+            ),
+        )
+        self.assertEqual(expire.args[-1], 3)
+        self.assertEqual(retry.args[0], REQUEUE_DUE_SCRIPT)
+
+    async def test_requeue_dead_accepts_empty_kwargs_from_lua(self):
+        self.redis.rpop.side_effect = [json.dumps({"name": "x", "kwargs": []}), None]
+        self.queue.enqueue = AsyncMock()
+
+        self.assertEqual(await self.queue.requeue_dead(), 1)
+        self.queue.enqueue.assert_awaited_once_with("x")
+
+    async def test_ack_of_expired_reservation(self):
+        self.redis.eval.return_value = 0
+        self.assertFalse(await self.queue.ack(Job("job1", "x")))
+
+
+class TestWorker(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.queue = AsyncMock(spec=JobQueue)
+
+    async def test_run_job_acks_on_success(self):
+        handler = AsyncMock()
+        worker = Worker(self.queue, {"resize": handler})
+        job = Job("job1", "resize", {"photo_id": 1}, 1)
+
+        await worker.run_job(job)
+
+        handler.assert_awaited_once_with(photo_id=1)
+        self.queue.ack.assert_awaited_once_with(job)
+        self.queue.fail.assert_not_awaited()
+
+    async def test_run_job_fails_on_error(self):
+        worker = Worker(self.queue, {"resize": AsyncMock(side_effect=RuntimeError)})
+        job = Job("job1", "resize", {}, 1)
+
+        await worker.run_job(job)
+
+        self.queue.fail.assert_awaited_once()
+        self.assertIn("RuntimeError", self.queue.fail.await_args.args[1])
+        self.queue.ack.assert_not_awaited()
+
+    async def test_run_job_fails_unknown_job(self):
+        worker = Worker(self.queue, {})
+
+        await worker.run_job(Job("job1", "missing", {}, 1))
+
+        self.assertIn("missing", self.queue.fail.await_args.args[1])
+
+    async def test_run_stops_after_running_jobs(self):
+        jobs = [Job("job1", "slow", {}, 1), None]
+        self.queue.reserve.side_effect = lambda: jobs.pop(0) if jobs else None
+        finished = []
+
+        async def slow():
+            await asyncio.sleep(0.05)
+            finished.append(True)
+
+        worker = Worker(self.queue, {"slow": slow}, poll_interval=0.01)
+        task = asyncio.create_task(worker.run())
+        await asyncio.sleep(0.02)
+        worker.stop()
+        await task
+
+        self.assertEqual(finished, [True])
+        self.queue.ack.assert_awaited_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
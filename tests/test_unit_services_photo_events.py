@@ -0,0 +1,94 @@
+import asyncio
+import json
+import unittest
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock
+from src.services.photo_events import PhotoEventHub
+
+
+class FakePubSub:
+    def __init__(self):
+        self.messages = asyncio.Queue()
+        self.psubscribe = AsyncMock()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+    async def listen(self):
+        yield {"type": "psubscribe", "data": 1}
+        while True:
+            yield await self.messages.get()
+
+
+class TestPhotoEventHub(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.pubsub = FakePubSub()
+        self.redis = AsyncMock()
+        self.redis.pubsub = lambda: self.pubsub
+
+        @asynccontextmanager
+        async def redis_client():
+            yield self.redis
+
+        self.hub = PhotoEventHub(redis_client, channel_prefix="events:", queue_size=2)
+
+    def receive(self, photo_id, event, data):
+        message = json.dumps({"event": event, "data": data}).encode()
+        self.pubsub.messages.put_nowait(
+            {
+                "type": "pmessage",
+                "channel": f"events:{photo_id}".encode(),
+                "data": message,
+            }
+        )
+
+    async def test_publish(self):
+        await self.hub.publish(3, "comment.created", {"id": 1})
+        self.redis.publish.assert_awaited_once_with(
+            "events:3", json.dumps({"event": "comment.created", "data": {"id": 1}})
+        )
+
+    async def test_subscribers_receive_events_of_their_photo(self):
+        async with self.hub.subscribe(1) as first, self.hub.subscribe(2) as second:
+            self.pubsub.psubscribe.assert_awaited_once_with("events:*")
+            self.receive(1, "rating.updated", {"rating": 5})
+            message = await asyncio.wait_for(first.get(), timeout=1)
+            self.assertEqual(
+                message, {"event": "rating.updated", "data": {"rating": 5}}
+            )
+            self.assertTrue(second.empty())
+
+    async def test_listener_stops_with_last_subscriber(self):
+        async with self.hub.subscribe(1):
+            listener = self.hub._listener
+            self.assertFalse(listener.done())
+        await asyncio.sleep(0)
+        self.assertTrue(listener.cancelled())
+
+    def test_dispatch_drops_events_of_slow_viewers(self):
+        queue = asyncio.Queue(1)
+        self.hub._subscribers[1] = {queue}
+        self.hub.dispatch(1, {"event": "a", "data": {}})
+        self.hub.dispatch(1, {"event": "b", "data": {}})
+        self.assertEqual(queue.get_nowait()["event"], "a")
+        self.assertTrue(queue.empty())
+
+    async def test_stream_formats_server_sent_events(self):
+        stream = self.hub.stream(1, keepalive=0.05)
+        self.assertEqual(await stream.__anext__(), "retry: 3000\n\n")
+        self.receive(1, "comment.deleted", {"id": 4})
+        self.assertEqual(
+            await stream.__anext__(),
+            'event: comment.deleted\ndata: {"id": 4}\n\n',
+        )
+        self.assertEqual(await stream.__anext__(), ": keepalive\n\n")
+        await stream.aclose()
+        self.assertEqual(self.hub._subscribers, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+import asyncio
+import unittest
+from fastapi import HTTPException
+from src.services.pwd_handler import (
+    BcryptPasswordHandler,
+    PasswordHashPool,
+    calibrate_bcrypt_rounds,
+)
+
+
+class TestBcryptPasswordHandler(unittest.TestCase):
+
+    def test_needs_rehash(self):
+        hashed = BcryptPasswordHandler(rounds=4).get_password_hash("secret1")
+        self.assertFalse(BcryptPasswordHandler(rounds=4).needs_rehash(hashed))
+        self.assertTrue(BcryptPasswordHandler(rounds=5).needs_rehash(hashed))
+        self.assertTrue(BcryptPasswordHandler(rounds=4).needs_rehash("not-a-hash"))
+
+    def test_calibrate_bcrypt_rounds(self):
+        rounds, timings = calibrate_bcrypt_rounds(
+            target_ms=0.0, min_rounds=4, max_rounds=5, samples=1
+        )
+        self.assertEqual(rounds, 4)
+        self.assertEqual(list(timings), [4])
+
+
+class TestPasswordHashPool(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.pool = PasswordHashPool(BcryptPasswordHandler(rounds=4), max_workers=1)
+
+    async def asyncTearDown(self):
+        self.pool.shutdown()
+
+    async def test_hash_and_verify(self):
+        hashed = await self.pool.get_password_hash("secret1")
+        self.assertTrue(await self.pool.verify_password("secret1", hashed))
+        self.assertFalse(await self.pool.verify_password("wrong", hashed))
+        self.assertEqual(self.pool.stats.calls, {"hash": 1, "verify": 2})
+        self.assertEqual(self.pool.pending, 0)
+
+    async def test_rejects_above_queue_limit(self):
+        pool = PasswordHashPool(BcryptPasswordHandler(rounds=4), max_pending=0)
+        with self.assertRaises(HTTPException) as context:
+            await pool.get_password_hash("secret1")
+        self.assertEqual(context.exception.status_code, 503)
+        self.assertEqual(pool.stats.rejected, 1)
+
+    async def test_timeout_returns_503(self):
+        pool = PasswordHashPool(
+            BcryptPasswordHandler(rounds=4), max_workers=1, timeout=0.0
+        )
+        try:
+            with self.assertRaises(HTTPException) as context:
+                await pool.get_password_hash("secret1")
+            self.assertEqual(context.exception.status_code, 503)
+            self.assertEqual(context.exception.headers, {"Retry-After": "1"})
+            self.assertEqual(pool.stats.timed_out, 1)
+            for _ in range(500):
+                if pool.pending == 0:
+                    break
+                await asyncio.sleep(0.01)
+            self.assertEqual(pool.pending, 0)
+        finally:
+            pool.shutdown()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock
+from src.schemas.photo import QRCodeFormat
+from src.services.qr_codes import QRCodeCache, render_qr_code
+
+
+class TestQRCodes(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.redis = AsyncMock()
+
+        @asynccontextmanager
+        async def redis_client():
+            yield self.redis
+
+        self.cache = QRCodeCache(redis_client, ttl=60)
+
+    def test_render_png(self):
+        image = render_qr_code("http://example.com/1.png", None, QRCodeFormat.png)
+        self.assertTrue(image.startswith(b"\x89PNG\r\n\x1a\n"))
+
+    def test_render_png_size(self):
+        small = render_qr_code("http://example.com/1.png", 64, QRCodeFormat.png)
+        large = render_qr_code("http://example.com/1.png", 1024, QRCodeFormat.png)
+        self.assertLess(len(small), len(large))
+
+    def test_render_svg(self):
+        image = render_qr_code("http://example.com/1.png", 256, QRCodeFormat.svg)
+        self.assertIn(b"<svg", image)
+
+    async def test_get_or_render_hit(self):
+        self.redis.hget.return_value = b"cached"
+        image = await self.cache.get_or_render("http://x", None, QRCodeFormat.png)
+        self.assertEqual(image, b"cached")
+        self.assertEqual(self.redis.hget.await_args.args[1], "default:png")
+        self.redis.hset.assert_not_awaited()
+
+    async def test_get_or_render_miss(self):
+        self.redis.hget.return_value = None
+        image = await self.cache.get_or_render("http://x", 128, QRCodeFormat.png)
+        self.assertTrue(image.startswith(b"\x89PNG"))
+        key = self.redis.hget.await_args.args[0]
+        self.redis.hset.assert_awaited_once_with(key, "128:png", image)
+        self.redis.expire.assert_awaited_once_with(key, 60)
+
+    async def test_invalidate_deletes_the_url_hash(self):
+        self.redis.hget.return_value = b"cached"
+        await self.cache.get_or_render("http://x", 128, QRCodeFormat.svg)
+        key = self.redis.hget.await_args.args[0]
+        await self.cache.invalidate("http://x")
+        self.redis.delete.assert_awaited_once_with(key)
+        self.redis.scan_iter.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+import asyncio
+import unittest
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, MagicMock
+from src.services.rating_buffer import RatingBuffer
+
+
+def entry(entry_id, photo_id, user_id, rating):
+    fields = {b"photo_id": photo_id, b"user_id": user_id, b"rating": rating}
+    return entry_id.encode(), {
+        name: str(value).encode() for name, value in fields.items()
+    }
+
+
+class TestRatingBuffer(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.redis = AsyncMock()
+        self.redis.xautoclaim.return_value = [b"0-0", [], []]
+        self.pipe = MagicMock()
+        self.pipe.execute = AsyncMock()
+        pipeline = MagicMock()
+        pipeline.__aenter__ = AsyncMock(return_value=self.pipe)
+        pipeline.__aexit__ = AsyncMock(return_value=None)
+        self.redis.pipeline = MagicMock(return_value=pipeline)
+
+        @asynccontextmanager
+        async def redis_client():
+            yield self.redis
+
+        self.buffer = RatingBuffer(redis_client, stream="ratings", batch_size=10)
+        self.repository = MagicMock()
+        self.repository.upsert_ratings = AsyncMock(return_value=1)
+
+    async def test_add(self):
+        await self.buffer.add(1, 2, 5)
+        self.redis.xadd.assert_awaited_once_with(
+            "ratings", {"photo_id": 1, "user_id": 2, "rating": 5}
+        )
+
+    def test_latest_ratings_keeps_last_rating_per_user(self):
+        entries = [
+            ("1-0", {"photo_id": "1", "user_id": "2", "rating": "3"}),
+            ("2-0", {"photo_id": "1", "user_id": "3", "rating": "4"}),
+            ("3-0", {"photo_id": "1", "user_id": "2", "rating": "5"}),
+        ]
+        self.assertEqual(
+            RatingBuffer.latest_ratings(entries), [(1, 2, 5), (1, 3, 4)]
+        )
+
+    async def test_read_batch_prefers_own_pending_entries(self):
+        self.redis.xreadgroup.return_value = [[b"ratings", [entry("1-0", 1, 2, 5)]]]
+        entries = await self.buffer.read_batch("flusher")
+        self.assertEqual(
+            entries, [("1-0", {"photo_id": "1", "user_id": "2", "rating": "5"})]
+        )
+        self.redis.xreadgroup.assert_awaited_once_with(
+            "flushers", "flusher", {"ratings": "0"}, count=10
+        )
+        self.redis.xautoclaim.assert_not_awaited()
+
+    async def test_read_batch_claims_then_reads_new_entries(self):
+        self.redis.xreadgroup.side_effect = [
+            [[b"ratings", []]],
+            [[b"ratings", [entry("2-0", 1, 3, 4)]]],
+        ]
+        entries = await self.buffer.read_batch("flusher")
+        self.assertEqual([entry_id for entry_id, _ in entries], ["2-0"])
+        self.redis.xautoclaim.assert_awaited_once()
+        self.assertEqual(
+            self.redis.xreadgroup.await_args.args[2], {"ratings": ">"}
+        )
+
+    async def test_flush_writes_then_acknowledges(self):
+        self.redis.xreadgroup.return_value = [
+            [b"ratings", [entry("1-0", 1, 2, 3), entry("2-0", 1, 2, 5)]]
+        ]
+        on_flushed = AsyncMock()
+        flushed = await self.buffer.flush(
+            lambda: self.repository, "flusher", on_flushed
+        )
+        self.assertEqual(flushed, 2)
+        self.repository.upsert_ratings.assert_awaited_once_with([(1, 2, 5)])
+        self.pipe.xack.assert_called_once_with("ratings", "flushers", "1-0", "2-0")
+        self.pipe.xdel.assert_called_once_with("ratings", "1-0", "2-0")
+        on_flushed.assert_awaited_once()
+
+    async def test_flush_keeps_entries_when_write_fails(self):
+        self.redis.xreadgroup.return_value = [[b"ratings", [entry("1-0", 1, 2, 3)]]]
+        self.repository.upsert_ratings.side_effect = RuntimeError("db down")
+        with self.assertRaises(RuntimeError):
+            await self.buffer.flush(lambda: self.repository, "flusher")
+        self.pipe.xack.assert_not_called()
+
+    async def test_run_flushes_until_stopped(self):
+        self.redis.xreadgroup.return_value = []
+        stopping = asyncio.Event()
+        stopping.set()
+        await asyncio.wait_for(
+            self.buffer.run(lambda: self.repository, 0.01, stopping), timeout=1
+        )
+        self.repository.upsert_ratings.assert_not_awaited()
+
+    async def test_run_logs_failed_flush_with_traceback(self):
+        self.redis.xreadgroup.return_value = [[b"ratings", [entry("1-0", 1, 2, 3)]]]
+        self.repository.upsert_ratings.side_effect = RuntimeError("db down")
+        stopping = asyncio.Event()
+        stopping.set()
+        with self.assertLogs("src.services.rating_buffer", "ERROR") as logs:
+            await asyncio.wait_for(
+                self.buffer.run(lambda: self.repository, 0.01, stopping), timeout=1
+            )
+        self.assertIn("Rating flush failed", logs.output[0])
+        self.assertIn("RuntimeError: db down", logs.output[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
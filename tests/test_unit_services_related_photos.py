@@ -0,0 +1,113 @@
+import asyncio
+import json
+import unittest
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, MagicMock
+from src.services.related_photos import TagPhotoIndex
+
+# photo 1: tags 1, 2, 3; photo 2: 1, 2; photo 3: 1; photo 4: 3
+PHOTO_TAGS = [(1, 1), (1, 2), (1, 3), (2, 1), (2, 2), (3, 1), (4, 3)]
+
+
+class FakePubSub:
+    def __init__(self, messages):
+        self.messages = messages
+        self.subscribe = AsyncMock()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+    async def listen(self):
+        yield {"type": "subscribe", "data": 1}
+        for message in self.messages:
+            yield {"type": "message", "data": json.dumps(message).encode()}
+        # stay subscribed until cancelled
+        await asyncio.Event().wait()
+
+
+class TestTagPhotoIndex(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.redis = AsyncMock()
+
+        @asynccontextmanager
+        async def redis_client():
+            yield self.redis
+
+        self.index = TagPhotoIndex(redis_client, channel="changes")
+        self.repository = AsyncMock()
+        self.repository.get_photo_tag_ids.return_value = list(PHOTO_TAGS)
+
+    def test_related_ranks_by_shared_tags(self):
+        self.index.load(PHOTO_TAGS)
+        self.assertEqual(self.index.related(1, 10), [2, 4, 3])
+        self.assertEqual(self.index.related(1, 1), [2])
+        self.assertEqual(self.index.related(3, 10), [2, 1])
+        self.assertEqual(self.index.related(99, 10), [])
+
+    def test_set_photo_tags_keeps_postings_sorted(self):
+        self.index.load(PHOTO_TAGS)
+        self.index.set_photo_tags(0, [3])
+        self.index.set_photo_tags(5, [3, 2])
+        self.assertEqual(list(self.index._postings[3]), [0, 1, 4, 5])
+        self.index.set_photo_tags(5, [3, 2])
+        self.assertEqual(list(self.index._postings[2]), [1, 2, 5])
+        self.assertEqual(self.index.related(5, 10), [1, 4, 2, 0])
+
+    def test_removing_photo(self):
+        self.index.load(PHOTO_TAGS)
+        self.index.set_photo_tags(4, [])
+        self.index.set_photo_tags(1, [1])
+        self.assertNotIn(3, self.index._postings)
+        self.assertEqual(self.index.related(3, 10), [2, 1])
+        self.assertEqual(self.index.related(4, 10), [])
+
+    def test_ties_broken_by_newest_and_limit_applied(self):
+        pairs = [(photo_id, 1) for photo_id in range(8)] + [(5, 2), (0, 2)]
+        self.index.load(sorted(pairs))
+        self.assertEqual(self.index.related(0, 3), [5, 7, 6])
+        self.assertEqual(self.index.related(5, 0), [])
+
+    def test_remove_tag(self):
+        self.index.load(PHOTO_TAGS)
+        self.index.remove_tag(3)
+        self.assertNotIn(3, self.index._postings)
+        self.assertEqual(self.index.related(1, 10), [2, 3])
+        self.assertEqual(self.index.related(4, 10), [])
+        self.index.set_photo_tags(1, [1])
+        self.assertEqual(list(self.index._postings[2]), [2])
+
+    async def test_find_related_loads_once(self):
+        related = await self.index.find_related(self.repository, 1, 10)
+        self.assertEqual(related, [2, 4, 3])
+        await self.index.find_related(self.repository, 2, 10)
+        self.repository.get_photo_tag_ids.assert_awaited_once()
+
+    async def test_publish_applies_locally_and_notifies(self):
+        self.index.load(PHOTO_TAGS)
+        await self.index.publish(5, [3])
+        self.assertEqual(self.index.related(5, 10), [4, 1])
+        self.redis.publish.assert_awaited_once_with(
+            "changes", json.dumps({"photo_id": 5, "tags": [3]})
+        )
+
+    async def test_listen_loads_then_applies_notifications(self):
+        pubsub = FakePubSub(
+            [
+                {"photo_id": 5, "tags": [2]},
+                {"photo_id": 2, "tags": []},
+                {"deleted_tag_id": 3},
+            ]
+        )
+        self.redis.pubsub = MagicMock(return_value=pubsub)
+        task = asyncio.create_task(self.index.listen(lambda: self.repository))
+        for _ in range(10):
+            await asyncio.sleep(0)
+        pubsub.subscribe.assert_awaited_once_with("changes")
+        self.assertEqual(self.index.related(1, 10), [5, 3])
+        task.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await task
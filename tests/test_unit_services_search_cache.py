@@ -0,0 +1,102 @@
+import json
+import unittest
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock
+from src.services.search_cache import PhotoSearchCache
+
+
+class TestPhotoSearchCache(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.redis = AsyncMock()
+
+        @asynccontextmanager
+        async def redis_client():
+            yield self.redis
+
+        self.cache = PhotoSearchCache(redis_client, ttl=60)
+
+    def test_normalize_filters(self):
+        filters = self.cache.normalize_filters(
+            keyword="Sea", avg_rating_above="4", created_after=None, user_id=None
+        )
+        self.assertEqual(filters, {"keyword": "sea", "avg_rating_above": 4.0})
+
+    def test_keywords_differing_by_whitespace_have_separate_entries(self):
+        padded = self.cache.normalize_filters(keyword=" cat")
+        plain = self.cache.normalize_filters(keyword="cat")
+        self.assertEqual(padded, {"keyword": " cat"})
+        self.assertNotEqual(self.cache._key(padded), self.cache._key(plain))
+
+    async def test_lookup_miss(self):
+        self.redis.mget.return_value = [b"3", None]
+        ids, generation = await self.cache.lookup({"keyword": "sea"})
+        self.assertIsNone(ids)
+        self.assertEqual(generation, 3)
+
+    async def test_lookup_hit(self):
+        entry = json.dumps({"generation": 3, "ids": [5, 2]})
+        self.redis.mget.return_value = [b"3", entry.encode()]
+        ids, generation = await self.cache.lookup({"keyword": "sea"})
+        self.assertEqual(ids, [5, 2])
+
+    async def test_lookup_stale_generation(self):
+        entry = json.dumps({"generation": 2, "ids": [5, 2]})
+        self.redis.mget.return_value = [b"3", entry.encode()]
+        ids, generation = await self.cache.lookup({"keyword": "sea"})
+        self.assertIsNone(ids)
+
+    async def test_store_and_invalidate(self):
+        await self.cache.store({"keyword": "sea"}, 3, [5, 2])
+        self.redis.set.assert_awaited_once()
+        self.assertEqual(self.redis.set.call_args.kwargs["ex"], 60)
+        await self.cache.invalidate()
+        self.redis.incr.assert_awaited_once_with(PhotoSearchCache.GENERATION_KEY)
+
+    async def test_most_commented_depends_on_comment_generation(self):
+        filters = {"keyword": "sea", "sort": "most_commented"}
+        self.redis.mget.return_value = [b"3", b"7", None]
+        ids, generation = await self.cache.lookup(filters)
+        self.assertEqual(
+            self.redis.mget.await_args.args[:2],
+            (PhotoSearchCache.GENERATION_KEY, PhotoSearchCache.COMMENTS_GENERATION_KEY),
+        )
+        self.assertEqual(generation, [3, 7])
+        await self.cache.store(filters, generation, [5, 2])
+        entry = self.redis.set.await_args.args[1]
+        self.redis.mget.return_value = [b"3", b"7", entry.encode()]
+        ids, _ = await self.cache.lookup(filters)
+        self.assertEqual(ids, [5, 2])
+        self.redis.mget.return_value = [b"3", b"8", entry.encode()]
+        ids, _ = await self.cache.lookup(filters)
+        self.assertIsNone(ids)
+
+    async def test_comment_invalidation_keeps_other_results(self):
+        await self.cache.invalidate_comment_counts()
+        self.redis.incr.assert_awaited_once_with(
+            PhotoSearchCache.COMMENTS_GENERATION_KEY
+        )
+        self.redis.mget.return_value = [b"3", None]
+        await self.cache.lookup({"keyword": "sea", "sort": "newest"})
+        self.assertEqual(
+            self.redis.mget.await_args.args[0], PhotoSearchCache.GENERATION_KEY
+        )
+        self.assertEqual(len(self.redis.mget.await_args.args), 2)
+
+    async def test_facets_round_trip(self):
+        facets = {"tags": [{"value": "sea", "count": 2}], "ratings": [], "months": []}
+        await self.cache.store_facets({"keyword": "sea"}, 3, facets)
+        key, entry = self.redis.set.await_args.args
+        self.assertTrue(key.startswith(PhotoSearchCache.FACETS_KEY_PREFIX))
+        self.assertNotEqual(key, self.cache._key({"keyword": "sea"}))
+        self.redis.mget.return_value = [b"3", entry.encode()]
+        result, generation = await self.cache.lookup_facets({"keyword": "sea"})
+        self.assertEqual(result, facets)
+        self.redis.mget.return_value = [b"4", entry.encode()]
+        result, generation = await self.cache.lookup_facets({"keyword": "sea"})
+        self.assertIsNone(result)
+        self.assertEqual(generation, 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+import io
+import random
+import unittest
+from unittest.mock import AsyncMock, patch
+from PIL import Image, ImageDraw
+from src.services.similarity import (
+    BKTree,
+    SimilarPhotoIndex,
+    hamming_distance,
+    perceptual_hash,
+    to_signed,
+    to_unsigned,
+)
+
+
+def encode_image(seed, size):
+    rng = random.Random(seed)
+    image = Image.new("RGB", (400, 300), "white")
+    draw = ImageDraw.Draw(image)
+    for _ in range(10):
+        x, y = rng.randint(0, 400), rng.randint(0, 300)
+        draw.rectangle((x, y, x + 100, y + 80), fill=(rng.randint(0, 255),) * 3)
+    buffer = io.BytesIO()
+    image.resize(size).save(buffer, "JPEG")
+    buffer.seek(0)
+    return buffer
+
+
+class TestPerceptualHash(unittest.TestCase):
+
+    def test_resized_copy_is_close(self):
+        original = perceptual_hash(encode_image(1, (400, 300)))
+        resized = perceptual_hash(encode_image(1, (200, 150)))
+        other = perceptual_hash(encode_image(2, (400, 300)))
+        self.assertLessEqual(hamming_distance(original, resized), 6)
+        self.assertGreater(hamming_distance(original, other), 10)
+
+    def test_decompression_bomb_is_not_an_os_error(self):
+        # the route has to handle it separately from unreadable files
+        with patch.object(Image, "MAX_IMAGE_PIXELS", 1000):
+            with self.assertRaises(Image.DecompressionBombError):
+                perceptual_hash(encode_image(1, (400, 300)))
+
+    def test_signed_round_trip(self):
+        for value in (0, 1, 2**63 - 1, 2**63, 2**64 - 1):
+            signed = to_signed(value)
+            self.assertTrue(-(2**63) <= signed < 2**63)
+            self.assertEqual(to_unsigned(signed), value)
+
+
+class TestBKTree(unittest.TestCase):
+
+    def test_search_matches_linear_scan(self):
+        rng = random.Random(7)
+        tree = BKTree()
+        hashes = {}
+        for photo_id in range(500):
+            base = rng.choice([0, 2**64 - 1, 0x0F0F0F0F0F0F0F0F])
+            noise = rng.getrandbits(64) & rng.getrandbits(64) & rng.getrandbits(64)
+            value = base ^ noise
+            hashes[photo_id] = value
+            tree.add(value, photo_id)
+        query = rng.getrandbits(64)
+        expected = sorted(
+            (hamming_distance(query, value), photo_id)
+            for photo_id, value in hashes.items()
+            if hamming_distance(query, value) <= 20
+        )
+        self.assertEqual(tree.search(query, 20), expected)
+
+    def test_shared_hash_and_remove(self):
+        tree = BKTree()
+        tree.add(0b1010, 1)
+        tree.add(0b1010, 2)
+        tree.add(0b1011, 3)
+        self.assertEqual(tree.search(0b1010, 1), [(0, 1), (0, 2), (1, 3)])
+        tree.remove(1)
+        tree.remove(42)
+        self.assertEqual(tree.search(0b1010, 0), [(0, 2)])
+        self.assertIsNone(tree.get(1))
+
+
+class TestSimilarPhotoIndex(unittest.IsolatedAsyncioTestCase):
+
+    async def test_refresh_loads_only_new_photos(self):
+        repository = AsyncMock()
+        repository.get_photo_hashes.side_effect = [
+            [(1, to_signed(2**64 - 1)), (2, to_signed(2**64 - 2))],
+            [(3, 0)],
+        ]
+        index = SimilarPhotoIndex()
+
+        await index.refresh(repository)
+        similar = await index.find_similar(repository, 1, max_distance=4, limit=10)
+
+        self.assertEqual(similar, [2])
+        self.assertEqual(
+            repository.get_photo_hashes.await_args_list[1].kwargs, {"after_id": 2}
+        )
+
+    async def test_photo_without_hash(self):
+        repository = AsyncMock()
+        repository.get_photo_hashes.return_value = []
+        index = SimilarPhotoIndex()
+        self.assertIsNone(await index.find_similar(repository, 1, 10, 10))
+
+
+if __name__ == "__main__":
+    unittest.main()
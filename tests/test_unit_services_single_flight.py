@@ -0,0 +1,98 @@
+import asyncio
+import unittest
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock
+from src.services.single_flight import SingleFlight, CoalescingCache
+
+
+class TestSingleFlight(unittest.IsolatedAsyncioTestCase):
+
+    async def test_concurrent_calls_share_one_load(self):
+        flight = SingleFlight()
+        calls = 0
+
+        async def loader():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return calls
+
+        results = await asyncio.gather(*(flight.do("photo:1", loader) for _ in range(20)))
+
+        self.assertEqual(calls, 1)
+        self.assertEqual(results, [1] * 20)
+        self.assertEqual(flight.in_flight(), 0)
+
+    async def test_exception_is_shared_and_key_released(self):
+        flight = SingleFlight()
+
+        async def failing():
+            await asyncio.sleep(0)
+            raise ValueError("boom")
+
+        results = await asyncio.gather(
+            flight.do("k", failing), flight.do("k", failing), return_exceptions=True
+        )
+        self.assertTrue(all(isinstance(r, ValueError) for r in results))
+        self.assertEqual(flight.in_flight(), 0)
+
+
+class TestCoalescingCache(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.redis = AsyncMock()
+
+        @asynccontextmanager
+        async def redis_client():
+            yield self.redis
+
+        self.cache = CoalescingCache(redis_client, lock_timeout=0.05, poll_interval=0.01)
+
+    async def test_hit_skips_loader(self):
+        self.redis.get.return_value = b"cached"
+        loader = AsyncMock()
+        result = await self.cache.get_or_load("user:a", loader, ttl=10)
+        self.assertEqual(result, b"cached")
+        loader.assert_not_awaited()
+
+    async def test_miss_with_lock_loads_and_stores(self):
+        self.redis.get.return_value = None
+        self.redis.set.return_value = True
+        loader = AsyncMock(return_value=b"fresh")
+        result = await self.cache.get_or_load("user:a", loader, ttl=10)
+        self.assertEqual(result, b"fresh")
+        self.redis.set.assert_any_await("user:a", b"fresh", ex=10)
+        self.redis.eval.assert_awaited_once()
+
+    async def test_missing_resource_is_not_cached(self):
+        self.redis.get.return_value = None
+        self.redis.set.return_value = True
+        loader = AsyncMock(return_value=None)
+        result = await self.cache.get_or_load("user:a", loader, ttl=10)
+        self.assertIsNone(result)
+        self.assertEqual(self.redis.set.await_count, 1)  # the lock only
+
+    async def test_waits_for_other_process(self):
+        self.redis.get.side_effect = [None, None, b"from-other"]
+        self.redis.set.return_value = None
+        self.redis.exists.return_value = 1
+        loader = AsyncMock()
+        result = await self.cache.get_or_load("user:a", loader, ttl=10)
+        self.assertEqual(result, b"from-other")
+        loader.assert_not_awaited()
+
+    async def test_falls_back_when_lock_released_without_value(self):
+        self.redis.get.return_value = None
+        self.redis.set.return_value = None
+        self.redis.exists.return_value = 0
+        loader = AsyncMock(return_value=b"fresh")
+        result = await self.cache.get_or_load("user:a", loader, ttl=10)
+        self.assertEqual(result, b"fresh")
+
+    async def test_invalidate_deletes_key(self):
+        await self.cache.invalidate("user:a")
+        self.redis.delete.assert_awaited_once_with("user:a")
+
+
+if __name__ == "__main__":
+    unittest.main()
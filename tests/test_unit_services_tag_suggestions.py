@@ -0,0 +1,118 @@
+import asyncio
+import unittest
+from unittest.mock import AsyncMock
+from src.database.models import Tag
+from src.services.tag_suggestions import TagCooccurrence, count_cooccurrences
+
+# photos 1-3: (beach, sea, sun), (beach, sea), (beach, city)
+PHOTO_TAGS = [(1, 1), (1, 2), (1, 3), (2, 1), (2, 2), (3, 1), (3, 4)]
+
+
+def make_repository(photo_tags=PHOTO_TAGS):
+    repository = AsyncMock()
+    repository.get_photo_tag_ids.return_value = list(photo_tags)
+    repository.get_tags_by_ids.side_effect = lambda ids: [
+        Tag(id=tag_id, name=f"tag{tag_id}") for tag_id in ids
+    ]
+    return repository
+
+
+class TestCountCooccurrences(unittest.TestCase):
+
+    def test_counts(self):
+        matrix, tag_counts, tag_ids = count_cooccurrences(PHOTO_TAGS + [(1, 1)])
+        self.assertEqual(tag_ids.tolist(), [1, 2, 3, 4])
+        self.assertEqual(tag_counts.tolist(), [3, 2, 1, 1])
+        self.assertEqual(
+            matrix.toarray().tolist(),
+            [[0, 2, 1, 1], [2, 0, 1, 0], [1, 1, 0, 0], [1, 0, 0, 0]],
+        )
+
+    def test_counts_without_tags(self):
+        matrix, tag_counts, tag_ids = count_cooccurrences([])
+        self.assertEqual(matrix.shape, (0, 0))
+        self.assertEqual(len(tag_ids), 0)
+
+
+class TestTagCooccurrence(unittest.IsolatedAsyncioTestCase):
+
+    async def test_suggest_ranks_by_conditional_share(self):
+        cooccurrence = TagCooccurrence(make_repository)
+        await cooccurrence.rebuild()
+        # sea: 2/3 of beach photos, sun and city 1/3 each
+        self.assertEqual(
+            cooccurrence.suggest([1], 3), [(2, 2 / 3), (3, 1 / 3), (4, 1 / 3)]
+        )
+        self.assertEqual([tag_id for tag_id, _ in cooccurrence.suggest([2], 5)], [1, 3])
+        self.assertEqual(cooccurrence.suggest([99], 5), [])
+
+    async def test_incremental_updates(self):
+        cooccurrence = TagCooccurrence(make_repository)
+        await cooccurrence.rebuild()
+        cooccurrence.add_photo([4, 3])
+        cooccurrence.add_photo([4, 3])
+        self.assertEqual(cooccurrence.suggest([4], 1), [(3, 2 / 3)])
+        cooccurrence.remove_photo([4, 3])
+        cooccurrence.remove_photo([4, 3])
+        self.assertEqual(cooccurrence.suggest([4], 5), [(1, 1.0)])
+
+    async def test_updates_before_build_are_ignored(self):
+        repository = make_repository()
+        cooccurrence = TagCooccurrence(lambda: repository)
+        cooccurrence.add_photo([1, 2])
+        tags = await cooccurrence.suggest_tags(repository, [2], 5)
+        self.assertEqual([tag.id for tag in tags], [1, 3])
+        self.assertEqual(cooccurrence.suggest([2], 1), [(1, 1.0)])
+
+    async def test_builds_once_until_stale(self):
+        repository = make_repository()
+        cooccurrence = TagCooccurrence(lambda: repository, rebuild_interval=3600)
+        await cooccurrence.suggest_tags(repository, [1], 2)
+        await cooccurrence.suggest_tags(repository, [1], 2)
+        repository.get_photo_tag_ids.assert_awaited_once()
+
+    async def test_stale_matrix_is_rebuilt_in_background(self):
+        repository = make_repository()
+        cooccurrence = TagCooccurrence(lambda: repository, rebuild_interval=0)
+        await cooccurrence.ensure_fresh()
+        repository.get_photo_tag_ids.return_value = [(5, 1), (5, 4)]
+        await cooccurrence.ensure_fresh()
+        # the stale matrix keeps answering while the rebuild runs
+        self.assertEqual(cooccurrence.suggest([1], 1), [(2, 2 / 3)])
+        await cooccurrence._rebuild_task
+        self.assertEqual(cooccurrence.suggest([1], 5), [(4, 1.0)])
+
+    async def test_suggest_tags_skips_deleted_tags(self):
+        repository = make_repository()
+        cooccurrence = TagCooccurrence(lambda: repository)
+        repository.get_tags_by_ids.side_effect = lambda ids: [
+            Tag(id=tag_id) for tag_id in ids if tag_id != 2
+        ]
+        tags = await cooccurrence.suggest_tags(repository, [1], 2)
+        self.assertEqual([tag.id for tag in tags], [3, 4])
+
+    async def test_concurrent_first_callers_build_once(self):
+        repository = make_repository()
+        factory_calls = []
+
+        def factory():
+            factory_calls.append(1)
+            return repository
+
+        cooccurrence = TagCooccurrence(factory)
+        await asyncio.gather(
+            cooccurrence.suggest_tags(repository, [1], 2),
+            cooccurrence.suggest_tags(repository, [2], 2),
+        )
+        self.assertEqual(len(factory_calls), 1)
+        repository.get_photo_tag_ids.assert_awaited_once()
+
+    async def test_updates_with_new_tags_and_folding(self):
+        cooccurrence = TagCooccurrence(make_repository, max_delta=2)
+        await cooccurrence.rebuild()
+        cooccurrence.add_photo([1, 7])
+        cooccurrence.add_photo([7, 8])
+        self.assertEqual(cooccurrence.suggest([7], 5), [(1, 0.5), (8, 0.5)])
+        self.assertEqual(
+            [tag_id for tag_id, _ in cooccurrence.suggest([1], 5)], [2, 3, 4, 7]
+        )
@@ -0,0 +1,149 @@
+import hashlib
+import io
+import unittest
+from fastapi import FastAPI, File, Request, UploadFile
+from fastapi.testclient import TestClient
+from PIL import Image
+from src.services.upload_validation import (
+    MultipartUploadValidator,
+    UploadRejected,
+    UploadValidationMiddleware,
+    hash_file,
+    read_image_header,
+)
+
+BOUNDARY = b"boundary"
+
+
+def encode_image(size, fmt):
+    buffer = io.BytesIO()
+    Image.new("RGB", size, "green").save(buffer, fmt)
+    return buffer.getvalue()
+
+
+def multipart_body(content: bytes) -> bytes:
+    return (
+        b"--boundary\r\n"
+        b'Content-Disposition: form-data; name="description"\r\n\r\n'
+        b"not an image\r\n"
+        b"--boundary\r\n"
+        b'Content-Disposition: form-data; name="file"; filename="a.jpg"\r\n'
+        b"Content-Type: image/jpeg\r\n\r\n" + content + b"\r\n--boundary--\r\n"
+    )
+
+
+class TestReadImageHeader(unittest.TestCase):
+
+    def test_dimensions(self):
+        formats = (("JPEG", "jpg"), ("PNG", "png"), ("GIF", "gif"), ("WEBP", "webp"))
+        for fmt, extension in formats:
+            with self.subTest(fmt=fmt):
+                header = read_image_header(encode_image((321, 123), fmt)[:1024])
+                self.assertEqual(
+                    (header.extension, header.width, header.height),
+                    (extension, 321, 123),
+                )
+
+    def test_not_an_image(self):
+        self.assertIsNone(read_image_header(b"%PDF-1.4 and more bytes"))
+
+    def test_dimensions_beyond_given_bytes(self):
+        header = read_image_header(encode_image((10, 10), "JPEG")[:8])
+        self.assertEqual((header.extension, header.width), ("jpg", None))
+
+
+class TestMultipartUploadValidator(unittest.TestCase):
+
+    def feed_in_chunks(self, body, chunk_size=1024, **limits):
+        validator = MultipartUploadValidator(
+            BOUNDARY,
+            max_bytes=limits.get("max_bytes", 10**7),
+            max_pixels=limits.get("max_pixels", 10**7),
+        )
+        fed = 0
+        try:
+            for start in range(0, len(body), chunk_size):
+                fed += chunk_size
+                validator.feed(body[start : start + chunk_size])
+        except UploadRejected as err:
+            return err, fed
+        return None, fed
+
+    def test_accepts_image(self):
+        error, _ = self.feed_in_chunks(multipart_body(encode_image((200, 100), "JPEG")))
+        self.assertIsNone(error)
+
+    def test_digests_file_parts(self):
+        image = encode_image((200, 100), "PNG")
+        validator = MultipartUploadValidator(BOUNDARY, max_bytes=10**7, max_pixels=10**7)
+        body = multipart_body(image)
+        for start in range(0, len(body), 100):
+            validator.feed(body[start : start + 100])
+        self.assertEqual(validator.digests, {"file": hashlib.sha256(image).hexdigest()})
+
+    def test_hash_file_restores_position(self):
+        file = io.BytesIO(b"content")
+        file.seek(3)
+        self.assertEqual(hash_file(file), hashlib.sha256(b"content").hexdigest())
+        self.assertEqual(file.tell(), 3)
+
+    def test_rejects_non_image_after_first_chunk(self):
+        error, fed = self.feed_in_chunks(multipart_body(b"MZ" + b"\0" * 100000))
+        self.assertEqual(error.status_code, 415)
+        self.assertEqual(fed, 1024)
+
+    def test_rejects_too_many_pixels(self):
+        body = multipart_body(encode_image((400, 300), "PNG"))
+        error, _ = self.feed_in_chunks(body, max_pixels=100000)
+        self.assertEqual(error.status_code, 422)
+
+    def test_rejects_too_many_bytes(self):
+        body = multipart_body(b"\x89PNG\r\n\x1a\n" + b"\0" * 50000)
+        error, fed = self.feed_in_chunks(body, max_bytes=10000)
+        self.assertEqual(error.status_code, 413)
+        self.assertLessEqual(fed, 11 * 1024)
+
+
+class TestUploadValidationMiddleware(unittest.TestCase):
+
+    def setUp(self):
+        app = FastAPI()
+        app.add_middleware(UploadValidationMiddleware, max_bytes=50000, max_pixels=10**6)
+
+        @app.post("/upload")
+        async def upload(request: Request, file: UploadFile = File()):
+            return {
+                "size": len(await file.read()),
+                "sha256": request.state.upload_digests["file"],
+            }
+
+        self.client = TestClient(app)
+
+    def test_passes_valid_upload(self):
+        image = encode_image((50, 50), "PNG")
+        response = self.client.post("/upload", files={"file": ("a.png", image)})
+        self.assertEqual(
+            response.json(),
+            {"size": len(image), "sha256": hashlib.sha256(image).hexdigest()},
+        )
+
+    def test_rejects_invalid_upload(self):
+        response = self.client.post(
+            "/upload", files={"file": ("a.png", b"plain text file")}
+        )
+        self.assertEqual(response.status_code, 415)
+
+    def test_rejects_large_content_length_without_reading(self):
+        response = self.client.post(
+            "/upload",
+            content=b"--boundary--\r\n",
+            headers={
+                "Content-Type": "multipart/form-data; boundary=boundary",
+                "Content-Length": "100000",
+            },
+        )
+        self.assertEqual(response.status_code, 413)
+
+
+if __name__ == "__main__":
+    unittest.main()
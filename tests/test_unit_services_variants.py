@@ -0,0 +1,77 @@
+import unittest
+from datetime import datetime
+from unittest.mock import AsyncMock
+from src.schemas.photo import ImageSize, PhotoOut
+from src.services.variants import (
+    VARIANT_TRANSFORMATIONS,
+    generate_photo_variants,
+    generate_variants,
+    select_variant,
+)
+
+
+class FakeImageProvider:
+    def __init__(self):
+        self.transforms = []
+
+    async def transform_async(self, public_id, transform):
+        self.transforms.append(transform)
+        suffix = f".{transform.fetch_format}" if transform.fetch_format else ""
+        return f"http://images/{public_id}/{transform.width}{suffix}"
+
+
+class TestVariants(unittest.IsolatedAsyncioTestCase):
+
+    def make_photo(self, variants=None):
+        return PhotoOut(
+            id=1,
+            description="photo",
+            image_url="http://images/original.jpg",
+            cloudinary_public_id="original",
+            image_url_transform=None,
+            user_id=1,
+            created_at=datetime(2024, 1, 1),
+            average_rating=None,
+            variants=variants,
+        )
+
+    async def test_generate_variants(self):
+        provider = FakeImageProvider()
+
+        variants = await generate_variants(provider, "pid")
+
+        self.assertEqual(len(provider.transforms), 2 * len(VARIANT_TRANSFORMATIONS))
+        self.assertEqual(
+            variants["small"],
+            {"original": "http://images/pid/320", "webp": "http://images/pid/320.webp"},
+        )
+        self.assertEqual(set(variants), {size.value for size in ImageSize})
+
+    async def test_generate_photo_variants_stores_urls(self):
+        repository = AsyncMock()
+
+        await generate_photo_variants(7, "pid", FakeImageProvider(), repository)
+
+        photo_id, variants = repository.update_photo_variants.await_args.args
+        self.assertEqual(photo_id, 7)
+        self.assertEqual(variants["thumb"]["original"], "http://images/pid/150")
+
+    def test_select_variant(self):
+        photo = self.make_photo(
+            {"thumb": {"original": "http://t.jpg", "webp": "http://t.webp"}}
+        )
+        self.assertEqual(
+            select_variant(photo, ImageSize.thumb, webp=True).display_url, "http://t.webp"
+        )
+        self.assertEqual(
+            select_variant(photo, ImageSize.thumb, webp=False).display_url, "http://t.jpg"
+        )
+
+    def test_select_variant_falls_back_to_original(self):
+        photo = select_variant(self.make_photo(), ImageSize.large, webp=True)
+        self.assertEqual(photo.display_url, "http://images/original.jpg")
+        self.assertIsNone(select_variant(self.make_photo(), None, webp=False).display_url)
+
+
+if __name__ == "__main__":
+    unittest.main()
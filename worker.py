@@ -0,0 +1,72 @@
+import argparse
+import asyncio
+import json
+import logging
+from dependencies import (
+    get_job_queue,
+    get_photo_search_cache,
+    get_rating_buffer,
+    get_rating_repository,
+)
+from src.config import settings
+from src.services.job_queue import Worker
+from src.services.jobs import JOB_HANDLERS
+
+
+# CLI running the background jobs enqueued by the API
+async def worker_cli():
+    parser = argparse.ArgumentParser(description="Run background jobs from the Redis queue")
+    parser.add_argument(
+        "-c",
+        "--concurrency",
+        type=int,
+        default=settings.job_worker_concurrency,
+        help="Maximum number of jobs run at the same time",
+    )
+    parser.add_argument(
+        "--stats", action="store_true", help="Print the queue sizes and exit"
+    )
+    parser.add_argument(
+        "--dead", action="store_true", help="Print the dead-lettered jobs and exit"
+    )
+    parser.add_argument(
+        "--requeue-dead",
+        action="store_true",
+        help="Enqueue the dead-lettered jobs again and exit",
+    )
+    args = parser.parse_args()
+
+    queue = get_job_queue()
+    if args.stats:
+        print(json.dumps(await queue.stats()))
+    elif args.dead:
+        for entry in await queue.dead_letters():
+            print(json.dumps(entry))
+    elif args.requeue_dead:
+        print(f"Requeued {await queue.requeue_dead()} jobs.")
+    else:
+        logging.basicConfig(
+            level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s"
+        )
+        print(f"Worker started with concurrency {args.concurrency}.")
+        stopping = asyncio.Event()
+        flusher = None
+        if settings.rating_write_behind:
+            # buffered ratings are written alongside the jobs
+            flusher = asyncio.create_task(
+                get_rating_buffer().run(
+                    get_rating_repository,
+                    settings.rating_flush_interval,
+                    stopping,
+                    on_flushed=get_photo_search_cache().invalidate,
+                )
+            )
+        await Worker(queue, JOB_HANDLERS, concurrency=args.concurrency).run()
+        stopping.set()
+        if flusher is not None:
+            await flusher
+        print("Worker stopped.")
+
+
+if __name__ == "__main__":
+    asyncio.run(worker_cli())